@@ -85,4 +85,12 @@ def face_recognized():
     logger.info("Rozpoznano twarz (bounding box >= 25% kadru)")
 
 def embedding_sent():
-    logger.info("Wysłano dane do API")
\ No newline at end of file
+    logger.info("Wysłano dane do API")
+
+def face_matched_locally(person_id, similarity, camera_url):
+    logger.info(f"Rozpoznano lokalnie: {person_id} (podobieństwo {similarity:.3f}, kamera {camera_url})")
+
+def startup_timing(timings):
+    """ Rozbicie czasu startu aplikacji na etapy (wartości w sekundach). """
+    breakdown = ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items())
+    logger.info(f"Czas startu: {breakdown}")
\ No newline at end of file
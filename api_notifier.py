@@ -1,16 +1,22 @@
 # api_notifier.py
 
 import os
+import json
+import queue
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import numpy as np
 import time
 import anomaly_handler
 from dotenv import load_dotenv
 
 
+# (connect, read) w sekundach
+DEFAULT_TIMEOUT = (3.05, 10.0)
 
-def send_embedding(api_url, kiosk_id, camera_url, embedding, time_stamp, image_base):
-    print("DEBUG imageB64 =>", image_base)
+
+def build_payload(kiosk_id, camera_url, embedding, time_stamp, image_base, local_match=None):
     payload = {
         'kiosk_id': kiosk_id,
         'camera_url': camera_url,
@@ -18,6 +24,212 @@ def send_embedding(api_url, kiosk_id, camera_url, embedding, time_stamp, image_b
         'time_stamp': time_stamp,
         'photo': image_base
     }
-    response = requests.post(api_url, json=payload)
+    if local_match is not None:
+        # Wynik dopasowania w lokalnej galerii: {"person_id": ..., "similarity": ...}
+        payload['local_match'] = local_match
+    return payload
+
+
+def send_embedding(api_url, kiosk_id, camera_url, embedding, time_stamp, image_base, timeout=DEFAULT_TIMEOUT):
+    payload = build_payload(kiosk_id, camera_url, embedding, time_stamp, image_base)
+    response = requests.post(api_url, json=payload, timeout=timeout)
     return response.status_code, response.text
 
+
+class DiskQueue:
+    """
+    Kolejka zdarzeń na dysku (jeden plik JSON na zdarzenie), używana gdy API
+    nie odpowiada. Pliki są nazwane znacznikiem czasu, więc kolejność FIFO
+    przetrwa restart kontenera.
+    """
+
+    def __init__(self, directory="pending_uploads", max_items=10000):
+        self.directory = directory
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _files(self):
+        return sorted(f for f in os.listdir(self.directory) if f.endswith(".json"))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._files())
+
+    def push(self, payload):
+        with self._lock:
+            files = self._files()
+            if len(files) >= self.max_items:
+                os.remove(os.path.join(self.directory, files[0]))
+                anomaly_handler.log_warning("Kolejka dyskowa pełna - usuwam najstarsze zdarzenie.")
+            path = os.path.join(self.directory, f"{time.time_ns()}.json")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+
+    def peek(self):
+        """ Zwraca (ścieżka, payload) najstarszego zdarzenia albo (None, None). """
+        with self._lock:
+            for name in self._files():
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        return path, json.load(f)
+                except (OSError, ValueError):
+                    anomaly_handler.log_warning(f"Uszkodzony plik w kolejce dyskowej: {path}")
+                    os.remove(path)
+            return None, None
+
+    def remove(self, path):
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class AsyncEmbeddingSender:
+    """
+    Nieblokująca wysyłka embeddingów do API.
+    submit() tylko wkłada payload do ograniczonej kolejki w pamięci; osobny wątek
+    wysyła go przez współdzieloną sesję keep-alive, z timeoutami i ponowieniami
+    z wykładniczym backoffem. Gdy API nie działa (albo kolejka jest pełna),
+    zdarzenia trafiają do DiskQueue i są dosyłane, kiedy API wróci.
+    on_result(payload, status, response_text) jest wołane po każdej udanej wysyłce.
+    """
+
+    def __init__(self, api_url, on_result=None, max_queue=64, spool_dir="pending_uploads",
+                 timeout=DEFAULT_TIMEOUT, max_retries=3, backoff_base=0.5, backoff_max=60.0,
+                 replay_batch=100, replay_budget=2.0):
+        self.api_url = api_url
+        self.on_result = on_result
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Dosyłanie z dysku: najwyżej replay_batch zdarzeń / replay_budget sekund na obrót pętli
+        self.replay_batch = replay_batch
+        self.replay_budget = replay_budget
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.spool = DiskQueue(spool_dir)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._failures = 0
+        self._down_until = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="api-sender", daemon=True)
+
+        self.sent = 0
+        self.retried = 0
+        self.spilled = 0
+        self.replayed = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+        # Niewysłane zdarzenia z pamięci zapisujemy na dysk, żeby nie przepadły
+        while True:
+            try:
+                self._spill(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self.session.close()
+
+    def submit(self, payload):
+        """ Nigdy nie blokuje: przy pełnej kolejce zdarzenie idzie od razu na dysk. """
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self._spill(payload)
+
+    def _spill(self, payload):
+        self.spool.push(payload)
+        self.spilled += 1
+
+    def _api_down(self):
+        return time.time() < self._down_until
+
+    def _deliver(self, payload, attempts):
+        """ Wysyła payload; zwraca True, gdy serwer go przyjął (lub odrzucił jako 4xx). """
+        for attempt in range(attempts):
+            if attempt:
+                self.retried += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                if self._stop.wait(delay):
+                    return False
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                anomaly_handler.log_warning(f"Wysyłka do API nieudana ({type(e).__name__}), próba {attempt + 1}/{attempts}")
+                continue
+            if response.status_code >= 500:
+                anomaly_handler.log_warning(f"API zwróciło {response.status_code}, próba {attempt + 1}/{attempts}")
+                continue
+
+            self._failures = 0
+            self._down_until = 0.0
+            self.sent += 1
+            if self.on_result is not None:
+                self.on_result(payload, response.status_code, response.text)
+            return True
+
+        # API nie odpowiada - kolejne zdarzenia od razu na dysk, aż minie backoff
+        self._failures += 1
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** self._failures)
+        self._down_until = time.time() + backoff
+        anomaly_handler.log_warning(
+            f"Brak połączenia z API: {self.api_url} - kolejne zdarzenia trafią na dysk przez {backoff:.1f}s"
+        )
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                payload = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                payload = None
+
+            if payload is not None:
+                if self._api_down() or not self._deliver(payload, self.max_retries):
+                    self._spill(payload)
+                    continue
+
+            # API żyje - przy okazji dosyłamy zaległe zdarzenia z dysku
+            if not self._api_down():
+                self._replay_spool()
+
+    def _replay_spool(self):
+        """
+        Dosyła zaległe zdarzenia z dysku: zawsze jedno, a dalej w pętli, dopóki
+        API żyje i nie czekają nowe zdarzenia (bieżące mają pierwszeństwo),
+        najwyżej replay_batch zdarzeń i replay_budget sekund.
+        """
+        deadline = time.monotonic() + self.replay_budget
+        for replayed in range(self.replay_batch):
+            if replayed and (not self._queue.empty() or time.monotonic() > deadline):
+                return
+            if self._stop.is_set() or self._api_down():
+                return
+            path, spooled = self.spool.peek()
+            if path is None or not self._deliver(spooled, 1):
+                return
+            self.spool.remove(path)
+            self.replayed += 1
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "spooled": len(self.spool),
+            "sent": self.sent,
+            "retried": self.retried,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "api_down": self._api_down(),
+        }
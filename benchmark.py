@@ -0,0 +1,494 @@
+# benchmark.py
+"""
+Pomiary wydajności poszczególnych elementów systemu.
+
+Użycie:
+    python benchmark.py compiled [--weights model.h5] [--batch 1 4 8] [--iters 50]
+    python benchmark.py upload [--events 50] [--delay 0.2] [--outage 2.0]
+    python benchmark.py sensor [--polls 200]
+    python benchmark.py multicam [--weights model.h5] [--cameras 1 2 4] [--faces 1] [--iters 20]
+    python benchmark.py boxes [--boxes 5 20 100] [--iters 200]
+    python benchmark.py cache [--frames 200] [--noise 2.0]
+    python benchmark.py gallery [--sizes 10000 100000 400000] [--nprobe 8] [--k 5] [--iters 50]
+    python benchmark.py align [--faces 1 4 8] [--iters 200]
+    python benchmark.py preprocess [--faces 1 4 8] [--iters 200]
+    python benchmark.py detect --images DIR [--backends mtcnn yunet ssd haar] [--yunet-model M.onnx]
+                               [--ssd-model M.caffemodel --ssd-config deploy.prototxt] [--width 640]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def _timeit(fn, iters: int, warmup: int = 3):
+    """ Zwraca medianę i p95 czasu wykonania fn() w milisekundach. """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(times)), float(np.percentile(times, 95))
+
+
+def _build_facenet(weights: str):
+    from facenet import InceptionResNetV1
+
+    model = InceptionResNetV1(dimension=128)
+    if weights and os.path.exists(weights):
+        model.load_weights(weights)
+    else:
+        print(f"Brak pliku wag '{weights}' - mierzę na losowych wagach.")
+    return model
+
+
+def bench_compiled(args):
+    """ Eager `model(x, training=False)` vs CompiledFaceModel.predict_batch. """
+    from compiled_model import CompiledFaceModel
+
+    model = _build_facenet(args.weights)
+    compiled = CompiledFaceModel(model)
+    compiled.warmup(batch_sizes=args.batch)
+
+    print(f"{'batch':>5} | {'eager med/p95 [ms]':>20} | {'compiled med/p95 [ms]':>22} | {'speedup':>7}")
+    for batch_size in args.batch:
+        x = np.random.rand(batch_size, 160, 160, 3).astype(np.float32)
+        eager = _timeit(lambda: model(x, training=False).numpy(), args.iters)
+        graph = _timeit(lambda: compiled.predict_batch(x), args.iters)
+        print(f"{batch_size:>5} | {eager[0]:>9.1f} / {eager[1]:>8.1f} | "
+              f"{graph[0]:>10.1f} / {graph[1]:>9.1f} | {eager[0] / graph[0]:>6.2f}x")
+
+
+class _StandInApiHandler(BaseHTTPRequestHandler):
+    """ Lokalny zastępnik API: opóźnienie odpowiedzi i okno awarii (503). """
+    delay = 0.0
+    down_until = 0.0
+    received = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if time.time() < type(self).down_until:
+            self.send_response(503)
+            self.end_headers()
+            return
+        time.sleep(type(self).delay)
+        type(self).received += 1
+        body = b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_stand_in_server(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def bench_upload(args):
+    """ Czas blokowania pętli: send_embedding vs AsyncEmbeddingSender.submit, z awarią API. """
+    from api_notifier import AsyncEmbeddingSender, build_payload, send_embedding
+
+    handler = type("Handler", (_StandInApiHandler,), {"delay": args.delay})
+    server, url = _start_stand_in_server(handler)
+    embedding = np.random.rand(128).astype(np.float32)
+    photo = "x" * 50_000
+
+    blocking = _timeit(lambda: send_embedding(url, "1", "cam", embedding, time.time(), photo), 5, warmup=1)
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        results = []
+        sender = AsyncEmbeddingSender(
+            url, on_result=lambda payload, status, resp: results.append(status),
+            spool_dir=spool_dir, backoff_base=0.1, backoff_max=1.0,
+        ).start()
+
+        # API "pada" na args.outage sekund - zdarzenia mają trafić na dysk i wrócić
+        handler.down_until = time.time() + args.outage
+        submit_times = []
+        for i in range(args.events):
+            start = time.perf_counter()
+            sender.submit(build_payload("1", "cam", embedding, time.time(), photo))
+            submit_times.append((time.perf_counter() - start) * 1000.0)
+
+        deadline = time.time() + args.outage + args.events * args.delay + 30
+        while len(results) < args.events and time.time() < deadline:
+            time.sleep(0.1)
+        stats = sender.stats()
+        sender.stop()
+    server.shutdown()
+
+    print(f"send_embedding (blokujące):   mediana {blocking[0]:.1f} ms, p95 {blocking[1]:.1f} ms")
+    print(f"AsyncEmbeddingSender.submit:  mediana {np.median(submit_times):.3f} ms, "
+          f"max {np.max(submit_times):.3f} ms")
+    print(f"dostarczono {len(results)}/{args.events} zdarzeń, statystyki: {stats}")
+
+
+class _MockSensorHandler(BaseHTTPRequestHandler):
+    """ Lokalny czujnik w stylu Loxone: GET /jdev/sps/io/Motion/state. """
+    protocol_version = "HTTP/1.1"  # keep-alive jak w prawdziwym sterowniku
+    wbufsize = -1                  # nagłówki i treść w jednym segmencie TCP
+    disable_nagle_algorithm = True
+    value = "1"
+
+    def do_GET(self):
+        body = ('{"LL": {"control": "jdev/sps/io/Motion/state", "value": "%s", "Code": "200"}}'
+                % type(self).value).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_sensor(args):
+    """ Odpytanie czujnika: nowe requests.get na tick vs SensorClient z keep-alive. """
+    import requests
+    from requests.auth import HTTPBasicAuth
+    from sensor_client import SensorClient
+
+    server, url = _start_stand_in_server(_MockSensorHandler)
+    url += "jdev/sps/io/Motion/state"
+
+    def poll_without_pool():
+        r = requests.get(url, auth=HTTPBasicAuth("user", "pass"), timeout=3)
+        r.raise_for_status()
+        return r.json().get("LL", {}).get("value") == "1"
+
+    client = SensorClient(url, "user", "pass")
+    old = _timeit(poll_without_pool, args.polls)
+    new = _timeit(client.is_motion, args.polls)
+    client.close()
+    server.shutdown()
+
+    print(f"requests.get na tick:    mediana {old[0]:.3f} ms, p95 {old[1]:.3f} ms")
+    print(f"SensorClient keep-alive: mediana {new[0]:.3f} ms, p95 {new[1]:.3f} ms ({old[0] / new[0]:.1f}x)")
+
+
+def bench_multicam(args):
+    """
+    N kamer na jednym modelu: embed osobno dla klatki z każdej kamery vs jeden
+    batch z twarzami ze wszystkich kamer (jak etap embed w main.build_pipeline).
+    """
+    from compiled_model import CompiledFaceModel
+
+    model = _build_facenet(args.weights)
+    compiled = CompiledFaceModel(model)
+    batch_sizes = sorted({args.faces} | {cameras * args.faces for cameras in args.cameras})
+    compiled.warmup(batch_sizes=batch_sizes)
+    weights_mb = sum(w.size * w.dtype.itemsize for w in model.get_weights()) / 2 ** 20
+
+    print(f"Wagi modelu: {weights_mb:.1f} MB - jeden proces na kamerę trzyma je N razy, tryb CAMERAS raz.")
+    print(f"{'kamery':>6} | {'per klatka [ms]':>15} | {'batch [ms]':>10} | {'twarze/s per/batch':>19}")
+    for cameras in args.cameras:
+        frames = [np.random.rand(args.faces, 160, 160, 3).astype(np.float32) for _ in range(cameras)]
+        joined = np.concatenate(frames)
+        per_frame = _timeit(lambda: [compiled.predict_batch(x) for x in frames], args.iters)
+        batched = _timeit(lambda: compiled.predict_batch(joined), args.iters)
+        faces = cameras * args.faces
+        print(f"{cameras:>6} | {per_frame[0]:>15.1f} | {batched[0]:>10.1f} | "
+              f"{faces / per_frame[0] * 1000:>8.0f} / {faces / batched[0] * 1000:<8.0f}")
+
+
+def bench_boxes(args):
+    """
+    Macierz IoU N x N: pętla po BoundingBox.iou vs BoundingBoxArray.iou
+    oraz pamięć i koszt utworzenia BoundingBox vs CompactBoundingBox.
+    """
+    from bounding_box import BoundingBox, BoundingBoxArray, CompactBoundingBox
+
+    rng = np.random.default_rng(0)
+    print(f"{'boxes':>5} | {'BoundingBox [ms]':>16} | {'BoundingBoxArray [ms]':>21} | {'speedup':>7}")
+    for count in args.boxes:
+        xy = rng.integers(0, 1000, size=(count, 2))
+        wh = rng.integers(20, 200, size=(count, 2))
+        boxes = [BoundingBox([int(x), int(y), int(x + w), int(y + h)]) for (x, y), (w, h) in zip(xy, wh)]
+
+        scalar = _timeit(lambda: [[a.iou(b) for b in boxes] for a in boxes], args.iters)
+        vectorized = _timeit(lambda: BoundingBoxArray.from_boxes(boxes).iou(), args.iters)
+        print(f"{count:>5} | {scalar[0]:>16.3f} | {vectorized[0]:>21.3f} | {scalar[0] / vectorized[0]:>6.1f}x")
+
+    for box_type in (BoundingBox, CompactBoundingBox):
+        tracemalloc.start()
+        boxes = [box_type([10, 20, 110, 140]) for _ in range(10000)]
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        created = _timeit(lambda: [box_type([10, 20, 110, 140]).area for _ in range(1000)], args.iters // 10 or 1)
+        print(f"{box_type.__name__:>18}: {used / len(boxes):.0f} B/box, 1000 x (utworzenie + area) {created[0]:.3f} ms")
+
+
+def bench_gallery(args):
+    """
+    Wyszukiwanie top-k w lokalnej galerii: dokładne (flat) vs IvfIndex.
+    Dane: po dwa zaszumione embeddingi na osobę, zapytania to kolejne ujęcia
+    zarejestrowanych osób. recall@k liczony względem wyszukiwania dokładnego.
+    """
+    from gallery import EmbeddingGallery
+
+    rng = np.random.default_rng(0)
+    print(f"{'wiersze':>7} | {'flat med [ms]':>13} | {'ivf med [ms]':>12} | {'recall@1':>8} | {'recall@' + str(args.k):>8}")
+    for size in args.sizes:
+        people = rng.normal(size=(size // 2, 128))
+        embeddings = np.concatenate([people + 0.3 * rng.normal(size=people.shape) for _ in range(2)])
+        queries = (people[:args.queries] + 0.3 * rng.normal(size=(min(args.queries, len(people)), 128))).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as directory:
+            gallery = EmbeddingGallery(directory, index="ivf", nprobe=args.nprobe, index_min_size=0)
+            gallery.replace_all((f"p{i % len(people)}", e) for i, e in enumerate(embeddings))
+            flat = _timeit(lambda: gallery.search(queries[0], k=args.k, exact=True), args.iters)
+            ivf = _timeit(lambda: gallery.search(queries[0], k=args.k), args.iters)
+            recall_1 = gallery.recall_at_k(queries, 1)
+            recall_k = gallery.recall_at_k(queries, args.k)
+            gallery = None
+        print(f"{size:>7} | {flat[0]:>13.3f} | {ivf[0]:>12.3f} | {recall_1:>8.3f} | {recall_k:>8.3f}")
+
+
+def bench_cache(args):
+    """
+    Koszt klucza EmbeddingCache (dHash + bbox) i trafienia dla tej samej twarzy
+    z szumem sensora; przy trafieniu FaceNet nie jest wołany.
+    """
+    import cv2
+    from bounding_box import CompactBoundingBox
+    from embedding_cache import EmbeddingCache
+
+    rng = np.random.default_rng(0)
+    face = cv2.GaussianBlur(rng.integers(0, 255, size=(200, 200, 3), dtype=np.uint8), (0, 0), 6)
+    bbox = CompactBoundingBox([100, 80, 300, 280])
+    cache = EmbeddingCache(max_size=256, ttl=60.0)
+
+    frames = [np.clip(face + rng.normal(0, args.noise, face.shape), 0, 255).astype(np.uint8)
+              for _ in range(args.frames)]
+    key_ms = _timeit(lambda: cache.key(frames[0], bbox), 200)
+    for frame in frames:
+        key = cache.key(frame, bbox)
+        if cache.get(key) is None:
+            cache.put(key, np.zeros(128, dtype=np.float32))
+    print(f"Klucz (dHash 9x8 + bbox): mediana {key_ms[0] * 1000:.1f} us")
+    print(f"Szum sigma={args.noise}: {cache.stats()}")
+
+
+def bench_align(args):
+    """
+    Wycinki dla FaceNet z jednej klatki 720p: prostokąt bboxa + resize do
+    160x160 vs wyrównanie po 5 punktach (FaceAligner, jedna paczka na klatkę).
+    """
+    import cv2
+    from face_alignment import FaceAligner, KEYPOINT_NAMES
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, size=(720, 1280, 3), dtype=np.uint8)
+    aligner = FaceAligner()
+
+    print(f"{'twarzy':>6} | {'crop+resize [ms]':>16} | {'align [ms]':>10}")
+    for count in args.faces:
+        keypoints, boxes = [], []
+        for i in range(count):
+            # Twarz ~200 px, lekko obrócona, w różnych miejscach kadru
+            angle = np.deg2rad(rng.uniform(-20, 20))
+            rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]) * 1.4
+            points = aligner.template @ rotation.T + [100 + 250 * (i % 4), 100 + 250 * (i // 4 % 2)]
+            keypoints.append({name: tuple(p) for name, p in zip(KEYPOINT_NAMES, points)})
+            x1, y1 = points.min(axis=0).astype(int) - 40
+            boxes.append((max(0, x1), max(0, y1), x1 + 200, y1 + 220))
+
+        crop = _timeit(lambda: [cv2.resize(frame[y1:y2, x1:x2], (160, 160)) for x1, y1, x2, y2 in boxes], args.iters)
+        align = _timeit(lambda: aligner.align(frame, keypoints), args.iters)
+        print(f"{count:>6} | {crop[0]:>16.3f} | {align[0]:>10.3f}")
+
+
+def bench_preprocess(args):
+    """
+    Przygotowanie batcha dla FaceNet: resize + normalize_input + np.stack
+    vs FacePreprocessor (gotowy bufor, resize do slotu, normalizacja w miejscu).
+    Pamięć to suma alokacji (tracemalloc) na jedno wywołanie.
+    """
+    import cv2
+    from face_preprocessing import FacePreprocessor
+    from utils import normalize_input
+
+    rng = np.random.default_rng(0)
+    preprocessor = FacePreprocessor(max_batch_size=max(args.faces))
+    print(f"{'twarzy':>6} | {'stare [ms]':>10} | {'stare [kB]':>10} | {'bufor [ms]':>10} | {'bufor [kB]':>10}")
+    for count in args.faces:
+        faces = [rng.integers(0, 255, size=(180 + 7 * i, 150 + 5 * i, 3), dtype=np.uint8) for i in range(count)]
+
+        def old():
+            return np.stack([normalize_input(cv2.resize(f, (160, 160)), "base") for f in faces]).astype(np.float32)
+
+        results = []
+        for fn in (old, lambda: preprocessor.fill(faces)):
+            timing = _timeit(fn, args.iters)
+            tracemalloc.start()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append((timing[0], peak / 1024))
+        print(f"{count:>6} | {results[0][0]:>10.3f} | {results[0][1]:>10.1f} | {results[1][0]:>10.3f} | {results[1][1]:>10.1f}")
+
+
+def _load_frames(paths, width: int):
+    """ Obrazy RGB z plików / katalogów, przeskalowane do szerokości `width` (0 = bez zmian). """
+    import cv2
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)))
+        else:
+            files.append(path)
+
+    frames = []
+    for file in files:
+        image = cv2.imread(file)
+        if image is None:
+            continue
+        if width and image.shape[1] != width:
+            image = cv2.resize(image, (width, int(image.shape[0] * width / image.shape[1])),
+                               interpolation=cv2.INTER_AREA)
+        frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    return frames
+
+
+def bench_detect(args):
+    """
+    Detektory twarzy na tych samych klatkach: czas per klatka oraz recall
+    względem detektora referencyjnego (domyślnie pierwszego z listy) - twarz
+    referencyjna jest znaleziona, gdy jakiś bbox ma z nią IoU >= --iou.
+    "extra" to bboxy bez odpowiednika w referencji (fałszywe albo pominięte przez nią).
+    """
+    from bounding_box import CompactBoundingBox
+    from face_detectors import create_detector
+
+    frames = _load_frames(args.images, args.width)
+    if not frames:
+        print("Brak obrazów do pomiaru.")
+        return
+
+    options = {
+        "yunet": {"model": args.yunet_model},
+        "ssd": {"model": args.ssd_model, "config": args.ssd_config},
+    }
+    results = {}
+    for backend in args.backends:
+        try:
+            detector = create_detector(dict(options.get(backend, {}), backend=backend, threshold=args.threshold),
+                                       fallback=False)
+        except Exception as e:
+            print(f"{backend}: pominięty ({e})")
+            continue
+        detector.detect_faces(frames[0])  # rozgrzanie
+        times, boxes = [], []
+        for frame in frames:
+            start = time.perf_counter()
+            detections = detector.detect_faces(frame)
+            times.append((time.perf_counter() - start) * 1000.0)
+            boxes.append([CompactBoundingBox.from_box(det["bbox"]) for det in detections])
+        results[backend] = (times, boxes)
+    if not results:
+        return
+
+    reference = args.reference if args.reference in results else next(iter(results))
+    reference_boxes = results[reference][1]
+    total = sum(len(frame_boxes) for frame_boxes in reference_boxes)
+    print(f"{len(frames)} klatek, {total} twarzy wg '{reference}'")
+    print(f"{'detektor':>8} | {'med [ms]':>8} | {'p95 [ms]':>8} | {'twarzy':>6} | {'recall':>6} | {'extra':>5}")
+    for backend, (times, boxes) in results.items():
+        found = extra = 0
+        for ref_boxes, det_boxes in zip(reference_boxes, boxes):
+            matched = {i for i, ref in enumerate(ref_boxes) if any(ref.iou(det) >= args.iou for det in det_boxes)}
+            found += len(matched)
+            extra += sum(1 for det in det_boxes if all(ref.iou(det) < args.iou for ref in ref_boxes))
+        recall = found / total if total else 0.0
+        print(f"{backend:>8} | {np.median(times):>8.2f} | {np.percentile(times, 95):>8.2f} | "
+              f"{sum(map(len, boxes)):>6} | {recall:>6.3f} | {extra:>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarki FaceRecognition")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("compiled", help="eager vs tf.function dla FaceNet")
+    p.add_argument("--weights", default="model.h5")
+    p.add_argument("--batch", type=int, nargs="+", default=[1, 4, 8])
+    p.add_argument("--iters", type=int, default=50)
+    p.set_defaults(func=bench_compiled)
+
+    p = sub.add_parser("upload", help="blokująca vs asynchroniczna wysyłka do lokalnego API")
+    p.add_argument("--events", type=int, default=50)
+    p.add_argument("--delay", type=float, default=0.2, help="opóźnienie odpowiedzi API [s]")
+    p.add_argument("--outage", type=float, default=2.0, help="czas awarii API na starcie [s]")
+    p.set_defaults(func=bench_upload)
+
+    p = sub.add_parser("sensor", help="odpytanie czujnika z i bez puli połączeń")
+    p.add_argument("--polls", type=int, default=200)
+    p.set_defaults(func=bench_sensor)
+
+    p = sub.add_parser("multicam", help="embed per kamera vs wspólny batch z wielu kamer")
+    p.add_argument("--weights", default="model.h5")
+    p.add_argument("--cameras", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--faces", type=int, default=1, help="twarzy na klatkę")
+    p.add_argument("--iters", type=int, default=20)
+    p.set_defaults(func=bench_multicam)
+
+    p = sub.add_parser("boxes", help="IoU parami i pamięć: BoundingBox vs BoundingBoxArray / CompactBoundingBox")
+    p.add_argument("--boxes", type=int, nargs="+", default=[5, 20, 100])
+    p.add_argument("--iters", type=int, default=200)
+    p.set_defaults(func=bench_boxes)
+
+    p = sub.add_parser("cache", help="klucz i trafienia cache embeddingów")
+    p.add_argument("--frames", type=int, default=200)
+    p.add_argument("--noise", type=float, default=2.0)
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser("gallery", help="wyszukiwanie w lokalnej galerii: dokładne vs IVF")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 400000])
+    p.add_argument("--nprobe", type=int, default=8)
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--iters", type=int, default=50)
+    p.set_defaults(func=bench_gallery)
+
+    p = sub.add_parser("align", help="wycinek bboxa + resize vs wyrównanie po punktach")
+    p.add_argument("--faces", type=int, nargs="+", default=[1, 4, 8])
+    p.add_argument("--iters", type=int, default=200)
+    p.set_defaults(func=bench_align)
+
+    p = sub.add_parser("preprocess", help="przygotowanie wejścia FaceNet: z alokacją vs gotowy bufor")
+    p.add_argument("--faces", type=int, nargs="+", default=[1, 4, 8])
+    p.add_argument("--iters", type=int, default=200)
+    p.set_defaults(func=bench_preprocess)
+
+    p = sub.add_parser("detect", help="detektory twarzy: czas i recall względem referencji")
+    p.add_argument("--images", nargs="+", required=True, help="pliki lub katalogi z klatkami")
+    p.add_argument("--backends", nargs="+", default=["mtcnn", "yunet", "ssd", "haar"])
+    p.add_argument("--reference", default=None, help="detektor referencyjny (domyślnie pierwszy działający)")
+    p.add_argument("--yunet-model", default="face_detection_yunet_2023mar.onnx")
+    p.add_argument("--ssd-model", default="res10_300x300_ssd_iter_140000.caffemodel")
+    p.add_argument("--ssd-config", default="deploy.prototxt")
+    p.add_argument("--threshold", type=float, default=0.6)
+    p.add_argument("--iou", type=float, default=0.5)
+    p.add_argument("--width", type=int, default=640, help="szerokość klatek (0 = oryginalna)")
+    p.set_defaults(func=bench_detect)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
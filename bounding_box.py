@@ -2,6 +2,7 @@ from typing import Tuple, Dict, Union, List
 import math
 
 import cv2
+import numpy as np
 
 
 class BoundingBox:
@@ -38,27 +39,29 @@ class BoundingBox:
         return math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
      
     def iou(self, bbox: Union['BoundingBox', List[Union[int, float]]]):
-        if isinstance(bbox, type(self)):
-            function = self.intersection_area_class
-            area_b = bbox.area
-        elif isinstance(bbox, list):
+        if isinstance(bbox, list):
             function = self.intersection_area_list
             area_b = bbox[2] * bbox[3]
+        elif hasattr(bbox, "area"):
+            function = self.intersection_area_class
+            area_b = bbox.area
         else:
-            raise("The type of bbox isn't support")
-        area_b = bbox.area
+            raise TypeError(f"The type of bbox isn't support: {type(bbox)}")
         intersection_area = function(bbox)
-        iou = intersection_area / float(self.area + area_b - intersection_area)
+        union = float(self.area + area_b - intersection_area)
+        if union <= 0:
+            return 0.0
+        iou = intersection_area / union
         
         return iou
     
     def intersection_area(self, bbox: Union['BoundingBox', List[Union[int, float]]]):
-        if isinstance(bbox, type(self)):
-            function = self.intersection_area_class
-        elif isinstance(bbox, list):
+        if isinstance(bbox, list):
             function = self.intersection_area_list
+        elif hasattr(bbox, "x2"):
+            function = self.intersection_area_class
         else:
-            raise(f"The type of bbox isn't support: {bbox}, type: {type(bbox)}")
+            raise TypeError(f"The type of bbox isn't support: {bbox}, type: {type(bbox)}")
         return(function(bbox))
         
     def intersection_area_list(self, bbox: List[Union[int, float]]) -> float:
@@ -72,7 +75,7 @@ class BoundingBox:
         y_bottom = min(self.y2, bbox[1] + bbox[3])
 
         if x_right < x_left or y_bottom < y_top:
-            return 0.0, 0.0, 0.0
+            return 0.0
 
         intersection_area = (x_right - x_left) * (y_bottom - y_top)
 
@@ -111,6 +114,7 @@ class BoundingBox:
         self.y1 += dy
         self.x2 += dx
         self.y2 += dy
+        self.create_params()
 
     def overlap(self, other_bbox: 'BoundingBox') -> bool:
         """Check if the current bounding box overlaps with another."""
@@ -184,8 +188,7 @@ class BoundingBox:
         self.y1 /= image_height
         self.x2 /= image_width
         self.y2 /= image_height
-        self.width /= image_width
-        self.height /= image_height
+        self.create_params()
 
     def get_corners(self) -> list[Tuple[int, int]]:
         """Get the coordinates of the four corners of the bounding box."""
@@ -216,4 +219,361 @@ class BoundingBox:
     @classmethod
     def from_xywh(cls, bbox: List[Union[int, float]]) -> 'BoundingBox':
         """Create a BoundingBox instance from a fiftyone xywh."""
-        return cls([int(bbox[0]), int(bbox[1]), int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3])])
\ No newline at end of file
+        return cls([int(bbox[0]), int(bbox[1]), int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3])])
+
+
+
+_set_slot = object.__setattr__
+
+
+class CompactBoundingBox:
+    """
+    Slotted [x1, y1, x2, y2] box, immutable by default.
+
+    Derived fields (width, height, area, center) are computed on first access
+    and cached, instead of being stored in a per-instance __dict__ up front.
+    Geometry methods return new boxes, so cached values can never go stale.
+    With frozen=False coordinates may be assigned directly, which drops the cache.
+    """
+
+    __slots__ = ("x1", "y1", "x2", "y2", "_frozen", "_derived")
+
+    def __init__(self, bbox, frozen: bool = True):
+        _set_slot(self, "x1", bbox[0])
+        _set_slot(self, "y1", bbox[1])
+        _set_slot(self, "x2", bbox[2])
+        _set_slot(self, "y2", bbox[3])
+        _set_slot(self, "_frozen", frozen)
+        _set_slot(self, "_derived", None)
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"{type(self).__name__} is frozen; use translate/resize/... for a new box")
+        if name not in ("x1", "y1", "x2", "y2"):
+            raise AttributeError(f"Cannot set '{name}'")
+        _set_slot(self, name, value)
+        _set_slot(self, "_derived", None)
+
+    def _compute_derived(self):
+        """Compute (width, height, area, center) once, on first access."""
+        width = self.x2 - self.x1
+        height = self.y2 - self.y1
+        derived = (width, height, width * height, (int(self.x1 + width / 2), int(self.y1 + height / 2)))
+        _set_slot(self, "_derived", derived)
+        return derived
+
+    def __str__(self):
+        return f"x1: {self.x1} y1: {self.y1} width: {self.width} height: {self.height} area: {self.area}"
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_xyxy()})"
+
+    def __eq__(self, other):
+        if not hasattr(other, "to_xyxy"):
+            return NotImplemented
+        return self.to_xyxy() == list(other.to_xyxy())
+
+    def __hash__(self):
+        if not self._frozen:
+            raise TypeError("Unhashable: box is not frozen")
+        return hash((self.x1, self.y1, self.x2, self.y2))
+
+    @classmethod
+    def from_box(cls, bbox, frozen: bool = True) -> 'CompactBoundingBox':
+        """Create from a BoundingBox (or anything with to_xyxy())."""
+        return cls(bbox.to_xyxy(), frozen=frozen)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> 'CompactBoundingBox':
+        return cls([data['x1'], data['y1'], data['x1'] + data['width'], data['y1'] + data['height']])
+
+    @classmethod
+    def from_xywh(cls, bbox: List[Union[int, float]]) -> 'CompactBoundingBox':
+        return cls([int(bbox[0]), int(bbox[1]), int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3])])
+
+    def to_bounding_box(self) -> BoundingBox:
+        """Mutable BoundingBox copy (legacy API)."""
+        return BoundingBox(self.to_xyxy())
+
+    @property
+    def width(self):
+        return (self._derived or self._compute_derived())[0]
+
+    @property
+    def height(self):
+        return (self._derived or self._compute_derived())[1]
+
+    @property
+    def area(self):
+        return (self._derived or self._compute_derived())[2]
+
+    @property
+    def aspect_ratio(self) -> float:
+        return self.width / self.height if self.height else float('inf')
+
+    @property
+    def perimeter(self) -> float:
+        return 2 * (self.width + self.height)
+
+    def to_xyxy(self) -> list:
+        return [self.x1, self.y1, self.x2, self.y2]
+
+    def to_xywh(self) -> list:
+        return [self.x1, self.y1, self.width, self.height]
+
+    def to_xcyc(self) -> tuple:
+        """Return the center (x_center, y_center), same integer rounding as BoundingBox."""
+        return (self._derived or self._compute_derived())[3]
+
+    def to_dict(self) -> Dict[str, float]:
+        return {'x1': self.x1, 'y1': self.y1, 'width': self.width, 'height': self.height}
+
+    def to_fiftyone(self, image_width: int, image_height: int) -> list:
+        return [self.x1 / image_width, self.y1 / image_height, self.width / image_width, self.height / image_height]
+
+    def to_yolov5(self, image_width: int, image_height: int) -> list:
+        return [
+            (self.x1 + self.width / 2) / image_width,
+            (self.y1 + self.height / 2) / image_height,
+            self.width / image_width,
+            self.height / image_height
+        ]
+
+    def calc_dist(self, bbox) -> float:
+        """Distance between centers."""
+        x1, y1 = self.to_xcyc()
+        x2, y2 = bbox.to_xcyc()
+        return math.hypot(x2 - x1, y2 - y1)
+
+    def intersection_area(self, bbox) -> float:
+        """Intersection area with a box (anything with x1..y2) or a [x1, y1, width, height] list."""
+        if isinstance(bbox, (list, tuple)):
+            bx1, by1, bx2, by2 = bbox[0], bbox[1], bbox[0] + bbox[2], bbox[1] + bbox[3]
+        else:
+            bx1, by1, bx2, by2 = bbox.x1, bbox.y1, bbox.x2, bbox.y2
+        w = min(self.x2, bx2) - max(self.x1, bx1)
+        h = min(self.y2, by2) - max(self.y1, by1)
+        return w * h if w > 0 and h > 0 else 0.0
+
+    def iou(self, bbox) -> float:
+        area_b = bbox[2] * bbox[3] if isinstance(bbox, (list, tuple)) else bbox.area
+        intersection = self.intersection_area(bbox)
+        union = self.area + area_b - intersection
+        return intersection / float(union) if union > 0 else 0.0
+
+    def overlap(self, other_bbox) -> bool:
+        return not (self.x2 < other_bbox.x1 or self.x1 > other_bbox.x2 or
+                    self.y2 < other_bbox.y1 or self.y1 > other_bbox.y2)
+
+    def is_fully_overlap(self, other_bbox) -> bool:
+        return other_bbox.x1 <= self.x1 and other_bbox.y1 <= self.y1 and \
+            self.x2 <= other_bbox.x2 and self.y2 <= other_bbox.y2
+
+    def contains(self, point: Tuple[int, int]) -> bool:
+        x, y = point
+        return self.x1 <= x <= self.x2 and self.y1 <= y <= self.y2
+
+    def translate(self, dx, dy) -> 'CompactBoundingBox':
+        return type(self)([self.x1 + dx, self.y1 + dy, self.x2 + dx, self.y2 + dy], frozen=self._frozen)
+
+    def resize(self, scale_factor: float = 1.0, new_size: Tuple[int, int] = None) -> 'CompactBoundingBox':
+        """Keep the top-left corner, scale the size (or set it to new_size)."""
+        width, height = new_size if new_size else (self.width * scale_factor, self.height * scale_factor)
+        return type(self)([self.x1, self.y1, self.x1 + width, self.y1 + height], frozen=self._frozen)
+
+    def scale(self, scale_x: float, scale_y: float = None) -> 'CompactBoundingBox':
+        """Scale all coordinates (e.g. downscaled frame -> full frame)."""
+        scale_y = scale_x if scale_y is None else scale_y
+        return type(self)([self.x1 * scale_x, self.y1 * scale_y, self.x2 * scale_x, self.y2 * scale_y],
+                          frozen=self._frozen)
+
+    def clip(self, image_width: int, image_height: int) -> 'CompactBoundingBox':
+        return type(self)([min(max(self.x1, 0), image_width), min(max(self.y1, 0), image_height),
+                           min(max(self.x2, 0), image_width), min(max(self.y2, 0), image_height)],
+                          frozen=self._frozen)
+
+    def expand(self, margin_x: float, margin_y: float = None) -> 'CompactBoundingBox':
+        """Grow each side by a fraction of the box size (e.g. 0.5 -> twice as wide and tall)."""
+        margin_y = margin_x if margin_y is None else margin_y
+        dx, dy = self.width * margin_x, self.height * margin_y
+        return type(self)([self.x1 - dx, self.y1 - dy, self.x2 + dx, self.y2 + dy], frozen=self._frozen)
+
+    def union(self, bbox) -> 'CompactBoundingBox':
+        """Smallest box containing both boxes."""
+        return type(self)([min(self.x1, bbox.x1), min(self.y1, bbox.y1),
+                           max(self.x2, bbox.x2), max(self.y2, bbox.y2)], frozen=self._frozen)
+
+    def intersection(self, bbox) -> 'CompactBoundingBox':
+        """Common part of both boxes; zero-sized (x2 == x1 or y2 == y1) when they do not overlap."""
+        x1, y1 = max(self.x1, bbox.x1), max(self.y1, bbox.y1)
+        return type(self)([x1, y1, max(x1, min(self.x2, bbox.x2)), max(y1, min(self.y2, bbox.y2))],
+                          frozen=self._frozen)
+
+    def normalize(self, image_width: int, image_height: int) -> 'CompactBoundingBox':
+        """Coordinates relative to image size; width, height and area follow."""
+        return self.scale(1.0 / image_width, 1.0 / image_height)
+
+    def crop_rect(self, image):
+        return image[int(self.y1):int(self.y2), int(self.x1):int(self.x2)]
+
+    def draw_on_image(self, image, color: Tuple[int, int, int] = [255, 0, 0], thickness: int = 2):
+        cv2.rectangle(image, (int(self.x1), int(self.y1)), (int(self.x2), int(self.y2)), color, thickness)
+
+
+class BoundingBoxArray:
+    """
+    N bounding boxes as one float64 (N, 4) array in [x1, y1, x2, y2] format.
+
+    Vectorized counterpart of BoundingBox: pairwise IoU / distance matrices,
+    NMS, clipping and scaling run as NumPy operations instead of Python calls
+    per pair of boxes.
+    """
+
+    def __init__(self, xyxy=None):
+        xyxy = np.zeros((0, 4)) if xyxy is None else np.asarray(xyxy, dtype=np.float64)
+        if xyxy.ndim == 1:
+            xyxy = xyxy.reshape(-1, 4)
+        if xyxy.ndim != 2 or xyxy.shape[1] != 4:
+            raise ValueError(f"Expected an (N, 4) array, got shape {xyxy.shape}")
+        self.xyxy = xyxy
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    def __getitem__(self, index) -> 'BoundingBoxArray':
+        return BoundingBoxArray(self.xyxy[index])
+
+    def __iter__(self):
+        return iter(self.to_boxes())
+
+    def __str__(self):
+        return f"BoundingBoxArray({len(self)} boxes)"
+
+    @classmethod
+    def from_boxes(cls, boxes: List[BoundingBox]) -> 'BoundingBoxArray':
+        """Create an array from a list of BoundingBox instances."""
+        return cls([box.to_xyxy() for box in boxes])
+
+    @classmethod
+    def from_xywh(cls, xywh) -> 'BoundingBoxArray':
+        """Create an array from [x1, y1, width, height] rows."""
+        xywh = np.asarray(xywh, dtype=np.float64).reshape(-1, 4)
+        return cls(np.concatenate([xywh[:, :2], xywh[:, :2] + xywh[:, 2:]], axis=1))
+
+    def to_boxes(self, box_type=BoundingBox) -> list:
+        """Convert back to a list of boxes (integer pixel coordinates), BoundingBox by default."""
+        return [box_type([int(v) for v in row]) for row in np.rint(self.xyxy)]
+
+    @property
+    def x1(self) -> np.ndarray:
+        return self.xyxy[:, 0]
+
+    @property
+    def y1(self) -> np.ndarray:
+        return self.xyxy[:, 1]
+
+    @property
+    def x2(self) -> np.ndarray:
+        return self.xyxy[:, 2]
+
+    @property
+    def y2(self) -> np.ndarray:
+        return self.xyxy[:, 3]
+
+    @property
+    def widths(self) -> np.ndarray:
+        return self.x2 - self.x1
+
+    @property
+    def heights(self) -> np.ndarray:
+        return self.y2 - self.y1
+
+    @property
+    def areas(self) -> np.ndarray:
+        return self.widths * self.heights
+
+    @property
+    def centers(self) -> np.ndarray:
+        """Return (N, 2) array of box centers."""
+        return (self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2
+
+    def intersection_areas(self, other: 'BoundingBoxArray') -> np.ndarray:
+        """Return (N, M) matrix of intersection areas with the boxes of `other`."""
+        top_left = np.maximum(self.xyxy[:, None, :2], other.xyxy[None, :, :2])
+        bottom_right = np.minimum(self.xyxy[:, None, 2:], other.xyxy[None, :, 2:])
+        sizes = np.clip(bottom_right - top_left, 0, None)
+        return sizes[..., 0] * sizes[..., 1]
+
+    def iou(self, other: 'BoundingBoxArray' = None) -> np.ndarray:
+        """Return (N, M) IoU matrix with `other` (or (N, N) with itself)."""
+        other = self if other is None else other
+        intersection = self.intersection_areas(other)
+        union = self.areas[:, None] + other.areas[None, :] - intersection
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(union > 0, intersection / union, 0.0)
+
+    def overlap(self, other: 'BoundingBoxArray' = None) -> np.ndarray:
+        """Return (N, M) boolean matrix, True where boxes touch or overlap."""
+        other = self if other is None else other
+        return ~((self.x2[:, None] < other.x1[None, :]) | (self.x1[:, None] > other.x2[None, :]) |
+                 (self.y2[:, None] < other.y1[None, :]) | (self.y1[:, None] > other.y2[None, :]))
+
+    def calc_dist(self, other: 'BoundingBoxArray' = None) -> np.ndarray:
+        """Return (N, M) matrix of distances between box centers."""
+        other = self if other is None else other
+        diff = self.centers[:, None, :] - other.centers[None, :, :]
+        return np.sqrt((diff ** 2).sum(axis=-1))
+
+    def nms(self, iou_threshold: float = 0.5, scores=None) -> np.ndarray:
+        """
+        Non-maximum suppression. Returns indices of kept boxes, best first.
+        Without scores, larger boxes win.
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        scores = self.areas if scores is None else np.asarray(scores, dtype=np.float64)
+        order = np.argsort(-scores, kind="stable")
+        ious = self.iou()
+
+        keep = []
+        suppressed = np.zeros(len(self), dtype=bool)
+        for i in order:
+            if suppressed[i]:
+                continue
+            keep.append(i)
+            suppressed |= ious[i] > iou_threshold
+        return np.asarray(keep, dtype=np.int64)
+
+    def clip(self, image_width: int, image_height: int) -> 'BoundingBoxArray':
+        """Return boxes clipped to the image."""
+        limits = np.array([image_width, image_height, image_width, image_height], dtype=np.float64)
+        return BoundingBoxArray(np.clip(self.xyxy, 0, limits))
+
+    def scale(self, scale_x: float, scale_y: float = None) -> 'BoundingBoxArray':
+        """Return boxes with coordinates multiplied by the scale (e.g. downscaled frame -> full frame)."""
+        scale_y = scale_x if scale_y is None else scale_y
+        return BoundingBoxArray(self.xyxy * np.array([scale_x, scale_y, scale_x, scale_y]))
+
+    def translate(self, dx: float, dy: float) -> 'BoundingBoxArray':
+        """Return boxes moved by dx and dy (e.g. ROI crop -> full frame)."""
+        return BoundingBoxArray(self.xyxy + np.array([dx, dy, dx, dy]))
+
+    def filter_min_size(self, min_width: float, min_height: float) -> np.ndarray:
+        """Return boolean mask of boxes at least min_width x min_height."""
+        return (self.widths >= min_width) & (self.heights >= min_height)
+
+    def to_xyxy(self) -> np.ndarray:
+        return self.xyxy.copy()
+
+    def to_xywh(self) -> np.ndarray:
+        return np.concatenate([self.xyxy[:, :2], self.xyxy[:, 2:] - self.xyxy[:, :2]], axis=1)
+
+    def to_fiftyone(self, image_width: int, image_height: int) -> np.ndarray:
+        """Convert to normalized [x, y, w, h] (fiftyone)."""
+        return self.to_xywh() / np.array([image_width, image_height, image_width, image_height])
+
+    def to_yolov5(self, image_width: int, image_height: int) -> np.ndarray:
+        """Convert to normalized [x_center, y_center, w, h] (yolov5)."""
+        xywh = self.to_xywh()
+        xywh[:, :2] += xywh[:, 2:] / 2
+        return xywh / np.array([image_width, image_height, image_width, image_height])
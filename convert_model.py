@@ -0,0 +1,77 @@
+# convert_model.py
+"""
+Konwersja FaceNet (facenet.InceptionResNetV1 + model.h5) do formatów
+uruchamianych bez Keras: ONNX (onnxruntime) i TFLite (XNNPACK).
+
+Użycie:
+    python convert_model.py --weights model.h5 --format onnx   --output model.onnx
+    python convert_model.py --weights model.h5 --format tflite --output model.tflite
+"""
+import argparse
+
+import numpy as np
+
+import anomaly_handler
+from embedding_backends import create_backend
+
+
+def build_keras_model(weights: str, dimension: int = 128, fold: bool = True):
+    """ Buduje InceptionResNetV1 z wagami; domyślnie od razu z wtopionym BN. """
+    from facenet import InceptionResNetV1
+    from export_model import fold_batchnorm
+
+    model = InceptionResNetV1(dimension=dimension)
+    model.load_weights(weights)
+    return fold_batchnorm(model) if fold else model
+
+
+def to_onnx(model, output: str, opset: int = 13):
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None, 160, 160, 3), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=output)
+
+
+def to_tflite(model, output: str):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(output, "wb") as f:
+        f.write(converter.convert())
+
+
+def verify(model, framework: str, path: str, samples: int = 4) -> float:
+    """ Maksymalna odległość kosinusowa między Keras a skonwertowanym modelem. """
+    x = np.random.default_rng(0).uniform(0, 255, size=(samples, 160, 160, 3)).astype(np.float32)
+    reference = np.asarray(model(x, training=False))
+    converted = create_backend(None, {"framework": framework, "path": path}).predict_batch(x)
+    cosine = np.sum(reference * converted, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(converted, axis=1)
+    )
+    return float(np.max(1.0 - cosine))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Konwersja FaceNet do ONNX / TFLite")
+    parser.add_argument("--weights", default="model.h5")
+    parser.add_argument("--format", choices=["onnx", "tflite"], required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--no-fold", action="store_true", help="nie wtapiaj BatchNorm przed konwersją")
+    args = parser.parse_args()
+
+    model = build_keras_model(args.weights, args.dimension, fold=not args.no_fold)
+    if args.format == "onnx":
+        to_onnx(model, args.output)
+    else:
+        to_tflite(model, args.output)
+
+    distance = verify(model, args.format, args.output)
+    anomaly_handler.log_info(
+        f"Zapisano {args.output} ({args.format}); max odległość kosinusowa względem Keras: {distance:.2e}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# embedding_backends.py
+"""
+Backendy obliczające embeddingi FaceNet.
+Każdy backend ma jedną metodę predict_batch((N,160,160,3)) -> (N, dimension).
+Wybór przez model_info["framework"]: "tf", "onnx" albo "tflite".
+Biblioteki onnxruntime / tflite_runtime są importowane dopiero przy tworzeniu
+backendu, więc ścieżki bez TensorFlow nie płacą za jego import.
+"""
+import os
+
+import numpy as np
+
+import anomaly_handler
+
+
+class TfBackend:
+    """ Model Keras (InceptionResNetV1) lub CompiledFaceModel. """
+
+    def __init__(self, face_model):
+        self.face_model = face_model
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        if hasattr(self.face_model, "predict_batch"):
+            return self.face_model.predict_batch(batch)
+        out = self.face_model(batch, training=False)
+        return out.numpy() if hasattr(out, "numpy") else np.asarray(out)
+
+
+class OnnxBackend:
+    """ ONNX Runtime na CPU (model z convert_model.py --format onnx). """
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class TfliteBackend:
+    """
+    TFLite na CPU; XNNPACK jest domyślnym delegatem dla modeli float.
+    Obsługuje też modele int8 z quantize_model.py (wejście/wyjście int8).
+    """
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+
+                Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or None)
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self.input_detail["shape"][0])
+        self.input_dtype = self.input_detail["dtype"]
+
+    def _ensure_batch_size(self, batch_size: int):
+        # Interpreter ma stały kształt wejścia - zmieniamy go tylko gdy zmienia się N
+        if batch_size == self._batch_size:
+            return
+        self.interpreter.resize_tensor_input(
+            self.input_detail["index"], [batch_size, 160, 160, 3], strict=False
+        )
+        self.interpreter.allocate_tensors()
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32)
+        self._ensure_batch_size(batch.shape[0])
+
+        if self.input_dtype != np.float32:
+            scale, zero_point = self.input_detail["quantization"]
+            info = np.iinfo(self.input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(self.input_dtype)
+
+        self.interpreter.set_tensor(self.input_detail["index"], batch)
+        self.interpreter.invoke()
+        out = self.interpreter.get_tensor(self.output_detail["index"])
+
+        if out.dtype != np.float32:
+            scale, zero_point = self.output_detail["quantization"]
+            return (out.astype(np.float32) - zero_point) * scale
+        return out.copy()
+
+
+def create_backend(face_model, model_info: dict):
+    """ Tworzy backend na podstawie model_info["framework"]. """
+    framework = model_info.get("framework", "tf")
+    num_threads = int(model_info.get("num_threads", 0))
+
+    if framework == "tf":
+        return TfBackend(face_model)
+
+    model_path = model_info.get("path")
+    if not model_path or not os.path.exists(model_path):
+        raise ValueError(f"Brak pliku modelu dla backendu '{framework}': {model_path}")
+
+    anomaly_handler.log_info(f"Backend embeddingów: {framework} ({model_path})")
+    if framework == "onnx":
+        return OnnxBackend(model_path, num_threads=num_threads)
+    if framework == "tflite":
+        return TfliteBackend(model_path, num_threads=num_threads)
+
+    raise ValueError(f"Nieznany framework modelu: {framework}")
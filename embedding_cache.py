@@ -0,0 +1,111 @@
+# embedding_cache.py
+"""
+Cache embeddingów dla niemal identycznych wycinków twarzy.
+
+Przy statycznej kamerze i nieruchomej osobie kolejne wycinki dają ten sam
+embedding. Kluczem jest 64-bitowy dHash wycinka (skala szarości 9x8 - tani
+i odporny na szum/kompresję) plus bbox zaokrąglony do siatki `bbox_grid`
+pikseli. Wpis pasuje też, gdy hash w tej samej komórce bboxa różni się
+o najwyżej `max_distance` bitów (szum sensora). Wpisy wygasają po `ttl`
+sekundach, a przy przepełnieniu wypada najdawniej używany (LRU).
+"""
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class EmbeddingCache:
+
+    def __init__(self, max_size: int = 256, ttl: float = 5.0, bbox_grid: int = 8, max_distance: int = 4):
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl
+        self.bbox_grid = max(1, int(bbox_grid))
+        self.max_distance = max_distance
+        self._items = collections.OrderedDict()   # (hash, komórka bboxa) -> (czas zapisu, embedding)
+        self._cells = {}                          # komórka bboxa -> zbiór hashy w cache
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @staticmethod
+    def dhash(face_img: np.ndarray) -> int:
+        """ Hash różnicowy: czy piksel jest jaśniejszy od prawego sąsiada (8x8 bitów). """
+        gray = cv2.cvtColor(face_img, cv2.COLOR_RGB2GRAY) if face_img.ndim == 3 else face_img
+        # Dwa kroki: INTER_AREA z całkowitą skalą jest kilka razy szybsze niż z dowolnej rozdzielczości
+        small = cv2.resize(gray, (72, 64), interpolation=cv2.INTER_LINEAR)
+        small = cv2.resize(small, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).ravel()
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    def key(self, face_img: np.ndarray, bbox=None):
+        if bbox is None:
+            return self.dhash(face_img), None
+        grid = self.bbox_grid
+        return self.dhash(face_img), tuple(int(round(v / grid)) for v in bbox.to_xyxy())
+
+    def _find(self, key):
+        """ Klucz dokładny albo najbliższy hash w tej samej komórce bboxa (<= max_distance bitów). """
+        if key in self._items or not self.max_distance:
+            return key
+        face_hash, cell = key
+        best, best_distance = key, self.max_distance + 1
+        for other in self._cells.get(cell, ()):
+            distance = (other ^ face_hash).bit_count()
+            if distance < best_distance:
+                best, best_distance = (other, cell), distance
+        return best
+
+    def _remove(self, key):
+        del self._items[key]
+        hashes = self._cells.get(key[1])
+        if hashes is not None:
+            hashes.discard(key[0])
+            if not hashes:
+                del self._cells[key[1]]
+
+    def get(self, key, now: float = None):
+        """ Embedding z cache albo None (brak / wygasł). """
+        now = time.time() if now is None else now
+        with self._lock:
+            key = self._find(key)
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, embedding = entry
+            if now - stored_at > self.ttl:
+                self._remove(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key, embedding, now: float = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._items[key] = (now, embedding)
+            self._items.move_to_end(key)
+            self._cells.setdefault(key[1], set()).add(key[0])
+            while len(self._items) > self.max_size:
+                self._remove(next(iter(self._items)))
+                self.evicted += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
@@ -0,0 +1,152 @@
+# export_model.py
+"""
+Eksport zamrożonego modelu inferencyjnego FaceNet.
+
+Przepisuje graf InceptionResNetV1 tak, aby:
+  * BatchNormalization po Conv2D/Dense bez biasu zostało wtopione w wagi
+    (kernel * gamma/sqrt(var+eps), bias = beta - mean * gamma/sqrt(var+eps)),
+  * Lambda(scaling) w blokach Block35/Block17/Block8 stały się stałym mnożeniem
+    (Rescaling), a mnożenie przez 1 zniknęło całkowicie,
+  * Dropout został usunięty.
+
+Użycie:
+    python export_model.py --weights model.h5 --output model_inference.keras
+"""
+import argparse
+
+import numpy as np
+
+import anomaly_handler
+
+
+def _producer_name(tensor) -> str:
+    """ Nazwa warstwy, która wyprodukowała dany tensor (Keras 2 i Keras 3). """
+    return tensor._keras_history[0].name
+
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def fold_batchnorm(model):
+    """ Zwraca nowy, zamrożony model z wtopionym BN, bez Lambda i Dropout. """
+    from tensorflow.keras.layers import BatchNormalization, Conv2D, Dense, Dropout
+    from tensorflow.keras.layers import Input, InputLayer, Lambda, Rescaling
+    from tensorflow.keras.models import Model
+
+    outputs = {}   # nazwa warstwy oryginalnej -> tensor w nowym grafie
+    pending = {}   # nazwa Conv2D/Dense bez biasu -> (nowa warstwa, oryginalna)
+
+    model_input = model.inputs[0]
+    new_input = Input(shape=tuple(model_input.shape[1:]))
+    outputs[_producer_name(model_input)] = new_input
+
+    for layer in model.layers:
+        if isinstance(layer, InputLayer):
+            continue
+
+        inbound = [outputs[_producer_name(t)] for t in _as_list(layer.input)]
+        inputs = inbound if isinstance(layer.input, (list, tuple)) else inbound[0]
+
+        if isinstance(layer, (Conv2D, Dense)) and not layer.use_bias:
+            config = layer.get_config()
+            config["use_bias"] = True
+            new_layer = layer.__class__.from_config(config)
+            outputs[layer.name] = new_layer(inputs)
+            pending[layer.name] = (new_layer, layer)
+
+        elif isinstance(layer, BatchNormalization) and _producer_name(layer.input) in pending:
+            source = _producer_name(layer.input)
+            new_layer, orig_layer = pending.pop(source)
+            kernel = orig_layer.get_weights()[0]
+            weights = layer.get_weights()
+            gamma = weights.pop(0) if layer.scale else np.ones(kernel.shape[-1], dtype=kernel.dtype)
+            beta = weights.pop(0) if layer.center else np.zeros(kernel.shape[-1], dtype=kernel.dtype)
+            moving_mean, moving_var = weights
+            factor = gamma / np.sqrt(moving_var + layer.epsilon)
+            new_layer.set_weights([kernel * factor, beta - moving_mean * factor])
+            outputs[layer.name] = outputs[source]
+
+        elif isinstance(layer, Lambda) and "scale" in (layer.arguments or {}):
+            scale = float(layer.arguments["scale"])
+            if scale == 1.0:
+                outputs[layer.name] = inputs
+            else:
+                outputs[layer.name] = Rescaling(scale, name=layer.name)(inputs)
+
+        elif isinstance(layer, Dropout):
+            outputs[layer.name] = inputs
+
+        else:
+            new_layer = layer.__class__.from_config(layer.get_config())
+            outputs[layer.name] = new_layer(inputs)
+            new_layer.set_weights(layer.get_weights())
+
+    # Conv2D/Dense bez biasu, za którymi nie było BN - przepisujemy sam kernel
+    for new_layer, orig_layer in pending.values():
+        kernel = orig_layer.get_weights()[0]
+        new_layer.set_weights([kernel, np.zeros(kernel.shape[-1], dtype=kernel.dtype)])
+
+    folded = Model(new_input, outputs[_producer_name(model.outputs[0])], name=f"{model.name}_inference")
+    folded.trainable = False
+    return folded
+
+
+def count_ops(model) -> dict:
+    """ Liczba warstw według typu - proste przybliżenie liczby operacji w grafie. """
+    counts = {}
+    for layer in model.layers:
+        name = layer.__class__.__name__
+        counts[name] = counts.get(name, 0) + 1
+    counts["total"] = len(model.layers)
+    return counts
+
+
+def compare_embeddings(model_a, model_b, samples: int = 8, seed: int = 0) -> dict:
+    """ Porównuje embeddingi dwóch modeli na losowych wejściach w zakresie 0-255. """
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 255, size=(samples, 160, 160, 3)).astype(np.float32)
+    emb_a = np.asarray(model_a(x, training=False))
+    emb_b = np.asarray(model_b(x, training=False))
+
+    cosine = np.sum(emb_a * emb_b, axis=1) / (
+        np.linalg.norm(emb_a, axis=1) * np.linalg.norm(emb_b, axis=1)
+    )
+    return {
+        "max_abs_diff": float(np.max(np.abs(emb_a - emb_b))),
+        "max_cosine_distance": float(np.max(1.0 - cosine)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eksport modelu FaceNet z wtopionym BatchNorm")
+    parser.add_argument("--weights", default="model.h5")
+    parser.add_argument("--output", default="model_inference.keras")
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--tolerance", type=float, default=1e-3,
+                        help="maksymalna dopuszczalna odległość kosinusowa względem oryginału")
+    args = parser.parse_args()
+
+    from facenet import InceptionResNetV1
+
+    model = InceptionResNetV1(dimension=args.dimension)
+    model.load_weights(args.weights)
+    folded = fold_batchnorm(model)
+
+    before, after = count_ops(model), count_ops(folded)
+    anomaly_handler.log_info(f"Warstwy przed: {before}")
+    anomaly_handler.log_info(f"Warstwy po:    {after}")
+
+    diff = compare_embeddings(model, folded)
+    anomaly_handler.log_info(f"Zgodność embeddingów: {diff}")
+    if diff["max_cosine_distance"] > args.tolerance:
+        raise SystemExit(
+            f"Model po wtopieniu BN odbiega od oryginału ({diff['max_cosine_distance']:.2e} > {args.tolerance})"
+        )
+
+    folded.save(args.output)
+    anomaly_handler.log_info(f"Zapisano model inferencyjny: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# face_alignment.py
+"""
+Wyrównanie twarzy do kanonicznego wycinka 160x160 na podstawie punktów
+z detektora (oczy, nos, kąciki ust).
+
+Zamiast wycinać prostokąt bboxa i rozciągać go do 160x160 (zniekształcone
+proporcje, przechylona głowa) każda twarz dostaje przekształcenie podobieństwa
+(obrót + jednolita skala + przesunięcie) na wzorzec punktów. Przekształcenia
+wszystkich twarzy z klatki liczone są naraz (najmniejsze kwadraty w postaci
+zamkniętej, numpy), a wycinki trafiają przez cv2.warpAffine do jednego bufora.
+"""
+import numpy as np
+import cv2
+
+KEYPOINT_NAMES = ("left_eye", "right_eye", "nose", "mouth_left", "mouth_right")
+# Bez oczu i kącików ust przekształcenie jest niepewne - wtedy zwykły wycinek
+REQUIRED_KEYPOINTS = ("left_eye", "right_eye", "mouth_left", "mouth_right")
+
+# Wzorzec 5 punktów (ArcFace) dla wycinka 112x112
+_TEMPLATE_112 = np.array([
+    [38.2946, 51.6963],
+    [73.5318, 51.5014],
+    [56.0252, 71.7366],
+    [41.5493, 92.3655],
+    [70.7299, 92.2041],
+], dtype=np.float64)
+
+
+class FaceAligner:
+
+    def __init__(self, size: int = 160, padding: float = 0.1):
+        self.size = size
+        self.padding = padding   # margines wokół wzorca (ułamek wycinka) - FaceNet uczony na luźniejszych wycinkach
+        self.template = (_TEMPLATE_112 / 112.0 * (1.0 - 2.0 * padding) + padding) * size
+
+    def transforms(self, keypoints_list):
+        """
+        Macierze (N, 2, 3) przekształceń podobieństwa punkty -> wzorzec oraz maska
+        (N,) twarzy, dla których dało się je policzyć.
+        """
+        count = len(keypoints_list)
+        points = np.zeros((count, len(KEYPOINT_NAMES), 2))
+        weights = np.zeros((count, len(KEYPOINT_NAMES)))
+        for i, keypoints in enumerate(keypoints_list):
+            if not keypoints or any(name not in keypoints for name in REQUIRED_KEYPOINTS):
+                continue
+            for j, name in enumerate(KEYPOINT_NAMES):
+                if name in keypoints:
+                    points[i, j] = keypoints[name]
+                    weights[i, j] = 1.0
+
+        # Ważone najmniejsze kwadraty dla [a -b tx; b a ty] po wszystkich twarzach naraz
+        total = np.maximum(weights.sum(axis=1), 1.0)
+        src_mean = (weights[..., None] * points).sum(axis=1) / total[:, None]
+        dst_mean = weights @ self.template / total[:, None]
+        src = points - src_mean[:, None]
+        dst = self.template[None] - dst_mean[:, None]
+        norm = (weights * (src ** 2).sum(axis=-1)).sum(axis=1)
+        valid = norm > 1e-6
+        norm = np.where(valid, norm, 1.0)
+        a = (weights * (src * dst).sum(axis=-1)).sum(axis=1) / norm
+        b = (weights * (src[..., 0] * dst[..., 1] - src[..., 1] * dst[..., 0])).sum(axis=1) / norm
+
+        matrices = np.empty((count, 2, 3))
+        matrices[:, 0, 0], matrices[:, 0, 1] = a, -b
+        matrices[:, 1, 0], matrices[:, 1, 1] = b, a
+        matrices[:, 0, 2] = dst_mean[:, 0] - (a * src_mean[:, 0] - b * src_mean[:, 1])
+        matrices[:, 1, 2] = dst_mean[:, 1] - (b * src_mean[:, 0] + a * src_mean[:, 1])
+        return matrices, valid
+
+    def align(self, img_rgb: np.ndarray, keypoints_list) -> list:
+        """
+        Wyrównane wycinki (size, size, 3) dla wszystkich twarzy z klatki, w jednym
+        buforze; None tam, gdzie brakuje punktów.
+        """
+        if not keypoints_list:
+            return []
+        matrices, valid = self.transforms(keypoints_list)
+        out = np.empty((int(valid.sum()), self.size, self.size, img_rgb.shape[2]), dtype=img_rgb.dtype)
+
+        faces = []
+        slot = 0
+        for matrix, ok in zip(matrices, valid):
+            if not ok:
+                faces.append(None)
+                continue
+            cv2.warpAffine(img_rgb, matrix, (self.size, self.size), dst=out[slot],
+                           flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+            faces.append(out[slot])
+            slot += 1
+        return faces
@@ -0,0 +1,162 @@
+# face_detectors.py
+"""
+Detektory twarzy za wspólnym interfejsem MtCnnClient.
+Każdy detektor ma jedną metodę detect_faces(img_rgb) -> lista dictów z
+"bbox" (BoundingBox w pikselach obrazu), "confidence" (albo None) i
+"keypoints" (5 punktów jak w MTCNN albo None).
+Wybór przez detector_info["backend"]: "mtcnn", "yunet", "ssd" albo "haar".
+YuNet i SSD działają przez cv2.dnn na CPU; Haar nie potrzebuje pliku modelu
+(kaskada jest w pakiecie OpenCV), więc służy też za awaryjny detektor.
+"""
+import os
+
+import cv2
+import numpy as np
+
+import anomaly_handler
+from bounding_box import BoundingBox
+
+# Nazwy punktów jak w MTCNN (strony obrazu); YuNet zwraca je w tej samej kolejności
+KEYPOINT_NAMES = ("left_eye", "right_eye", "nose", "mouth_left", "mouth_right")
+
+
+def _to_box(x1, y1, x2, y2, image_width: int, image_height: int) -> BoundingBox:
+    """ Całkowity bbox przycięty do obrazu. """
+    return BoundingBox([
+        int(min(max(x1, 0), image_width)), int(min(max(y1, 0), image_height)),
+        int(min(max(x2, 0), image_width)), int(min(max(y2, 0), image_height)),
+    ])
+
+
+class YuNetDetector:
+    """ OpenCV FaceDetectorYN (YuNet, ONNX): bbox, pewność i 5 punktów twarzy. """
+
+    def __init__(self, model_path: str, score_threshold: float = 0.6, nms_threshold: float = 0.3, top_k: int = 50):
+        self._input_size = (320, 320)
+        self.detector = cv2.FaceDetectorYN.create(
+            model_path, "", self._input_size, score_threshold, nms_threshold, top_k
+        )
+
+    def detect_faces(self, img_rgb: np.ndarray):
+        h, w = img_rgb.shape[:2]
+        # Rozmiar wejścia zmieniamy tylko, gdy zmienia się rozdzielczość (np. inne ROI)
+        if (w, h) != self._input_size:
+            self.detector.setInputSize((w, h))
+            self._input_size = (w, h)
+        _, faces = self.detector.detect(cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+
+        detections = []
+        for row in faces:
+            x, y, bw, bh = row[:4]
+            points = row[4:14].reshape(5, 2)
+            detections.append({
+                "bbox": _to_box(x, y, x + bw, y + bh, w, h),
+                "confidence": float(row[14]),
+                "keypoints": {name: (float(px), float(py)) for name, (px, py) in zip(KEYPOINT_NAMES, points)},
+            })
+        return detections
+
+
+class SsdDetector:
+    """
+    Detektor SSD przez cv2.dnn (np. res10_300x300_ssd_iter_140000.caffemodel
+    + deploy.prototxt). Bez punktów twarzy.
+    """
+
+    def __init__(self, model_path: str, config_path: str = "", score_threshold: float = 0.6,
+                 input_size: int = 300, mean=(104.0, 177.0, 123.0)):
+        self.net = cv2.dnn.readNet(model_path, config_path)
+        self.score_threshold = score_threshold
+        self.input_size = input_size
+        self.mean = mean
+
+    def detect_faces(self, img_rgb: np.ndarray):
+        h, w = img_rgb.shape[:2]
+        # Model uczony na BGR ze średnią BGR - konwersja na małym obrazie
+        small = cv2.cvtColor(cv2.resize(img_rgb, (self.input_size, self.input_size)), cv2.COLOR_RGB2BGR)
+        blob = cv2.dnn.blobFromImage(small, 1.0, (self.input_size, self.input_size), self.mean, swapRB=False)
+        self.net.setInput(blob)
+        out = self.net.forward().reshape(-1, 7)  # [_, klasa, pewność, x1, y1, x2, y2] (ułamki)
+
+        detections = []
+        for _, _, confidence, x1, y1, x2, y2 in out[out[:, 2] >= self.score_threshold]:
+            bbox = _to_box(x1 * w, y1 * h, x2 * w, y2 * h, w, h)
+            if bbox.width > 0 and bbox.height > 0:
+                detections.append({"bbox": bbox, "confidence": float(confidence), "keypoints": None})
+        return detections
+
+
+class HaarDetector:
+    """ Kaskada Haara z OpenCV - najtańsza, bez pewności i punktów; awaryjny detektor. """
+
+    def __init__(self, cascade_path: str = None, scale_factor: float = 1.1, min_neighbors: int = 5,
+                 min_size: int = 20):
+        if not hasattr(cv2, "CascadeClassifier"):
+            # OpenCV 5 przeniosło kaskady do opencv-contrib
+            raise ValueError("Ta wersja OpenCV nie ma CascadeClassifier (opencv-contrib-python)")
+        if not cascade_path:
+            cascade_dir = getattr(getattr(cv2, "data", None), "haarcascades", "")
+            cascade_path = os.path.join(cascade_dir, "haarcascade_frontalface_default.xml")
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise ValueError(f"Nie udało się wczytać kaskady Haara: {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = (min_size, min_size)
+
+    def detect_faces(self, img_rgb: np.ndarray):
+        h, w = img_rgb.shape[:2]
+        gray = cv2.equalizeHist(cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY))
+        rects = self.cascade.detectMultiScale(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size
+        )
+        return [
+            {"bbox": _to_box(x, y, x + bw, y + bh, w, h), "confidence": None, "keypoints": None}
+            for x, y, bw, bh in rects
+        ]
+
+
+def _create(backend: str, detector_info: dict):
+    if backend == "mtcnn":
+        from mtcnn_client import MtCnnClient
+
+        return MtCnnClient()
+    if backend == "haar":
+        return HaarDetector(detector_info.get("config") or None)
+
+    model_path = detector_info.get("model")
+    if not model_path or not os.path.exists(model_path):
+        raise ValueError(f"Brak pliku modelu dla detektora '{backend}': {model_path}")
+    threshold = float(detector_info.get("threshold", 0.6))
+    if backend == "yunet":
+        return YuNetDetector(model_path, score_threshold=threshold)
+    if backend == "ssd":
+        return SsdDetector(model_path, detector_info.get("config", ""), score_threshold=threshold)
+
+    raise ValueError(f"Nieznany detektor twarzy: {backend}")
+
+
+def create_detector(detector_info: dict = None, fallback: bool = True):
+    """
+    Tworzy detektor na podstawie detector_info["backend"] (domyślnie MTCNN).
+    Jeśli wybranego nie da się utworzyć (brak modelu / biblioteki), przy
+    fallback=True działa kaskada Haara zamiast zatrzymywać aplikację.
+    """
+    detector_info = detector_info or {}
+    backend = detector_info.get("backend", "mtcnn")
+    try:
+        detector = _create(backend, detector_info)
+    except (ImportError, ValueError, cv2.error) as e:
+        if not fallback or backend == "haar":
+            raise
+        try:
+            fallback_detector = HaarDetector()
+        except ValueError:
+            raise e
+        anomaly_handler.log_warning(f"Detektor '{backend}' niedostępny ({e}) - używam kaskady Haara.")
+        return fallback_detector
+
+    anomaly_handler.log_info(f"Detektor twarzy: {backend}")
+    return detector
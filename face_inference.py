@@ -3,33 +3,105 @@ import anomaly_handler
 import numpy as np
 import cv2
 
-from mtcnn_client import MtCnnClient
-from bounding_box import BoundingBox
-from utils import resize_image, normalize_input
+from bounding_box import BoundingBox, CompactBoundingBox
+from embedding_backends import create_backend
+from face_detectors import create_detector
+from face_alignment import FaceAligner
+from face_preprocessing import FacePreprocessor
 
 class FaceInference:
-    def __init__(self, face_model, model_info):
+    def __init__(self, face_model, model_info, max_batch_size: int = 8, embedding_cache=None, detect_min_face: int = 0):
         self.face_model = face_model
         self.model_info = model_info
-        self.detector = MtCnnClient()
+        self.max_batch_size = max(1, int(max_batch_size))
+        # Rozmiar (px), do którego zmniejszana jest najmniejsza akceptowana twarz przed detekcją (0 = bez skalowania)
+        self.detect_min_face = detect_min_face
+        # Gotowe bufory wejścia modelu (max_batch_size, 160, 160, 3) - bez alokacji per twarz
+        self.preprocessor = FacePreprocessor(self.max_batch_size)
+        # Opcjonalny EmbeddingCache - niemal identyczne wycinki nie idą ponownie przez model
+        self.embedding_cache = embedding_cache
+        # Backend wybierany przez model_info["framework"] ("tf", "onnx", "tflite")
+        self.backend = create_backend(face_model, model_info)
+        # Detektor wybierany przez model_info["detector"]["backend"] ("mtcnn", "yunet", "ssd", "haar")
+        self.detector = create_detector(model_info.get("detector"))
+        # Opcjonalne wyrównanie twarzy po punktach detektora (model_info["alignment"])
+        alignment = model_info.get("alignment") or {}
+        self.aligner = FaceAligner(padding=alignment.get("padding", 0.1)) if alignment.get("enabled") else None
 
-    def process_image(self, img_rgb: np.ndarray):
-        """ Wykrywa twarze przez MTCNN, wycina je, zwraca listę (face_img, bbox). """
-        detections = self.detector.detect_faces(img_rgb)
-        faces_info = []
+    def detect_faces(self, img_rgb: np.ndarray, roi=None, min_face_size: float = None):
+        """
+        Wykrywa twarze detektorem (domyślnie MTCNN) i wycina je. Zwraca listę
+        dictów: face (wycinek), bbox, confidence i keypoints (5 punktów, jeśli są).
+        Z `roi` (bbox w pikselach klatki) detektor dostaje tylko ten fragment.
+        Z `min_face_size` (najmniejsza twarz, która ma sens, w px klatki)
+        fragment jest zmniejszany tak, by taka twarz miała detect_min_face px -
+        piramida detektora nie liczy skal, które i tak odpadłyby w filtrze rozmiaru.
+        Bboxy i punkty są przeliczane z powrotem na współrzędne całej klatki.
+        """
+        offset_x, offset_y = 0, 0
+        image = img_rgb
+        if roi is not None:
+            x1, y1, x2, y2 = (int(v) for v in roi.to_xyxy())
+            offset_x, offset_y = max(0, x1), max(0, y1)
+            image = img_rgb[offset_y:max(offset_y, y2), offset_x:max(offset_x, x2)]
+            if image.size == 0:
+                return []
+
+        scale = 1.0
+        if min_face_size and self.detect_min_face:
+            scale = min(1.0, self.detect_min_face / float(min_face_size))
+        if scale < 1.0:
+            size = (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        elif roi is not None:
+            image = np.ascontiguousarray(image)
+
+        detections = self.detector.detect_faces(image)
+        faces = []
 
         for det in detections:
-            bbox = det['bbox']
+            # Niezmienny box ze slotami: mniej pamięci per detekcja, bezpieczny do trzymania w trackerze
+            bbox = CompactBoundingBox.from_box(det['bbox'])
+            keypoints = det.get('keypoints')
+            if scale < 1.0 or offset_x or offset_y:
+                bbox = self._to_frame(bbox, scale, offset_x, offset_y)
+                if keypoints:
+                    keypoints = {name: (x / scale + offset_x, y / scale + offset_y)
+                                 for name, (x, y) in keypoints.items()}
             face_region = self.extract_face(img_rgb, bbox)
             if face_region is not None and face_region.size != 0:
-                faces_info.append((face_region, bbox))
+                faces.append({
+                    "face": face_region,
+                    "bbox": bbox,
+                    "confidence": det.get('confidence'),
+                    "keypoints": keypoints,
+                })
             else:
                 # Logujemy, że bounding box był nieprawidłowy lub dał pusty obraz
                 anomaly_handler.log_warning("Otrzymano pusty wycinek twarzy; pomijam.")
 
-        return faces_info
+        if self.aligner is not None:
+            # Wyrównanie wszystkich twarzy z klatki jednym przebiegiem
+            aligned = self.aligner.align(img_rgb, [det["keypoints"] for det in faces])
+            for det, face_img in zip(faces, aligned):
+                if face_img is not None:
+                    det["face"] = face_img
+
+        return faces
 
-    def extract_face(self, img_rgb: np.ndarray, bbox: BoundingBox):
+    @staticmethod
+    def _to_frame(bbox: CompactBoundingBox, scale: float, offset_x: int, offset_y: int) -> CompactBoundingBox:
+        """ Bbox ze zmniejszonego fragmentu -> całkowite piksele pełnej klatki. """
+        if scale < 1.0:
+            bbox = bbox.scale(1.0 / scale)
+        return CompactBoundingBox([int(round(v)) for v in bbox.translate(offset_x, offset_y).to_xyxy()])
+
+    def process_image(self, img_rgb: np.ndarray, roi=None, min_face_size: float = None):
+        """ Wykrywa twarze detektorem, wycina je, zwraca listę (face_img, bbox). """
+        return [(det["face"], det["bbox"]) for det in self.detect_faces(img_rgb, roi, min_face_size)]
+
+    @staticmethod
+    def extract_face(img_rgb: np.ndarray, bbox: BoundingBox):
         """ Wycinamy fragment (twarz) z obrazu, z uwzględnieniem granic. """
         x1, y1, x2, y2 = bbox.to_xyxy()
 
@@ -47,7 +119,15 @@ class FaceInference:
             return None
         return face_region
 
-    def compute_embedding(self, face_img: np.ndarray):
+    def crop_face(self, img_rgb: np.ndarray, bbox: BoundingBox, keypoints=None):
+        """ Wycinek jak w detect_faces: wyrównany po punktach, jeśli się da, inaczej prostokąt bboxa. """
+        if self.aligner is not None and keypoints:
+            aligned = self.aligner.align(img_rgb, [keypoints])[0]
+            if aligned is not None:
+                return aligned
+        return self.extract_face(img_rgb, bbox)
+
+    def compute_embedding(self, face_img: np.ndarray, bbox: BoundingBox = None):
         """ 
         Oblicza embedding. Zwraca None, jeśli otrzyma pusty obraz.
         Upewniamy się, że tylko RAZ dodajemy wymiar batchu.
@@ -55,18 +135,66 @@ class FaceInference:
         if face_img is None or face_img.size == 0:
             return None
 
-        # Resize => (160,160)
-        face_input = cv2.resize(face_img, (160, 160))
-        face_input = normalize_input(face_input, "base")
+        cache_key = None
+        if self.embedding_cache is not None:
+            cache_key = self.embedding_cache.key(face_img, bbox)
+            cached = self.embedding_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        # Dodaj batch dimension TYLKO RAZ => (1,160,160,3)
-        face_input = np.expand_dims(face_input, axis=0)
-        
-        try:
-            out = self.face_model(face_input, training=False)
-        except Exception as e:
-            anomaly_handler.log_error(f"Błąd w obliczaniu embeddingu: {str(e)}")
-            return None
+        # Resize => (160,160) i normalizacja prosto do bufora => (1,160,160,3)
+        with self.preprocessor.lock:
+            face_input = self.preprocessor.fill([face_img])
+            try:
+                out = self.backend.predict_batch(face_input)
+            except Exception as e:
+                anomaly_handler.log_error(f"Błąd w obliczaniu embeddingu: {str(e)}")
+                return None
         
-        embedding = out.numpy()[0]  # shape => (128,) np.
+        embedding = out[0]  # shape => (128,) np.
+        if cache_key is not None:
+            self.embedding_cache.put(cache_key, embedding)
         return embedding
+
+    def compute_embeddings(self, faces: list, bboxes: list = None):
+        """
+        Oblicza embeddingi dla wielu twarzy naraz.
+        Wycinki są skalowane do (160,160) prosto do bufora FacePreprocessor
+        (N,160,160,3) i przepuszczane przez model w paczkach po max_batch_size.
+        Zwraca listę tej samej długości co `faces`; dla pustych wycinków lub
+        błędu modelu na danej pozycji jest None.
+        Z embedding_cache wycinki trafione w cache (bboxes - opcjonalnie, część
+        klucza) nie idą przez model.
+        """
+        embeddings = [None] * len(faces)
+        valid_idx = [i for i, face_img in enumerate(faces)
+                     if face_img is not None and face_img.size != 0]
+
+        cache_keys = {}
+        if self.embedding_cache is not None:
+            for i in valid_idx:
+                key = self.embedding_cache.key(faces[i], bboxes[i] if bboxes else None)
+                embeddings[i] = self.embedding_cache.get(key)
+                if embeddings[i] is None:
+                    cache_keys[i] = key
+            valid_idx = list(cache_keys)
+
+        if not valid_idx:
+            return embeddings
+
+        for start in range(0, len(valid_idx), self.max_batch_size):
+            chunk = valid_idx[start:start + self.max_batch_size]
+            with self.preprocessor.lock:
+                batch = self.preprocessor.fill([faces[i] for i in chunk])
+                try:
+                    out = self.backend.predict_batch(batch)
+                except Exception as e:
+                    anomaly_handler.log_error(f"Błąd w obliczaniu embeddingów (batch={len(chunk)}): {str(e)}")
+                    continue
+
+            for i, embedding in zip(chunk, out):
+                embeddings[i] = embedding  # shape => (128,) np.
+                if i in cache_keys:
+                    self.embedding_cache.put(cache_keys[i], embedding)
+
+        return embeddings
@@ -0,0 +1,91 @@
+# face_preprocessing.py
+"""
+Przygotowanie wejścia FaceNet bez alokacji per twarz.
+
+Zamiast cv2.resize -> normalize_input -> np.stack/np.expand_dims (trzy nowe
+tablice na każdą twarz) wycinki są skalowane prosto do slotu w gotowym
+buforze uint8 (cv2.resize(dst=...)), przepisywane do bufora float32
+(max_batch, 160, 160, 3) i normalizowane w miejscu. Model dostaje widok na
+wypełnione wiersze. Wycinki już mające 160x160 (wyrównane) pomijają resize.
+
+Normalizacja w miejscu jest porównywana przy starcie z utils.normalize_input
+na próbnym wycinku; jeśli wyniki się różnią, używana jest stara ścieżka.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+import anomaly_handler
+from utils import normalize_input
+
+
+class FacePreprocessor:
+
+    def __init__(self, max_batch_size: int = 8, size: int = 160, normalization: str = "base"):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.size = size
+        self.normalization = normalization
+        self._staging = np.empty((self.max_batch_size, size, size, 3), dtype=np.uint8)
+        self._batch = np.empty((self.max_batch_size, size, size, 3), dtype=np.float32)
+        # Bufory są współdzielone - fill() i użycie wyniku pod tą blokadą
+        self.lock = threading.Lock()
+        self.fused = self._check_fused()
+
+    def _normalize(self, batch: np.ndarray):
+        """ Normalizacja w miejscu (tryby jak w utils.normalize_input). """
+        if self.normalization == "base":
+            return
+        if self.normalization == "Facenet":
+            for image in batch:
+                flat = image.reshape(-1)
+                flat -= flat.mean()
+                flat /= max(float(np.sqrt(np.dot(flat, flat) / flat.size)), 1e-6)
+        elif self.normalization == "Facenet2018":
+            batch /= 127.5
+            batch -= 1.0
+        else:
+            raise ValueError(f"Brak normalizacji w miejscu dla trybu: {self.normalization}")
+
+    def _check_fused(self) -> bool:
+        probe = np.random.default_rng(0).integers(0, 256, size=(97, 83, 3), dtype=np.uint8)
+        try:
+            expected = np.asarray(normalize_input(cv2.resize(probe, (self.size, self.size)), self.normalization),
+                                  dtype=np.float32)
+            actual = self._fill_fused([probe])[0]
+            if expected.shape == actual.shape and np.allclose(expected, actual, atol=1e-4):
+                return True
+        except ValueError:
+            pass
+        anomaly_handler.log_warning(
+            f"Normalizacja '{self.normalization}' nie pasuje do utils.normalize_input - "
+            f"przygotowanie wejścia z alokacją per twarz."
+        )
+        return False
+
+    def _fill_fused(self, faces) -> np.ndarray:
+        size = (self.size, self.size)
+        for slot, face_img in enumerate(faces):
+            if face_img.shape[:2] == (self.size, self.size):
+                np.copyto(self._batch[slot], face_img, casting="unsafe")
+            else:
+                cv2.resize(face_img, size, dst=self._staging[slot])
+                np.copyto(self._batch[slot], self._staging[slot], casting="unsafe")
+        batch = self._batch[:len(faces)]
+        self._normalize(batch)
+        return batch
+
+    def fill(self, faces) -> np.ndarray:
+        """
+        Tensor (N,160,160,3) float32 dla N <= max_batch_size wycinków RGB uint8.
+        Zwykle widok na wewnętrzny bufor - ważny do następnego fill(), więc
+        wołający trzyma `lock` aż model skończy.
+        """
+        if len(faces) > self.max_batch_size:
+            raise ValueError(f"Za dużo twarzy w batchu: {len(faces)} > {self.max_batch_size}")
+        if not self.fused:
+            return np.stack([
+                normalize_input(cv2.resize(face_img, (self.size, self.size)), self.normalization)
+                for face_img in faces
+            ])
+        return self._fill_fused(faces)
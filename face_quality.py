@@ -0,0 +1,152 @@
+# face_quality.py
+"""
+Ocena jakości ujęcia twarzy i wybór najlepszej klatki dla tracka.
+
+FaceQualityScorer łączy cztery składowe w [0, 1]: rozmiar bboxa względem
+wejścia FaceNet, ostrość (wariancja Laplasjanu), frontalność z punktów MTCNN
+i pewność detektora. BestFrameSelector trzyma top-K kandydatów na track przez
+krótkie okno i po jego zamknięciu oddaje najlepszego do embeddingu.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class FaceQualityScorer:
+
+    def __init__(self, weights: dict = None, target_size: int = 160, sharpness_ref: float = 150.0):
+        self.weights = weights or {"size": 0.3, "sharpness": 0.3, "frontal": 0.3, "confidence": 0.1}
+        self.target_size = target_size
+        self.sharpness_ref = sharpness_ref
+
+    def size_score(self, bbox) -> float:
+        """ 1.0, gdy krótszy bok bboxa ma co najmniej tyle pikseli, co wejście modelu. """
+        return min(1.0, max(0.0, min(bbox.width, bbox.height) / self.target_size))
+
+    def sharpness_score(self, face_img: np.ndarray) -> float:
+        """ Wariancja Laplasjanu na wycinku przeskalowanym do stałego rozmiaru. """
+        gray = cv2.cvtColor(face_img, cv2.COLOR_RGB2GRAY) if face_img.ndim == 3 else face_img
+        gray = cv2.resize(gray, (96, 96), interpolation=cv2.INTER_AREA)
+        variance = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        return variance / (variance + self.sharpness_ref)
+
+    @staticmethod
+    def frontal_score(keypoints) -> float:
+        """
+        Frontalność z punktów MTCNN: nos na środku między oczami (yaw) i pozioma
+        linia oczu (roll). Bez punktów - 0.5 (neutralnie).
+        """
+        if not keypoints or "left_eye" not in keypoints or "right_eye" not in keypoints:
+            return 0.5
+        (lx, ly), (rx, ry) = keypoints["left_eye"], keypoints["right_eye"]
+        eye_dist = math.hypot(rx - lx, ry - ly)
+        if eye_dist <= 0:
+            return 0.0
+
+        roll = abs(math.atan2(ry - ly, rx - lx))
+        roll = min(roll, math.pi - roll)
+        score = max(0.0, 1.0 - roll / (math.pi / 4))
+        if "nose" in keypoints:
+            yaw = abs(keypoints["nose"][0] - (lx + rx) / 2) / eye_dist
+            score *= max(0.0, 1.0 - 2.0 * yaw)
+        return score
+
+    def score(self, face_img: np.ndarray, bbox, confidence=None, keypoints=None):
+        """ Zwraca (wynik ważony, dict składowych). """
+        parts = {
+            "size": self.size_score(bbox),
+            "sharpness": self.sharpness_score(face_img),
+            "frontal": self.frontal_score(keypoints),
+            "confidence": 1.0 if confidence is None else float(confidence),
+        }
+        total = sum(self.weights.get(name, 0.0) * value for name, value in parts.items())
+        return total / (sum(self.weights.values()) or 1.0), parts
+
+
+class BestFrameSelector:
+    """
+    Kandydaci per track przez `window` sekund od pierwszego ujęcia; trzymane jest
+    tylko top_k najlepszych (kopie klatek nie rosną z długością okna).
+    pop_ready() zwraca najlepszego kandydata każdego tracka, którego okno minęło.
+    """
+
+    def __init__(self, top_k: int = 3, window: float = 1.0):
+        self.top_k = max(1, int(top_k))
+        self.window = window
+        self._windows = {}   # track_id -> {"track", "started", "heap", "offered"}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+        self.offered = 0
+        self.accepted = 0
+        self.emitted = 0
+
+    def pending(self) -> bool:
+        with self._lock:
+            return bool(self._windows)
+
+    def offer(self, track, score: float, make_candidate, now: float = None) -> bool:
+        """
+        Proponuje ujęcie dla tracka. make_candidate() jest wołane tylko, gdy
+        ujęcie mieści się w top_k (np. kopiuje klatkę); może zwrócić None.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.offered += 1
+            window = self._windows.setdefault(
+                track.track_id, {"track": track, "started": now, "heap": [], "offered": 0}
+            )
+            window["offered"] += 1
+            heap = window["heap"]
+            if len(heap) >= self.top_k and score <= heap[0][0]:
+                return False
+
+        # Poza blokadą (kopia klatki) - w tym czasie pop_ready() mogło zamknąć okno
+        candidate = make_candidate()
+        if candidate is None:
+            return False
+
+        with self._lock:
+            if self._windows.get(track.track_id) is not window:
+                return False
+            if len(heap) >= self.top_k and score <= heap[0][0]:
+                return False
+            entry = (score, next(self._order), candidate)
+            if len(heap) < self.top_k:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heappushpop(heap, entry)
+            self.accepted += 1
+            return True
+
+    def pop_ready(self, now: float = None) -> list:
+        """ Lista (track, score, candidate, offered) dla tracków z zamkniętym oknem. """
+        now = time.time() if now is None else now
+        ready = []
+        with self._lock:
+            for track_id, window in list(self._windows.items()):
+                if now - window["started"] < self.window:
+                    continue
+                del self._windows[track_id]
+                track = window["track"]
+                # Embedding policzony już po otwarciu okna - nie dublujemy go
+                if not window["heap"] or (track.last_sent is not None and track.last_sent >= window["started"]):
+                    continue
+                score, _, candidate = max(window["heap"])
+                ready.append((track, score, candidate, window["offered"]))
+                self.emitted += 1
+        return ready
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._windows),
+                "offered": self.offered,
+                "accepted": self.accepted,
+                "emitted": self.emitted,
+            }
@@ -0,0 +1,164 @@
+# face_tracker.py
+"""
+Lekki tracker twarzy (IoU + odległość środków) dla jednej kamery.
+
+Detekcje z kolejnych klatek są przypisywane do istniejących tracków, więc ta
+sama osoba stojąca przed kioskiem ma jeden track_id. Embedding i wysyłka do
+API są potrzebne tylko dla nowego tracka, a potem co `refresh_interval`
+sekund albo gdy twarz wyraźnie urosła (lepsze ujęcie).
+"""
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from bounding_box import BoundingBox, BoundingBoxArray, CompactBoundingBox
+
+
+class Track:
+    """ Jedna śledzona twarz. """
+
+    def __init__(self, track_id: int, bbox: BoundingBox, now: float):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.last_sent = None      # kiedy ostatnio wysłano embedding
+        self.sent_area = 0         # pole bboxa z ostatniego wysłanego ujęcia
+
+    def __str__(self):
+        return f"track {self.track_id}: hits={self.hits} bbox=({self.bbox})"
+
+
+class FaceTracker:
+    """
+    Zachłanne dopasowanie detekcji do tracków: najpierw pary o największym IoU
+    (>= iou_threshold), pozostałe po odległości środków (< max_distance razy
+    większy bok bboxa tracka). Track bez detekcji dłużej niż max_age sekund
+    jest usuwany.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_distance: float = 0.5, max_age: float = 3.0,
+                 refresh_interval: float = 60.0, refresh_area_ratio: float = 1.5):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.refresh_area_ratio = refresh_area_ratio
+
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.embedded = 0
+        self.skipped = 0
+
+    def _match(self, bboxes):
+        """ Zwraca dict: indeks detekcji -> Track. """
+        matches = {}
+        if not self.tracks or not bboxes:
+            return matches
+        track_boxes = BoundingBoxArray.from_boxes([track.bbox for track in self.tracks])
+        det_boxes = BoundingBoxArray.from_boxes(bboxes)
+        free_tracks = set(range(len(self.tracks)))
+
+        # Macierz IoU tracki x detekcje, pary od największego IoU
+        ious = track_boxes.iou(det_boxes)
+        for flat in np.argsort(-ious, axis=None, kind="stable"):
+            t, d = (int(i) for i in np.unravel_index(flat, ious.shape))
+            if ious[t, d] < self.iou_threshold:
+                break
+            if t in free_tracks and d not in matches:
+                matches[d] = self.tracks[t]
+                free_tracks.discard(t)
+
+        # Szybki ruch (mały IoU) - dopasowanie po odległości środków
+        dists = track_boxes.calc_dist(det_boxes)
+        limits = self.max_distance * np.maximum(track_boxes.widths, track_boxes.heights)
+        for d in range(len(bboxes)):
+            if d in matches or not free_tracks:
+                continue
+            candidates = [t for t in free_tracks if dists[t, d] < limits[t]]
+            if candidates:
+                best = min(candidates, key=lambda t: dists[t, d])
+                matches[d] = self.tracks[best]
+                free_tracks.discard(best)
+
+        return matches
+
+    def update(self, bboxes, now: float = None):
+        """
+        Przypisuje detekcje z jednej klatki do tracków (lista BoundingBox).
+        Zwraca listę Track w tej samej kolejności co `bboxes`.
+        Pusta lista tylko postarza tracki.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.tracks = [t for t in self.tracks if now - t.last_seen <= self.max_age]
+            matches = self._match(bboxes)
+
+            result = []
+            for d, bbox in enumerate(bboxes):
+                track = matches.get(d)
+                if track is None:
+                    track = Track(next(self._ids), bbox, now)
+                    self.tracks.append(track)
+                    self.created += 1
+                else:
+                    track.bbox = bbox
+                    track.last_seen = now
+                    track.hits += 1
+                result.append(track)
+            return result
+
+    def region(self, margin: float = 0.5, now: float = None):
+        """
+        Obszar obejmujący aktywne tracki, każdy powiększony o `margin` swojego
+        rozmiaru z każdej strony (CompactBoundingBox) albo None bez tracków.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            boxes = [t.bbox for t in self.tracks if now - t.last_seen <= self.max_age]
+        if not boxes:
+            return None
+        region = None
+        for bbox in boxes:
+            box = CompactBoundingBox.from_box(bbox).expand(margin)
+            region = box if region is None else region.union(box)
+        return region
+
+    def needs_embedding(self, track: Track, now: float = None) -> bool:
+        """ Nowy track, minął refresh_interval albo twarz urosła o refresh_area_ratio. """
+        now = time.time() if now is None else now
+        with self._lock:
+            needed = (
+                track.last_sent is None
+                or now - track.last_sent >= self.refresh_interval
+                or track.bbox.area >= self.refresh_area_ratio * track.sent_area
+            )
+            if not needed:
+                self.skipped += 1
+            return needed
+
+    def mark_embedded(self, track: Track, bbox: BoundingBox = None, now: float = None):
+        """
+        Wołane po policzeniu embeddingu dla tracka (przed wysyłką). bbox to ujęcie,
+        z którego policzono embedding - przy wyborze najlepszej klatki bywa starsze
+        niż bieżący track.bbox, a od jego pola liczy się wzrost w needs_embedding().
+        """
+        with self._lock:
+            track.last_sent = time.time() if now is None else now
+            track.sent_area = (bbox if bbox is not None else track.bbox).area
+            self.embedded += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self.tracks),
+                "created": self.created,
+                "embedded": self.embedded,
+                "skipped": self.skipped,
+            }
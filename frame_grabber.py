@@ -0,0 +1,107 @@
+# frame_grabber.py
+import threading
+import time
+
+import anomaly_handler
+
+
+class ThreadedVideoReader:
+    """
+    Tryb przechwytywania w tle dla VideoReader.
+
+    Osobny wątek cały czas dekoduje strumień (RTSP/HTTP) i trzyma w jednym
+    slocie tylko NAJNOWSZĄ klatkę. read_frame() nie czeka na dekoder i nie
+    dostaje starej klatki z bufora - zwraca (frame_rgb, capture_time) tak samo
+    jak VideoReader.read_frame(). Gdy strumień padnie (klatka starsza niż
+    max_frame_age sekund albo max_failures nieudanych odczytów z rzędu),
+    read_frame() zwraca (None, None) zamiast zamrożonej ostatniej klatki.
+    """
+
+    def __init__(self, video_reader, retry_delay: float = 0.1, max_frame_age: float = 2.0, max_failures: int = 20):
+        self.video_reader = video_reader
+        self.retry_delay = retry_delay
+        self.max_frame_age = max_frame_age
+        self.max_failures = max_failures
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._capture_time = None
+        self._grab_time = None
+        self._sequence = 0        # numer ostatnio zdekodowanej klatki
+        self._read_sequence = 0   # numer ostatnio odebranej klatki
+
+        self.decoded = 0
+        self.dropped = 0          # klatki nadpisane, zanim ktoś je odebrał
+        self.failures = 0
+        self._failure_streak = 0  # nieudane odczyty z rzędu
+        self.stale_reads = 0      # odczyty, które zwróciły już widzianą klatkę
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                frame_rgb, capture_time = self.video_reader.read_frame()
+            except Exception as e:
+                frame_rgb, capture_time = None, None
+                anomaly_handler.log_warning(f"Błąd odczytu klatki w tle: {str(e)}")
+
+            if frame_rgb is None:
+                with self._lock:
+                    self.failures += 1
+                    self._failure_streak += 1
+                self._stop.wait(self.retry_delay)
+                continue
+
+            with self._lock:
+                if self._sequence > self._read_sequence:
+                    self.dropped += 1
+                self._frame = frame_rgb
+                self._grab_time = time.time()
+                self._capture_time = capture_time if capture_time is not None else self._grab_time
+                self._sequence += 1
+                self.decoded += 1
+                self._failure_streak = 0
+
+    def read_frame(self, only_new: bool = False):
+        """
+        Zwraca najnowszą klatkę i jej czas przechwycenia bez czekania.
+        only_new=True zwraca (None, None), jeśli od ostatniego odczytu nie
+        przyszła nowa klatka. Przy martwym strumieniu zawsze (None, None).
+        """
+        with self._lock:
+            if self._frame is None or (only_new and self._sequence == self._read_sequence):
+                return None, None
+            if self._stream_dead():
+                return None, None
+            if self._sequence == self._read_sequence:
+                self.stale_reads += 1
+            self._read_sequence = self._sequence
+            return self._frame, self._capture_time
+
+    def _stream_dead(self) -> bool:
+        """ Wołane pod blokadą: ostatnia klatka za stara albo za dużo błędów z rzędu. """
+        if self.max_failures and self._failure_streak >= self.max_failures:
+            return True
+        return bool(self.max_frame_age) and time.time() - self._grab_time > self.max_frame_age
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "decoded": self.decoded,
+                "dropped": self.dropped,
+                "failures": self.failures,
+                "failure_streak": self._failure_streak,
+                "stale_reads": self.stale_reads,
+                "frame_age_ms": round((time.time() - self._grab_time) * 1000.0, 1)
+                if self._grab_time else None,
+            }
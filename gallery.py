@@ -0,0 +1,388 @@
+# gallery.py
+"""
+Lokalna galeria embeddingów do rozpoznawania twarzy bez pytania API.
+
+Embeddingi zarejestrowanych osób leżą w pliku float32 mapowanym w pamięci
+(np.memmap), już znormalizowane L2, więc podobieństwo kosinusowe to jedno
+mnożenie macierzy. Identyfikatory osób są w ids.json (None = wiersz usunięty).
+Galeria jest pobierana z API hurtowo (GallerySync) i działa dalej offline.
+
+Dla dużych galerii (index="ivf") wyszukiwanie idzie przez IvfIndex:
+embeddingi są pogrupowane wokół centroidów (k-means) i porównywane są tylko
+listy `nprobe` najbliższych centroidów zamiast całej macierzy.
+"""
+import json
+import math
+import os
+import threading
+
+import numpy as np
+import requests
+
+import anomaly_handler
+
+
+class IvfIndex:
+    """
+    Indeks IVF-flat w NumPy. Po treningu (sferyczny k-means na próbce) każdy
+    wiersz galerii należy do listy najbliższego centroidu. Na dysku:
+    centroidy, kolejność wierszy pogrupowana po listach i offsety list -
+    ładowane przez mmap. Wiersze dodane po ostatnim save() są w pamięci.
+    """
+
+    CENTROIDS_FILE = "ivf_centroids.npy"
+    ORDER_FILE = "ivf_order.npy"
+    OFFSETS_FILE = "ivf_offsets.npy"
+
+    def __init__(self, directory: str, nlist: int = 0, nprobe: int = 8):
+        self.directory = directory
+        self.nlist = nlist      # 0 = sqrt(liczby wierszy)
+        self.nprobe = nprobe
+        self.centroids = None
+        self._order = None
+        self._offsets = None
+        self._extra = {}        # lista -> wiersze dodane po ostatnim save()
+
+        paths = [self._path(name) for name in (self.CENTROIDS_FILE, self.ORDER_FILE, self.OFFSETS_FILE)]
+        if all(os.path.exists(path) for path in paths):
+            self.centroids, self._order, self._offsets = (np.load(path, mmap_mode="r") for path in paths)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _assign(self, vectors: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        """ Numer najbliższego centroidu dla każdego (znormalizowanego) wektora. """
+        return np.concatenate([
+            np.argmax(vectors[start:start + chunk] @ self.centroids.T, axis=1)
+            for start in range(0, len(vectors), chunk)
+        ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+    def train(self, matrix, rows: np.ndarray, iterations: int = 10, seed: int = 0):
+        """ Trenuje centroidy na wierszach `rows` macierzy i buduje listy. """
+        rng = np.random.default_rng(seed)
+        nlist = min(len(rows), self.nlist or max(1, int(round(math.sqrt(len(rows))))))
+        sample = np.asarray(matrix[np.sort(rng.choice(rows, size=min(len(rows), 64 * nlist), replace=False))])
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            filled = counts > 0   # pusty klaster zostaje przy starym centroidzie
+            centroids[filled] = sums[filled] / np.maximum(np.linalg.norm(sums[filled], axis=1, keepdims=True), 1e-12)
+
+        self.centroids = centroids.astype(np.float32)
+        assign = self._assign(np.asarray(matrix[rows]))
+        sort = np.argsort(assign, kind="stable")
+        self._order = np.asarray(rows, dtype=np.int64)[sort]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+        self._extra = {}
+
+    def add(self, rows, vectors: np.ndarray):
+        """ Dopisuje nowe wiersze do list najbliższych centroidów (bez ponownego treningu). """
+        for row, list_id in zip(rows, self._assign(vectors)):
+            self._extra.setdefault(int(list_id), []).append(int(row))
+
+    def candidates(self, queries: np.ndarray) -> list:
+        """ Dla każdego zapytania: wiersze z list nprobe najbliższych centroidów. """
+        nprobe = min(self.nprobe, len(self.centroids))
+        scores = queries @ self.centroids.T
+        probes = np.argpartition(-scores, nprobe - 1, axis=1)[:, :nprobe]
+        result = []
+        for probe in probes:
+            parts = [self._order[self._offsets[c]:self._offsets[c + 1]] for c in probe]
+            parts += [np.asarray(self._extra[c], dtype=np.int64) for c in probe if c in self._extra]
+            result.append(np.concatenate(parts))
+        return result
+
+    def save(self):
+        """ Scala dopisane wiersze z listami i zapisuje indeks (atomowo), po czym mapuje go ponownie. """
+        if not self.trained:
+            return
+        nlist = len(self.centroids)
+        lists = [np.asarray(self._order[self._offsets[c]:self._offsets[c + 1]]) for c in range(nlist)]
+        for c, rows in self._extra.items():
+            lists[c] = np.concatenate([lists[c], np.asarray(rows, dtype=np.int64)])
+        order = np.concatenate(lists) if lists else np.zeros(0, dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum([len(rows) for rows in lists])]).astype(np.int64)
+
+        for name, array in ((self.CENTROIDS_FILE, np.asarray(self.centroids)), (self.ORDER_FILE, order),
+                            (self.OFFSETS_FILE, offsets)):
+            tmp_path = self._path(name) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, self._path(name))
+        self.centroids, self._order, self._offsets = (
+            np.load(self._path(name), mmap_mode="r")
+            for name in (self.CENTROIDS_FILE, self.ORDER_FILE, self.OFFSETS_FILE)
+        )
+        self._extra = {}
+
+    def reset(self):
+        """ Usuwa indeks (galeria za mała - wyszukiwanie dokładne). """
+        self.centroids = self._order = self._offsets = None
+        self._extra = {}
+        for name in (self.CENTROIDS_FILE, self.ORDER_FILE, self.OFFSETS_FILE):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+
+
+class EmbeddingGallery:
+
+    EMBEDDINGS_FILE = "embeddings.f32"
+    IDS_FILE = "ids.json"
+
+    def __init__(self, directory: str = "gallery", dimension: int = 128, initial_capacity: int = 1024,
+                 index: str = "flat", nlist: int = 0, nprobe: int = 8, index_min_size: int = 10000):
+        """
+        index="ivf" włącza IvfIndex, trenowany przy replace_all(), gdy galeria ma
+        co najmniej index_min_size wierszy; mniejsze galerie przeszukiwane są dokładnie.
+        """
+        if index not in ("flat", "ivf"):
+            raise ValueError(f"Nieznany typ indeksu galerii: {index}")
+        self.directory = directory
+        self.dimension = dimension
+        self.index_min_size = index_min_size
+        os.makedirs(directory, exist_ok=True)
+        self._emb_path = os.path.join(directory, self.EMBEDDINGS_FILE)
+        self._ids_path = os.path.join(directory, self.IDS_FILE)
+        self._lock = threading.RLock()
+
+        self._ids = []
+        if os.path.exists(self._ids_path):
+            with open(self._ids_path, encoding="utf-8") as f:
+                self._ids = json.load(f)
+        capacity = max(initial_capacity, len(self._ids))
+        if os.path.exists(self._emb_path):
+            capacity = max(capacity, os.path.getsize(self._emb_path) // (4 * dimension))
+        self._open(capacity)
+        self._valid = np.zeros(self.capacity, dtype=bool)
+        self._valid[:len(self._ids)] = [person_id is not None for person_id in self._ids]
+        self.index = IvfIndex(directory, nlist=nlist, nprobe=nprobe) if index == "ivf" else None
+        if self.index is not None and self.index.trained:
+            # Wiersze dodane po ostatnim zapisie indeksu (np. przerwane flush())
+            missing = np.setdiff1d(np.arange(len(self._ids)), self.index._order)
+            if len(missing):
+                self.index.add(missing, np.asarray(self._matrix[missing]))
+
+    def _open(self, capacity: int):
+        """ (Re)mapuje plik embeddingów na `capacity` wierszy, w razie potrzeby go powiększając. """
+        size = capacity * self.dimension * 4
+        with open(self._emb_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.capacity = capacity
+        self._matrix = np.memmap(self._emb_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def _grow(self, needed: int):
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        self._matrix.flush()
+        self._matrix = None
+        self._open(capacity)
+        self._valid = np.concatenate([self._valid, np.zeros(capacity - len(self._valid), dtype=bool)])
+
+    def normalize(self, embeddings) -> np.ndarray:
+        """ (N, dimension) float32, każdy wiersz o normie 1. """
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def __len__(self):
+        with self._lock:
+            return int(self._valid[:len(self._ids)].sum())
+
+    def person_ids(self) -> set:
+        with self._lock:
+            return {person_id for person_id in self._ids if person_id is not None}
+
+    def add(self, person_id, embeddings) -> int:
+        """ Dodaje jeden lub kilka embeddingów osoby; zwraca liczbę dodanych wierszy. """
+        rows = self.normalize(embeddings)
+        with self._lock:
+            start = len(self._ids)
+            self._grow(start + len(rows))
+            self._matrix[start:start + len(rows)] = rows
+            self._valid[start:start + len(rows)] = True
+            self._ids.extend([person_id] * len(rows))
+            if self.index is not None and self.index.trained:
+                self.index.add(range(start, start + len(rows)), rows)
+        return len(rows)
+
+    def remove(self, person_id) -> int:
+        """ Usuwa wszystkie embeddingi osoby (wiersze zostają jako puste do compact()). """
+        with self._lock:
+            rows = [i for i, pid in enumerate(self._ids) if pid == person_id]
+            for i in rows:
+                self._ids[i] = None
+                self._valid[i] = False
+                self._matrix[i] = 0.0
+        return len(rows)
+
+    @staticmethod
+    def _top_k(rows: np.ndarray, scores: np.ndarray, ids: list, k: int) -> list:
+        """ Najlepsze k osób z kandydatów (wiersz -> wynik); każda osoba najwyżej raz. """
+        # Kilka embeddingów na osobę - bierzemy więcej wierszy i zostawiamy najlepszy per osoba
+        take = min(len(rows), k * 4)
+        if not take:
+            return []
+        top = np.argpartition(-scores, take - 1)[:take] if take < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        matches, seen = [], set()
+        for i in top:
+            person_id = ids[rows[i]]
+            if not np.isfinite(scores[i]) or person_id in seen:
+                continue
+            seen.add(person_id)
+            matches.append((person_id, float(scores[i])))
+            if len(matches) == k:
+                break
+        return matches
+
+    def search_batch(self, embeddings, k: int = 5, exact: bool = False) -> list:
+        """
+        Top-k osób dla każdego embeddingu: lista list (person_id, podobieństwo
+        kosinusowe), najlepsze pierwsze; każda osoba najwyżej raz. Z wytrenowanym
+        IvfIndex przeszukiwane są tylko listy najbliższych centroidów (exact=True
+        wymusza pełne przeszukanie).
+        """
+        queries = self.normalize(embeddings)
+        with self._lock:
+            count = len(self._ids)
+            if not count or not self._valid[:count].any():
+                return [[] for _ in queries]
+
+            if self.index is not None and self.index.trained and not exact:
+                results = []
+                for query, rows in zip(queries, self.index.candidates(queries)):
+                    rows = rows[self._valid[rows]]
+                    results.append(self._top_k(rows, self._matrix[rows] @ query, self._ids, k))
+                return results
+
+            scores = self._matrix[:count] @ queries.T      # (count, queries)
+            scores[~self._valid[:count]] = -np.inf
+            rows = np.arange(count)
+            return [self._top_k(rows, column, self._ids, k) for column in scores.T]
+
+    def recall_at_k(self, embeddings, k: int = 5) -> float:
+        """ Odsetek osób z dokładnego top-k, które zwraca też indeks (1.0 bez indeksu). """
+        approx = self.search_batch(embeddings, k)
+        exact = self.search_batch(embeddings, k, exact=True)
+        hits = sum(len({p for p, _ in a} & {p for p, _ in e}) for a, e in zip(approx, exact))
+        total = sum(len(e) for e in exact)
+        return hits / total if total else 1.0
+
+    def search(self, embedding, k: int = 5, exact: bool = False) -> list:
+        return self.search_batch(embedding, k, exact)[0]
+
+    def replace_all(self, records):
+        """
+        Podmienia całą galerię (synchronizacja hurtowa). records: iterowalne
+        (person_id, embedding). Nowy plik powstaje obok i zastępuje stary atomowo.
+        """
+        records = list(records)
+        ids = [person_id for person_id, _ in records]
+        rows = self.normalize([embedding for _, embedding in records]) if records \
+            else np.zeros((0, self.dimension), dtype=np.float32)
+
+        tmp_path = self._emb_path + ".tmp"
+        capacity = max(len(rows), 1)
+        new_matrix = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(capacity, self.dimension))
+        new_matrix[:len(rows)] = rows
+        new_matrix.flush()
+        del new_matrix
+
+        with self._lock:
+            self._matrix = None
+            os.replace(tmp_path, self._emb_path)
+            self._open(capacity)
+            self._ids = ids
+            self._valid = np.zeros(capacity, dtype=bool)
+            self._valid[:len(ids)] = True
+            self._write_ids()
+            if self.index is not None:
+                if len(ids) >= self.index_min_size:
+                    self.index.train(self._matrix, np.arange(len(ids)))
+                    self.index.save()
+                else:
+                    self.index.reset()
+
+    def compact(self):
+        """ Usuwa puste wiersze po remove(). """
+        with self._lock:
+            keep = [i for i, person_id in enumerate(self._ids) if person_id is not None]
+            records = [(self._ids[i], np.array(self._matrix[i])) for i in keep]
+        self.replace_all(records)
+
+    def _write_ids(self):
+        tmp_path = self._ids_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._ids, f)
+        os.replace(tmp_path, self._ids_path)
+
+    def flush(self):
+        """ Zapisuje na dysk zmiany z add()/remove(). """
+        with self._lock:
+            self._matrix.flush()
+            self._write_ids()
+            if self.index is not None:
+                self.index.save()
+
+
+def fetch_gallery(url: str, session=None, timeout=(3.05, 30.0)):
+    """
+    Pobiera galerię z API. Oczekiwany JSON: lista {"person_id": ..., "embedding": [...]}
+    (albo {"items": [...]}). Zwraca listę (person_id, embedding).
+    """
+    response = (session or requests).get(url, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, dict):
+        data = data.get("items", [])
+    return [(item["person_id"], item["embedding"]) for item in data]
+
+
+class GallerySync:
+    """ Wątek odświeżający galerię z API co `interval` sekund; błąd nie czyści lokalnej kopii. """
+
+    def __init__(self, gallery: EmbeddingGallery, url: str, interval: float = 600.0):
+        self.gallery = gallery
+        self.url = url
+        self.interval = interval
+        self.session = requests.Session()
+        self.syncs = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="gallery-sync", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+        self.session.close()
+
+    def sync_once(self) -> bool:
+        try:
+            records = fetch_gallery(self.url, self.session)
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            self.failures += 1
+            anomaly_handler.log_warning(f"Synchronizacja galerii nieudana ({type(e).__name__}) - zostaje lokalna kopia")
+            return False
+        self.gallery.replace_all(records)
+        self.syncs += 1
+        anomaly_handler.log_info(f"Galeria zsynchronizowana: {len(records)} embeddingów, {len(self.gallery.person_ids())} osób")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync_once()
+            self._stop.wait(self.interval)
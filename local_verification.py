@@ -2,6 +2,27 @@ import os
 import time
 import base64
 import json
+import threading
+
+_name_lock = threading.Lock()
+_last_timestamp = None
+_same_second = 0
+
+
+def _unique_name() -> str:
+    """
+    Stempel czasowy dla nazw plików. Kilka twarzy z jednej klatki (osobne odpowiedzi
+    API) zapisuje się w tej samej sekundzie - kolejne dostają sufiks _1, _2, ...
+    """
+    global _last_timestamp, _same_second
+    timestamp_str = time.strftime("%Y%m%d_%H%M%S")
+    with _name_lock:
+        if timestamp_str == _last_timestamp:
+            _same_second += 1
+            return f"{timestamp_str}_{_same_second}"
+        _last_timestamp, _same_second = timestamp_str, 0
+        return timestamp_str
+
 
 def store_local_data(image_base64: str, server_status: int, server_response: str):
     """
@@ -15,8 +36,8 @@ def store_local_data(image_base64: str, server_status: int, server_response: str
     if not os.path.exists("stored_data"):
         os.makedirs("stored_data")
 
-    # Utworzenie nazwy plików na bazie stempla czasowego
-    timestamp_str = time.strftime("%Y%m%d_%H%M%S")
+    # Utworzenie nazwy plików na bazie stempla czasowego (unikalnej także w obrębie sekundy)
+    timestamp_str = _unique_name()
 
     # 1) Zapis pliku JPEG
     try:
@@ -2,178 +2,724 @@
 
 import os
 import time
-import requests
-from requests.auth import HTTPBasicAuth
+import json
 import base64
 import cv2
+import numpy as np
 
 from dotenv import load_dotenv
 
 import anomaly_handler
 from video_reader import VideoReader
-from mtcnn_client import MtCnnClient
-from bounding_box import BoundingBox
-from facenet import InceptionResNetV1
-from face_inference import FaceInference
-from api_notifier import send_embedding
+from bounding_box import BoundingBox, CompactBoundingBox
+from model_loader import BackgroundModelLoader
+from pipeline import Pipeline
+from face_tracker import FaceTracker
+from face_quality import FaceQualityScorer, BestFrameSelector
+from motion_gate import MotionGate
+from gallery import EmbeddingGallery, GallerySync
+from embedding_cache import EmbeddingCache
+from frame_grabber import ThreadedVideoReader
+from shared_frames import SharedMemoryVideoReader
+from sensors import create_sensor
+from api_notifier import AsyncEmbeddingSender, build_payload
 
 from local_verification import store_local_data
 
 
-def main():
+def load_config():
+    """ Wczytuje parametry aplikacji z .env / zmiennych środowiskowych. """
+    config = {
+        "sensor_url": os.environ.get("PROXIMITY_SENSOR_URL"),
+        "camera_url": os.environ.get("CAMERA_URL"),
+        "camera_user": os.environ.get("CAMERA_USERNAME"),
+        "camera_pass": os.environ.get("CAMERA_PASSWORD"),
+
+        "api_url": os.environ.get("API_URL"),
+        "kiosk_id": os.environ.get("KIOSK_ID", "1"),
+        "api_queue_size": int(os.environ.get("API_QUEUE_SIZE", 64)),
+        "api_retries": int(os.environ.get("API_RETRIES", 3)),
+        "api_spool_dir": os.environ.get("API_SPOOL_DIR", "pending_uploads"),
+
+        # Czujnik: backend (http / udp / camera), co ile odpytywać HTTP,
+        # port UDP, czasy podtrzymania ruchu i próg ruchu dla kamery
+        "sensor_backend": os.environ.get("SENSOR_BACKEND", "http"),
+        # Krótki domyślny interwał: opóźnienie od pojawienia się osoby do pierwszej klatki
+        # to najwyżej tyle (zapytania idą przez pulę połączeń keep-alive); dla backendu
+        # camera to co ile sekund próbkować klatki, gdy nic się nie dzieje
+        "sensor_poll_interval": float(os.environ.get("SENSOR_POLL_INTERVAL", 0.2)),
+        "sensor_udp_port": int(os.environ.get("SENSOR_UDP_PORT", 7777)),
+        "sensor_hold_time": float(os.environ.get("SENSOR_HOLD_TIME", 2.0)),
+        "sensor_udp_hold_time": float(os.environ.get("SENSOR_UDP_HOLD_TIME", 0.0)),
+        "sensor_motion_threshold": float(os.environ.get("SENSOR_MOTION_THRESHOLD", 6.0)),
+        # Czujnik HTTP: timeouty (connect/read) i circuit breaker
+        "sensor_connect_timeout": float(os.environ.get("SENSOR_CONNECT_TIMEOUT", 1.0)),
+        "sensor_read_timeout": float(os.environ.get("SENSOR_READ_TIMEOUT", 2.0)),
+        "sensor_failure_threshold": int(os.environ.get("SENSOR_FAILURE_THRESHOLD", 3)),
+        "sensor_reset_timeout": float(os.environ.get("SENSOR_RESET_TIMEOUT", 30.0)),
+
+        # Dekodowanie strumienia w tle (zawsze najnowsza klatka)
+        "capture_threaded": os.environ.get("CAPTURE_THREADED", "1") == "1",
+        # Po ilu sekundach bez nowej klatki (albo ilu błędach odczytu z rzędu) strumień uznajemy za martwy
+        "capture_max_frame_age": float(os.environ.get("CAPTURE_MAX_FRAME_AGE", 2.0)),
+        "capture_max_failures": int(os.environ.get("CAPTURE_MAX_FAILURES", 20)),
+        # Dekodowanie w osobnym procesie, klatki w pamięci współdzielonej (SHM_SLOTS slotów)
+        "capture_process": os.environ.get("CAPTURE_PROCESS", "0") == "1",
+        "shm_slots": int(os.environ.get("SHM_SLOTS", 16)),
+
+        "cold_mode": float(os.environ.get("COLD_MODE", 1.0)),
+        "hot_mode": float(os.environ.get("HOT_MODE", 0.8)),
+
+        # Parametry sprawdzania bounding boxa
+        "parameter_width": float(os.environ.get("PARAM_WIDTH", 0.25)),    # np. 0.25
+        "parameter_height": float(os.environ.get("PARAM_HEIGHT", 0.25)),  # np. 0.25
+
+        # Detektor twarzy: mtcnn, yunet (FaceDetectorYN, DETECTOR_MODEL = .onnx), ssd
+        # (cv2.dnn, DETECTOR_MODEL + DETECTOR_CONFIG, np. .caffemodel + .prototxt) albo haar
+        # (DETECTOR_CONFIG = opcjonalna ścieżka kaskady); bez modelu - awaryjnie haar
+        "detector_backend": os.environ.get("DETECTOR_BACKEND", "mtcnn"),
+        "detector_model": os.environ.get("DETECTOR_MODEL", ""),
+        "detector_config": os.environ.get("DETECTOR_CONFIG", ""),
+        "detector_threshold": float(os.environ.get("DETECTOR_THRESHOLD", 0.6)),
+        # Wyrównanie twarzy po punktach (oczy, nos, usta) do wycinka 160x160 zamiast
+        # rozciągania bboxa; FACE_ALIGN_PADDING to margines wokół wzorca punktów.
+        # Zmienia embeddingi - włączać razem z ponownym zarejestrowaniem galerii
+        "face_align": os.environ.get("FACE_ALIGN", "0") == "1",
+        "face_align_padding": float(os.environ.get("FACE_ALIGN_PADDING", 0.1)),
+        # Detekcja: klatka zmniejszana tak, by najmniejsza akceptowana twarz (PARAM_WIDTH x
+        # PARAM_HEIGHT kadru) miała DETECT_MIN_FACE px (0 = pełna rozdzielczość); DETECT_ROI to
+        # stały obszar "x1,y1,x2,y2" jako ułamki kadru, DETECT_TRACK_ROI zawęża detekcję
+        # bez ruchu do okolic tracków (powiększonych o DETECT_TRACK_MARGIN z każdej strony)
+        "detect_min_face": int(os.environ.get("DETECT_MIN_FACE", 40)),
+        "detect_roi": os.environ.get("DETECT_ROI", ""),
+        "detect_track_roi": os.environ.get("DETECT_TRACK_ROI", "1") == "1",
+        "detect_track_margin": float(os.environ.get("DETECT_TRACK_MARGIN", 0.5)),
+
+        # Maksymalna liczba twarzy przepuszczanych przez FaceNet w jednym wywołaniu
+        "max_batch_size": int(os.environ.get("MAX_BATCH_SIZE", 8)),
+
+        # Backend embeddingów: tf (Keras), onnx (onnxruntime) lub tflite (XNNPACK)
+        "model_framework": os.environ.get("MODEL_FRAMEWORK", "tf"),
+        "model_path": os.environ.get("MODEL_PATH"),
+        "model_threads": int(os.environ.get("MODEL_THREADS", 0)),
+        "compiled_model": os.environ.get("COMPILED_MODEL", "1") == "1",
+        # Cache embeddingów dla niemal identycznych wycinków (0 = wyłączony), TTL w sekundach
+        "embed_cache_size": int(os.environ.get("EMBED_CACHE_SIZE", 256)),
+        "embed_cache_ttl": float(os.environ.get("EMBED_CACHE_TTL", 5.0)),
+
+        # Potok: rozmiar kolejek między etapami i co ile sekund logować statystyki
+        "queue_size": int(os.environ.get("PIPELINE_QUEUE_SIZE", 4)),
+        "stats_interval": float(os.environ.get("PIPELINE_STATS_INTERVAL", 60)),
+        # Tracker twarzy: embedding i wysyłka tylko dla nowych osób, odświeżanie
+        # co TRACK_REFRESH sekund albo gdy twarz urośnie TRACK_REFRESH_AREA razy
+        "tracker_enabled": os.environ.get("TRACKER_ENABLED", "1") == "1",
+        "track_iou": float(os.environ.get("TRACK_IOU", 0.3)),
+        "track_max_distance": float(os.environ.get("TRACK_MAX_DISTANCE", 0.5)),
+        "track_max_age": float(os.environ.get("TRACK_MAX_AGE", 3.0)),
+        "track_refresh": float(os.environ.get("TRACK_REFRESH", 60.0)),
+        "track_refresh_area": float(os.environ.get("TRACK_REFRESH_AREA", 1.5)),
+
+        # Bramka ruchu przed MTCNN: detekcja tylko przy zmianie obrazu (i co
+        # MOTION_GATE_FORCE_INTERVAL s mimo jej braku), w ROI wokół zmienionych pikseli
+        "motion_gate": os.environ.get("MOTION_GATE", "1") == "1",
+        "motion_gate_width": int(os.environ.get("MOTION_GATE_WIDTH", 160)),
+        "motion_gate_threshold": int(os.environ.get("MOTION_GATE_THRESHOLD", 15)),
+        "motion_gate_min_area": float(os.environ.get("MOTION_GATE_MIN_AREA", 0.002)),
+        "motion_gate_alpha": float(os.environ.get("MOTION_GATE_ALPHA", 0.1)),
+        "motion_gate_force_interval": float(os.environ.get("MOTION_GATE_FORCE_INTERVAL", 2.0)),
+
+        # Wybór najlepszego ujęcia tracka: top-K kandydatów przez BEST_FRAME_WINDOW
+        # sekund (0 = bez wyboru), w tym czasie klatki co BEST_FRAME_INTERVAL s
+        "best_frame_window": float(os.environ.get("BEST_FRAME_WINDOW", 1.0)),
+        "best_frame_top_k": int(os.environ.get("BEST_FRAME_TOP_K", 3)),
+        "best_frame_interval": float(os.environ.get("BEST_FRAME_INTERVAL", 0.2)),
+
+        # Lokalna galeria embeddingów (pusty GALLERY_DIR = wyłączona) i jej
+        # synchronizacja z API; GALLERY_THRESHOLD to minimalne podobieństwo kosinusowe
+        "gallery_dir": os.environ.get("GALLERY_DIR", ""),
+        "gallery_sync_url": os.environ.get("GALLERY_SYNC_URL", ""),
+        "gallery_sync_interval": float(os.environ.get("GALLERY_SYNC_INTERVAL", 600)),
+        "gallery_threshold": float(os.environ.get("GALLERY_THRESHOLD", 0.7)),
+        # Indeks galerii: flat (dokładnie) albo ivf (przybliżony, dla 100k+ osób)
+        "gallery_index": os.environ.get("GALLERY_INDEX", "flat"),
+        "gallery_nlist": int(os.environ.get("GALLERY_NLIST", 0)),
+        "gallery_nprobe": int(os.environ.get("GALLERY_NPROBE", 8)),
+        "gallery_index_min_size": int(os.environ.get("GALLERY_INDEX_MIN_SIZE", 10000)),
+
+        # Ile klatek (z różnych kamer) etap embed może zebrać w jeden batch; 0 = liczba kamer
+        "embed_batch_frames": int(os.environ.get("EMBED_BATCH_FRAMES", 0)),
+    }
+    if config["model_path"] is None:
+        config["model_path"] = default_model_path(config["model_framework"])
+    config["cameras"] = load_cameras(config, os.environ.get("CAMERAS"))
+    return config
+
+
+def default_model_path(framework: str) -> str:
+    """ Domyślny plik modelu dla frameworka, gdy MODEL_PATH nie jest ustawione. """
+    if framework == "onnx":
+        return "model.onnx"
+    if framework == "tflite":
+        return "model.tflite"
+    # Gotowy artefakt z export_model.py ładuje się bez przebudowy grafu w Pythonie
+    return "model_inference.keras" if os.path.exists("model_inference.keras") else "model.h5"
+
+
+def load_cameras(config, cameras_spec):
     """
-    Główna pętla aplikacji (skrótowa wersja).
-    1) Pobiera z .env m.in. PARAM_WIDTH, PARAM_HEIGHT.
-    2) Po wykryciu ruchu, czyta klatkę z kamery, wykrywa twarz, 
-       sprawdza czy bounding box >= param_width i param_height, itd.
+    Lista konfiguracji kamer. CAMERAS to JSON (albo ścieżka do pliku .json)
+    z listą obiektów, np.:
+      [{"camera_url": "rtsp://...", "sensor_url": "http://...", "kiosk_id": "1"},
+       {"camera_url": "rtsp://...", "sensor_backend": "udp", "sensor_udp_port": 7778, "kiosk_id": "2"}]
+    Każdy wpis nadpisuje klucze wspólnego configu (kamera, czujnik, kiosk_id...).
+    Bez CAMERAS działa jedna kamera z CAMERA_URL / PROXIMITY_SENSOR_URL / KIOSK_ID.
+    """
+    shared = {k: v for k, v in config.items() if k != "cameras"}
+    if not cameras_spec:
+        return [shared]
+
+    if os.path.isfile(cameras_spec):
+        with open(cameras_spec, encoding="utf-8") as f:
+            entries = json.load(f)
+    else:
+        entries = json.loads(cameras_spec)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("CAMERAS musi być niepustą listą obiektów JSON")
+
+    cameras = []
+    for entry in entries:
+        unknown = set(entry) - set(shared)
+        if unknown:
+            anomaly_handler.log_warning(f"Nieznane klucze w konfiguracji kamery {entry.get('camera_url')}: {sorted(unknown)}")
+        cameras.append(dict(shared, **{k: v for k, v in entry.items() if k in shared}))
+    return cameras
+
+
+class CaptureWorker:
+    """
+    Źródło potoku sterowane zdarzeniami z czujnika: na zbocze narastające
+    (pojawienie się ruchu) pobiera klatkę od razu, a dopóki ruch trwa - co
+    `mode_interval` sekund. Etap detekcji przełącza cold/hot mode przez
+    report_faces().
     """
-    load_dotenv()
-    anomaly_handler.log_info("=== Start aplikacji ===")
-
-    # Wczytujemy parametry z .env
-    sensor_url = os.environ.get("PROXIMITY_SENSOR_URL")
-    camera_url = os.environ.get("CAMERA_URL")
-    camera_user = os.environ.get("CAMERA_USERNAME")
-    camera_pass = os.environ.get("CAMERA_PASSWORD")
-
-    api_url  = os.environ.get("API_URL")
-    kiosk_id = os.environ.get("KIOSK_ID", "1")
-
-    cold_mode = float(os.environ.get("COLD_MODE", 1.0))
-    hot_mode  = float(os.environ.get("HOT_MODE", 0.8))
-
-    # NOWE: wczytujemy parametry sprawdzania bounding boxa
-    parameter_width  = float(os.environ.get("PARAM_WIDTH", 0.25))   # np. 0.25
-    parameter_height = float(os.environ.get("PARAM_HEIGHT", 0.25))  # np. 0.25
-
-    anomaly_handler.log_info(
-        f"Wczytano parametry: PARAM_WIDTH={parameter_width}, PARAM_HEIGHT={parameter_height}"
-    )
-
-    # Inicjalizacja modelu FaceNet
-    anomaly_handler.log_info("Ładowanie modelu FaceNet (model.h5)...")
-    face_model = InceptionResNetV1(dimension=128)
-    face_model.load_weights("model.h5")
-
-    # Tworzymy obiekt FaceInference (wykorzysta MTCNN + FaceNet)
-    inference_class = FaceInference(
-        face_model=face_model,
-        model_info={"framework": "tf", "model": "facenet", "dimension": 128}
-    )
-
-    # Inicjalizacja strumienia z kamery
-    try:
-        video_reader = VideoReader(camera_url, camera_user, camera_pass)
-    except ValueError:
-        anomaly_handler.camera_connection_error(camera_url)
-        return
-
-    # Zmienne sterujące pętlą
-    face_detected = False
-    mode_interval = cold_mode
-    last_check_time = time.time()
-
-    anomaly_handler.log_info("=== Aplikacja ruszyła w pętli głównej ===")
-
-    while True:
-        now = time.time()
-        if (now - last_check_time) >= mode_interval:
-            last_check_time = now
 
-            # Przykładowe sprawdzenie czujnika:
-            detection = check_sensor(sensor_url, camera_user, camera_pass)
-            if not detection:
+    def __init__(self, video_reader, sensor, config):
+        self.video_reader = video_reader
+        self.sensor = sensor
+        self.camera_url = config["camera_url"]
+        self.kiosk_id = config["kiosk_id"]
+        self.cold_mode = config["cold_mode"]
+        self.hot_mode = config["hot_mode"]
+        self.sensor_poll_interval = config["sensor_poll_interval"]
+        self.tracker = FaceTracker(
+            iou_threshold=config["track_iou"],
+            max_distance=config["track_max_distance"],
+            max_age=config["track_max_age"],
+            refresh_interval=config["track_refresh"],
+            refresh_area_ratio=config["track_refresh_area"],
+        ) if config["tracker_enabled"] else None
+        # Wybór ujęcia wymaga tracków - bez trackera embedding idzie od razu
+        self.selector = BestFrameSelector(
+            top_k=config["best_frame_top_k"], window=config["best_frame_window"]
+        ) if self.tracker is not None and config["best_frame_window"] > 0 else None
+        self.scorer = FaceQualityScorer()
+        self.motion_gate = MotionGate(
+            width=config["motion_gate_width"],
+            threshold=config["motion_gate_threshold"],
+            min_area=config["motion_gate_min_area"],
+            alpha=config["motion_gate_alpha"],
+            force_interval=config["motion_gate_force_interval"],
+        ) if config["motion_gate"] else None
+        self.detect_roi = parse_roi(config["detect_roi"])
+        self.detect_track_roi = config["detect_track_roi"]
+        self.detect_track_margin = config["detect_track_margin"]
+        self.best_frame_interval = config["best_frame_interval"]
+        self._ready = []
+
+        self.face_detected = False
+        self.mode_interval = self.cold_mode
+        self.last_check_time = 0.0
+        self._last_sample_time = 0.0
+        self._seen_change = 0.0
+        self._last_capture_time = None
+
+    def report_faces(self, found: bool):
+        if found:
+            self.face_detected = True
+            self.mode_interval = self.cold_mode
+        else:
+            self.face_detected = False
+            self.mode_interval = self.hot_mode
+
+    def _interval(self):
+        """ Odstęp między klatkami; krótszy, gdy zbieramy ujęcia do wyboru najlepszego. """
+        if self.selector is not None and self.selector.pending():
+            return min(self.mode_interval, self.best_frame_interval)
+        return self.mode_interval
+
+    def detection_roi(self, frame_shape, motion_roi=None, static: bool = False):
+        """
+        Obszar detekcji w pikselach klatki (albo None = cała klatka): ROI ruchu;
+        okolice aktywnych tracków tylko przy wymuszonej detekcji w statycznej
+        scenie (static=True); zawsze przycięty do DETECT_ROI.
+        """
+        h, w = frame_shape[:2]
+        roi = motion_roi
+        if static and self.detect_track_roi and self.tracker is not None:
+            roi = self.tracker.region(self.detect_track_margin)
+        if self.detect_roi is not None:
+            x1, y1, x2, y2 = self.detect_roi
+            fixed = CompactBoundingBox([x1 * w, y1 * h, x2 * w, y2 * h])
+            roi = fixed if roi is None else roi.intersection(fixed)
+        return roi.clip(w, h) if roi is not None else None
+
+    def _selected_item(self):
+        """ Najlepsze ujęcie tracka, którego okno wyboru się zamknęło (albo None). """
+        if not self._ready:
+            self._ready = self.selector.pop_ready()
+            if not self._ready:
+                return None
+        track, score, candidate, offered = self._ready.pop(0)
+        anomaly_handler.log_info(
+            f"Najlepsze ujęcie tracka {track.track_id} ({self.camera_url}): jakość {score:.2f} z {offered} ujęć"
+        )
+        return {
+            "camera": self,
+            "frame": candidate["frame"],
+            "frame_ref": None,
+            "capture_time": candidate["capture_time"],
+            "faces": [(candidate["face"], candidate["bbox"])],
+            "tracks": [track],
+        }
+
+    def _read_frame(self):
+        frame_rgb, capture_time = self.video_reader.read_frame()
+        if frame_rgb is None:
+            anomaly_handler.log_warning(f"Brak klatki z kamery: {self.camera_url}")
+            return None, None
+        # Czytnik w tle może oddać tę samą klatkę drugi raz - nie przetwarzamy jej ponownie
+        if capture_time is not None and capture_time == self._last_capture_time:
+            return None, None
+        self._last_capture_time = capture_time
+        return frame_rgb, capture_time
+
+    def __call__(self):
+        if self.selector is not None:
+            selected = self._selected_item()
+            if selected is not None:
+                return selected
+
+        frame_rgb = None
+        if self.sensor.needs_frames:
+            # Czujnik "kamerowy" ocenia ruch na tych samych klatkach, które idą dalej
+            if time.time() - self._last_sample_time < min(self._interval(), self.sensor_poll_interval):
+                return None
+            self._last_sample_time = time.time()
+            frame_rgb, capture_time = self._read_frame()
+            if frame_rgb is None:
+                return None
+            self.sensor.feed(frame_rgb)
+        elif not self.sensor.motion:
+            # Zamiast odpytywać co cold_mode czekamy na zbocze z czujnika
+            self.sensor.wait_for_change(self._seen_change, timeout=0.5)
+
+        if not self.sensor.motion:
+            if self._seen_change != self.sensor.last_change:
+                self._seen_change = self.sensor.last_change
                 anomaly_handler.log_info("Brak ruchu - czekam...")
-                face_detected = False
-                mode_interval = cold_mode
-                continue
+                self.face_detected = False
+                self.mode_interval = self.cold_mode
+            return None
 
-            # Mamy ruch, więc pobieramy klatkę z kamery
-            frame_rgb, capture_time = video_reader.read_frame()
+        # Ruch: nowe zbocze => klatka od razu, w trakcie ruchu => co mode_interval
+        now = time.time()
+        rising_edge = self._seen_change != self.sensor.last_change
+        if not rising_edge and (now - self.last_check_time) < self._interval():
+            return None
+        self._seen_change = self.sensor.last_change
+        self.last_check_time = now
+
+        if frame_rgb is None:
+            frame_rgb, capture_time = self._read_frame()
             if frame_rgb is None:
-                anomaly_handler.log_warning("Brak klatki z kamery.")
-                continue
+                return None
+
+        # Przy pierścieniu w pamięci współdzielonej klatka jest widokiem na slot -
+        # kolejne etapy sprawdzają przez frame_ref, czy nie została nadpisana
+        return {
+            "camera": self,
+            "frame": frame_rgb,
+            "frame_ref": getattr(self.video_reader, "last_ref", None),
+            "capture_time": capture_time,
+        }
+
+
+def parse_roi(spec):
+    """ DETECT_ROI: "x1,y1,x2,y2" (albo lista z CAMERAS) jako ułamki kadru; pusty = cały kadr. """
+    if not spec:
+        return None
+    values = [float(v) for v in (spec.split(",") if isinstance(spec, str) else spec)]
+    if len(values) != 4 or not (0 <= values[0] < values[2] <= 1 and 0 <= values[1] < values[3] <= 1):
+        raise ValueError(f"Nieprawidłowe DETECT_ROI: {spec!r} (oczekiwane x1,y1,x2,y2 w zakresie 0-1)")
+    return values
+
+
+def frame_still_valid(item) -> bool:
+    """ False, jeśli slot pierścienia z klatką elementu został już nadpisany. """
+    ref = item.get("frame_ref")
+    if ref is None or item["camera"].video_reader.is_valid(ref):
+        return True
+    anomaly_handler.log_warning("Klatka nadpisana w pierścieniu przed końcem przetwarzania - pomijam.")
+    return False
+
+
+def open_video_reader(config):
+    """
+    Otwiera kamerę: zwykły VideoReader, w tle (ThreadedVideoReader) albo
+    w osobnym procesie z pierścieniem w pamięci współdzielonej.
+    """
+    if config["capture_process"]:
+        return SharedMemoryVideoReader(
+            config["camera_url"], config["camera_user"], config["camera_pass"], slots=config["shm_slots"]
+        ).start()
 
-            # Wykrycie twarzy (lista (face_img, bbox))
-            faces_info = inference_class.process_image(frame_rgb)
-            if not faces_info:
-                # Jeśli nie znaleziono twarzy -> hot_mode
-                if face_detected:
-                    anomaly_handler.log_info("Twarz zniknęła, przechodzę do hot_mode.")
-                face_detected = False
-                mode_interval = hot_mode
-                continue
+    video_reader = VideoReader(config["camera_url"], config["camera_user"], config["camera_pass"])
+    if config["capture_threaded"]:
+        video_reader = ThreadedVideoReader(
+            video_reader, max_frame_age=config["capture_max_frame_age"], max_failures=config["capture_max_failures"]
+        ).start()
+    return video_reader
 
-            # Bierzemy pierwszą twarz:
-            (face_img, bbox) = faces_info[0]
 
-            # Tu sprawdzamy minimalny rozmiar bounding boxa względem całego kadru
-            h_frame, w_frame, _ = frame_rgb.shape
-            if (bbox.width < parameter_width  * w_frame or
-                bbox.height < parameter_height * h_frame):
-                anomaly_handler.log_info("Twarz za mała. Ustawiam hot_mode.")
-                face_detected = False
-                mode_interval = hot_mode
+def build_pipeline(config, model_loader, capture_workers, sender, gallery=None):
+    """
+    Składa potok: capture (po jednym źródle na kamerę) -> detect -> embed ->
+    [match] -> encode -> upload -> store. Etap match (tylko z lokalną galerią)
+    rozpoznaje osobę na miejscu, bez czekania na API. Każdy etap działa we własnym wątku, a elementem
+    jest dict z klatką i wynikami poprzednich etapów. Wszystkie kamery dzielą
+    jeden model; etap embed zbiera twarze z kilku klatek (także z różnych
+    kamer) w jeden batch. Etap upload tylko przekazuje zdarzenia do
+    AsyncEmbeddingSender; odpowiedzi API wracają do etapu store przez callback.
+    """
+    parameter_width = config["parameter_width"]
+    parameter_height = config["parameter_height"]
+    bgr_buffers = {}  # bufor BGR per rozdzielczość, używany tylko przez etap encode
+
+    def detect(item):
+        if "faces" in item:
+            # Najlepsze ujęcie wybrane przez BestFrameSelector - detekcja już była
+            return item
+
+        inference_class = model_loader.inference
+        if inference_class is None:
+            anomaly_handler.log_info("Model FaceNet jeszcze się ładuje - pomijam klatkę.")
+            return None
+
+        camera = item["camera"]
+        frame_rgb = item["frame"]
+
+        # Statyczna scena => bez MTCNN; przy ruchu detekcja tylko w jego ROI
+        motion_roi, static = None, False
+        if camera.motion_gate is not None:
+            run_detection, motion_roi, static = camera.motion_gate.check(frame_rgb)
+            if not run_detection:
+                return None
+        roi = camera.detection_roi(frame_rgb.shape, motion_roi, static)
+
+        # Wykrycie twarzy (dicty z face, bbox, confidence, keypoints) na klatce
+        # zmniejszonej do najmniejszej twarzy, która przejdzie filtr rozmiaru
+        h_frame, w_frame, _ = frame_rgb.shape
+        min_face_size = min(parameter_width * w_frame, parameter_height * h_frame)
+        detections = inference_class.detect_faces(frame_rgb, roi, min_face_size)
+        if not frame_still_valid(item):
+            return None
+        if not detections:
+            if camera.tracker is not None:
+                camera.tracker.update([])
+            # Jeśli nie znaleziono twarzy -> hot_mode
+            if camera.face_detected:
+                anomaly_handler.log_info("Twarz zniknęła, przechodzę do hot_mode.")
+            camera.report_faces(False)
+            return None
+
+        # Tu sprawdzamy minimalny rozmiar bounding boxa względem całego kadru
+        detections = [
+            det for det in detections
+            if det["bbox"].width >= parameter_width * w_frame
+            and det["bbox"].height >= parameter_height * h_frame
+        ]
+        if camera.tracker is not None:
+            tracks = camera.tracker.update([det["bbox"] for det in detections])
+        else:
+            tracks = [None] * len(detections)
+        if not detections:
+            anomaly_handler.log_info("Twarz za mała. Ustawiam hot_mode.")
+            camera.report_faces(False)
+            return None
+
+        # Mamy wystarczająco duże twarze => dalej do embeddingu, ale tylko
+        # nowe tracki (albo wymagające odświeżenia) - reszta już jest w API
+        camera.report_faces(True)
+        if camera.tracker is not None:
+            selected = [i for i, track in enumerate(tracks) if camera.tracker.needs_embedding(track)]
+            if not selected:
+                return None
+            detections = [detections[i] for i in selected]
+            tracks = [tracks[i] for i in selected]
+
+        if camera.selector is not None:
+            # Ujęcia trafiają do wyboru najlepszego; wybrane wraca przez źródło capture
+            for det, track in zip(detections, tracks):
+                score, _ = camera.scorer.score(det["face"], det["bbox"], det["confidence"], det["keypoints"])
+                camera.selector.offer(track, score, lambda det=det: make_candidate(item, det, inference_class))
+            return None
+
+        item["faces"] = [(det["face"], det["bbox"]) for det in detections]
+        item["tracks"] = tracks
+        return item
+
+    def make_candidate(item, det, inference_class):
+        # Klatka z pierścienia w pamięci współdzielonej zostanie nadpisana - kandydat dostaje kopię
+        frame_rgb, face_img = item["frame"], det["face"]
+        if item.get("frame_ref") is not None:
+            frame_rgb = frame_rgb.copy()
+            if not frame_still_valid(item):
+                return None
+            face_img = inference_class.crop_face(frame_rgb, det["bbox"], det["keypoints"])
+        return {"frame": frame_rgb, "capture_time": item["capture_time"], "face": face_img, "bbox": det["bbox"]}
+
+    def embed(items):
+        # Embeddingi wszystkich twarzy z czekających klatek jednym przebiegiem modelu
+        faces = [face_img for item in items for (face_img, _) in item["faces"]]
+        bboxes = [bbox for item in items for (_, bbox) in item["faces"]]
+        embeddings = model_loader.inference.compute_embeddings(faces, bboxes)
+
+        results = []
+        offset = 0
+        for item in items:
+            count = len(item["faces"])
+            computed = [
+                (emb, track, bbox)
+                for emb, track, (_, bbox) in zip(embeddings[offset:offset + count], item["tracks"], item["faces"])
+                if emb is not None
+            ]
+            offset += count
+            if not frame_still_valid(item):
+                continue
+            tracker = item["camera"].tracker
+            if tracker is not None:
+                for _, track, bbox in computed:
+                    tracker.mark_embedded(track, bbox)
+            item_embeddings = [emb for emb, _, _ in computed]
+            if not item_embeddings:
+                anomaly_handler.log_warning(f"Embedding nie został wyliczony: {item['camera'].camera_url}")
                 continue
+            item["embeddings"] = item_embeddings
+            results.append(item)
+        return results
+
+    def match(item):
+        # Najbliższa osoba w lokalnej galerii dla każdego embeddingu z klatki
+        camera = item["camera"]
+        matches = []
+        for candidates in gallery.search_batch(item["embeddings"], k=1):
+            if candidates and candidates[0][1] >= config["gallery_threshold"]:
+                person_id, similarity = candidates[0]
+                anomaly_handler.face_matched_locally(person_id, similarity, camera.camera_url)
+                matches.append({"person_id": person_id, "similarity": round(similarity, 4)})
+            else:
+                matches.append(None)
+        item["matches"] = matches
+        return item
+
+    def encode(item):
+        # Zamiana całej klatki na base64; RGB->BGR do gotowego, ciągłego bufora
+        # zamiast widoku [:, :, ::-1], który imencode i tak musiałby skopiować
+        frame_rgb = item["frame"]
+        frame_bgr = bgr_buffers.get(frame_rgb.shape)
+        if frame_bgr is None:
+            frame_bgr = bgr_buffers[frame_rgb.shape] = np.empty_like(frame_rgb)
+        cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR, dst=frame_bgr)
+        if not frame_still_valid(item):
+            return None
+        success, buffer = cv2.imencode('.jpg', frame_bgr)
+        if not success:
+            anomaly_handler.log_warning("Nie udało się zakodować klatki do JPEG.")
+            return None
+
+        item["image_base"] = base64.b64encode(buffer).decode('utf-8')
+        item["frame"] = None  # klatka nie jest już potrzebna w kolejnych etapach
+        item["faces"] = None
+        item["tracks"] = None
+        return item
+
+    def upload(item):
+        # Wysyłka do API (osobno dla każdej twarzy w kadrze) - nieblokująca
+        camera = item["camera"]
+        matches = item.get("matches") or [None] * len(item["embeddings"])
+        for embedding, local_match in zip(item["embeddings"], matches):
+            sender.submit(build_payload(
+                camera.kiosk_id, camera.camera_url,
+                embedding, item["capture_time"], item["image_base"], local_match
+            ))
+        return None
+
+    def store(item):
+        # Wywołanie funkcji zapisu na dysk
+        store_local_data(item["image_base"], item["status"], item["resp"])
+        return None
+
+    cameras = len(capture_workers)
+    pipeline = Pipeline(queue_size=config["queue_size"] * cameras)
+    for index, capture_worker in enumerate(capture_workers):
+        pipeline.add_source("capture" if cameras == 1 else f"capture{index}", capture_worker)
+    pipeline.add_stage("detect", detect)
+    pipeline.add_stage("embed", embed, batch_size=config["embed_batch_frames"] or cameras)
+    if gallery is not None:
+        pipeline.add_stage("match", match)
+    pipeline.add_stage("encode", encode)
+    pipeline.add_stage("upload", upload)
+    pipeline.add_stage("store", store)
+    return pipeline
 
-            # Mamy wystarczająco dużą twarz => obliczamy embedding itp.
-            face_detected = True
-            mode_interval = cold_mode
 
-            # (reszta logiki: rysowanie prostokąta, obliczanie embedding, wysyłka do API itd.)
-            embedding = inference_class.compute_embedding(face_img)
-            if embedding is None:
-                anomaly_handler.log_warning("Embedding nie został wyliczony.")
-                continue
+def main():
+    """
+    Główna pętla aplikacji.
+    1) Pobiera z .env m.in. PARAM_WIDTH, PARAM_HEIGHT.
+    2) Uruchamia potok: po wykryciu ruchu czyta klatkę z kamery (jednej albo
+       kilku z CAMERAS - wszystkie dzielą jeden model), wykrywa twarze,
+       sprawdza czy bounding box >= param_width i param_height, liczy embeddingi,
+       wysyła je do API i zapisuje lokalnie - każdy etap w osobnym wątku.
+    """
+    startup_begin = time.perf_counter()
+    startup_timings = {}
 
-            # Zamiana całej klatki na base64
-            frame_bgr = frame_rgb[:, :, ::-1]
-            success, buffer = cv2.imencode('.jpg', frame_bgr)
-            if not success:
-                anomaly_handler.log_warning("Nie udało się zakodować klatki do JPEG.")
-                continue
+    load_dotenv()
+    anomaly_handler.log_info("=== Start aplikacji ===")
 
-            image_base = base64.b64encode(buffer).decode('utf-8')
+    config = load_config()
+    anomaly_handler.log_info(
+        f"Wczytano parametry: PARAM_WIDTH={config['parameter_width']}, PARAM_HEIGHT={config['parameter_height']}"
+    )
+    startup_timings["config"] = time.perf_counter() - startup_begin
+
+    embedding_cache = None
+    if config["embed_cache_size"] > 0:
+        embedding_cache = EmbeddingCache(max_size=config["embed_cache_size"], ttl=config["embed_cache_ttl"])
+
+    # Model (TensorFlow + detektor twarzy) ładuje się w tle; kamera i czujnik startują od razu
+    model_loader = BackgroundModelLoader(
+        model_info={
+            "framework": config["model_framework"],
+            "model": "facenet",
+            "dimension": 128,
+            "path": config["model_path"],
+            "num_threads": config["model_threads"],
+            "detector": {
+                "backend": config["detector_backend"],
+                "model": config["detector_model"],
+                "config": config["detector_config"],
+                "threshold": config["detector_threshold"],
+            },
+            "alignment": {"enabled": config["face_align"], "padding": config["face_align_padding"]},
+        },
+        max_batch_size=config["max_batch_size"],
+        compiled=config["compiled_model"],
+        embedding_cache=embedding_cache,
+        detect_min_face=config["detect_min_face"],
+    ).start()
+
+    # Inicjalizacja strumieni z kamer; kamera, której nie da się otworzyć, jest pomijana
+    camera_start = time.perf_counter()
+    video_readers = []
+    camera_configs = []
+    for camera_config in config["cameras"]:
+        try:
+            video_readers.append(open_video_reader(camera_config))
+            camera_configs.append(camera_config)
+        except ValueError:
+            anomaly_handler.camera_connection_error(camera_config["camera_url"])
+    if not video_readers:
+        return
+    startup_timings["camera_open"] = time.perf_counter() - camera_start
+    anomaly_handler.log_info(f"Kamery: {len(video_readers)}/{len(config['cameras'])}, jeden wspólny model")
+
+    def on_api_result(payload, status, resp):
+        anomaly_handler.log_info(f"Wynik zapisu w API: status={status}, response={resp}")
+        pipeline.put("store", {"image_base": payload["photo"], "status": status, "resp": resp})
+
+    sender = AsyncEmbeddingSender(
+        config["api_url"],
+        on_result=on_api_result,
+        max_queue=config["api_queue_size"],
+        spool_dir=config["api_spool_dir"],
+        max_retries=config["api_retries"],
+    )
+    sensors = [create_sensor(camera_config).start() for camera_config in camera_configs]
+    capture_workers = [
+        CaptureWorker(video_reader, sensor, camera_config)
+        for video_reader, sensor, camera_config in zip(video_readers, sensors, camera_configs)
+    ]
+    gallery, gallery_sync = None, None
+    if config["gallery_dir"]:
+        gallery = EmbeddingGallery(
+            config["gallery_dir"],
+            index=config["gallery_index"],
+            nlist=config["gallery_nlist"],
+            nprobe=config["gallery_nprobe"],
+            index_min_size=config["gallery_index_min_size"],
+        )
+        anomaly_handler.log_info(f"Lokalna galeria: {len(gallery)} embeddingów, {len(gallery.person_ids())} osób")
+        if config["gallery_sync_url"]:
+            gallery_sync = GallerySync(gallery, config["gallery_sync_url"], config["gallery_sync_interval"]).start()
+    pipeline = build_pipeline(config, model_loader, capture_workers, sender, gallery)
+    sender.start()
+    pipeline.start()
+    anomaly_handler.log_info("=== Aplikacja ruszyła w pętli głównej ===")
 
-            if image_base is None:
-                print("image_base jest None – obraz nie został zakodowany!")
-            else:
-                if len(image_base) == 0:
-                    print("image_base jest pusty (ciąg o długości 0)!")
-                else:
-                    print(f"OK, image_base ma długość: {len(image_base)}")
-
-            # Zapis lokalnie, wysyłka do API, itd.
-            
-            status, resp = send_embedding(api_url, kiosk_id, camera_url, embedding, capture_time, image_base)
-            
-            anomaly_handler.log_info(f"Wynik zapisu w API: status={status}, response={resp}")
-            # Wywołanie funkcji zapisu na dysk
-            
-            store_local_data(image_base, status, resp)
-
-        time.sleep(0.05)
-
-
-def check_sensor(sensor_url, username=None, password=None):
-    """ Przykładowe sprawdzanie stanu czujnika. Zwraca True/False. """
-    if not sensor_url:
-        anomaly_handler.log_warning("Brak sensor_url")
-        return False
+    # Wątek główny tylko pilnuje startu modelu i loguje statystyki potoku
+    model_ready = False
+    last_stats_time = time.time()
     try:
-        r = requests.get(sensor_url, auth=HTTPBasicAuth(username, password), timeout=3)
-        r.raise_for_status()
-        data = r.json()
-        value = data.get('LL', {}).get('value')
-        if value == "1":
-            anomaly_handler.log_info("Czujnik => wykryto ruch (value=1).")
-            return True
-        else:
-            anomaly_handler.log_info("Czujnik => brak ruchu (value=0).")
-            return False
-    except requests.RequestException as e:
-        anomaly_handler.sensor_connection_error(sensor_url)
-        return False
+        while True:
+            time.sleep(0.5)
+
+            if not model_ready and model_loader.is_done():
+                if model_loader.inference is None:
+                    anomaly_handler.log_warning("Model FaceNet nie został załadowany - kończę.")
+                    return
+                model_ready = True
+                startup_timings.update(model_loader.timings)
+                startup_timings["time_to_ready"] = time.perf_counter() - startup_begin
+                anomaly_handler.startup_timing(startup_timings)
+
+            if time.time() - last_stats_time >= config["stats_interval"]:
+                last_stats_time = time.time()
+                pipeline.log_stats()
+                anomaly_handler.log_info(f"Wysyłka do API: {sender.stats()}")
+                if embedding_cache is not None:
+                    anomaly_handler.log_info(f"Cache embeddingów: {embedding_cache.stats()}")
+                for worker in capture_workers:
+                    if hasattr(worker.video_reader, "stats"):
+                        anomaly_handler.log_info(f"Kamera {worker.camera_url}: {worker.video_reader.stats()}")
+                    if worker.tracker is not None:
+                        anomaly_handler.log_info(f"Tracker {worker.camera_url}: {worker.tracker.stats()}")
+                    if worker.motion_gate is not None:
+                        anomaly_handler.log_info(f"Bramka ruchu {worker.camera_url}: {worker.motion_gate.stats()}")
+                    if worker.selector is not None:
+                        anomaly_handler.log_info(f"Wybór ujęć {worker.camera_url}: {worker.selector.stats()}")
+    finally:
+        pipeline.stop()
+        sender.stop()
+        if gallery_sync is not None:
+            gallery_sync.stop()
+        for sensor in sensors:
+            sensor.stop()
+        for video_reader in video_readers:
+            if hasattr(video_reader, "stop"):
+                video_reader.stop()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,105 @@
+# model_loader.py
+import threading
+import time
+
+import anomaly_handler
+
+
+def load_face_model(model_path: str = "model.h5", dimension: int = 128):
+    """
+    Ładuje model FaceNet.
+    * plik .h5 - same wagi: budujemy InceptionResNetV1 w Pythonie i wczytujemy wagi,
+    * inny plik (.keras / SavedModel) - gotowy model, np. z export_model.py.
+    """
+    if model_path.endswith(".h5"):
+        from facenet import InceptionResNetV1
+
+        anomaly_handler.log_info(f"Ładowanie modelu FaceNet ({model_path})...")
+        model = InceptionResNetV1(dimension=dimension)
+        model.load_weights(model_path)
+        return model
+
+    from tensorflow.keras.models import load_model
+
+    anomaly_handler.log_info(f"Ładowanie zamrożonego modelu FaceNet ({model_path})...")
+    return load_model(model_path, compile=False)
+
+
+def create_inference(model_info: dict, max_batch_size: int = 8, compiled: bool = True, timings: dict = None,
+                     embedding_cache=None, detect_min_face: int = 0):
+    """
+    Ładuje model i tworzy FaceInference (detektor twarzy + FaceNet).
+    Wszystkie ciężkie importy (TensorFlow, MTCNN / cv2.dnn) dzieją się dopiero tutaj.
+    Czasy poszczególnych kroków są dopisywane do `timings` (w sekundach).
+    """
+    timings = timings if timings is not None else {}
+    framework = model_info.get("framework", "tf")
+
+    face_model = None
+    if framework == "tf":
+        start = time.perf_counter()
+        face_model = load_face_model(model_info.get("path", "model.h5"), model_info.get("dimension", 128))
+        timings["model_load"] = time.perf_counter() - start
+
+        # Jednorazowy trace grafu + rozgrzanie, żeby pierwsza twarz nie płaciła za kompilację
+        if compiled:
+            start = time.perf_counter()
+            from compiled_model import CompiledFaceModel
+
+            face_model = CompiledFaceModel(face_model)
+            face_model.warmup(batch_sizes=sorted({1, max_batch_size}))
+            timings["model_warmup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from face_inference import FaceInference
+
+    inference = FaceInference(face_model=face_model, model_info=model_info, max_batch_size=max_batch_size,
+                              embedding_cache=embedding_cache, detect_min_face=detect_min_face)
+    timings["face_inference_init"] = time.perf_counter() - start
+    return inference
+
+
+class BackgroundModelLoader:
+    """
+    Ładuje FaceInference w osobnym wątku, żeby kamera i czujnik mogły
+    ruszyć od razu po starcie kontenera.
+    """
+
+    def __init__(self, model_info: dict, max_batch_size: int = 8, compiled: bool = True, embedding_cache=None,
+                 detect_min_face: int = 0):
+        self.model_info = model_info
+        self.max_batch_size = max_batch_size
+        self.compiled = compiled
+        self.embedding_cache = embedding_cache
+        self.detect_min_face = detect_min_face
+        self.timings = {}
+        self.inference = None
+        self.error = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.inference = create_inference(
+                self.model_info, self.max_batch_size, self.compiled, self.timings, self.embedding_cache,
+                self.detect_min_face
+            )
+        except Exception as e:
+            self.error = e
+            anomaly_handler.log_error(f"Nie udało się załadować modelu: {str(e)}")
+        finally:
+            self.timings["model_total"] = time.perf_counter() - start
+            self._done.set()
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None):
+        """ Czeka na koniec ładowania i zwraca FaceInference (albo None przy błędzie). """
+        self._done.wait(timeout)
+        return self.inference
@@ -0,0 +1,205 @@
+# pipeline.py
+"""
+Prosty potok etapów (wątków) połączonych ograniczonymi kolejkami.
+
+Źródła (np. odczyt kamery) produkują elementy, kolejne etapy je przetwarzają.
+Gdy etap nie nadąża, jego kolejka wejściowa wyrzuca NAJSTARSZY element, więc
+wolne API czy dysk nigdy nie blokują przechwytywania klatek.
+"""
+import collections
+import queue
+import threading
+import time
+
+import anomaly_handler
+
+
+class DropOldestQueue:
+    """ Ograniczona kolejka, która przy przepełnieniu usuwa najstarszy element. """
+
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = max(1, int(maxsize))
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            return self._items.popleft()
+
+    def get_batch(self, max_items: int, timeout: float = None) -> list:
+        """ Czeka na pierwszy element, potem bez czekania dobiera do max_items. """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            return [self._items.popleft() for _ in range(min(max_items, len(self._items)))]
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+class Stage:
+    """
+    Jeden etap potoku w osobnym wątku.
+    * źródło (in_queue=None): fn() zwraca element albo None, gdy nie ma nic nowego,
+    * etap: fn(item) zwraca element dla następnego etapu albo None (odrzucenie),
+    * etap z batch_size: fn(items) dostaje listę do batch_size elementów
+      (wszystko, co czeka w kolejce) i zwraca listę wyników.
+    """
+
+    def __init__(self, name: str, fn, in_queue: DropOldestQueue = None, idle_sleep: float = 0.05,
+                 batch_size: int = None):
+        self.name = name
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = None
+        self.idle_sleep = idle_sleep
+        self.batch_size = max(1, int(batch_size)) if batch_size is not None else None
+
+        self.processed = 0
+        self.filtered = 0          # elementy, dla których etap nic nie przekazał dalej
+        self.errors = 0
+        self.latency_ms = 0.0      # średnia wykładnicza
+        self.max_latency_ms = 0.0
+        self.batches = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"stage-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _record(self, elapsed_ms: float, count: int = 1):
+        first = self.processed == 0
+        self.processed += count
+        self.batches += 1
+        self.latency_ms = elapsed_ms if first else 0.9 * self.latency_ms + 0.1 * elapsed_ms
+        self.max_latency_ms = max(self.max_latency_ms, elapsed_ms)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.in_queue is None:
+                args = ()
+            elif self.batch_size is not None:
+                try:
+                    args = (self.in_queue.get_batch(self.batch_size, timeout=0.5),)
+                except queue.Empty:
+                    continue
+            else:
+                try:
+                    args = (self.in_queue.get(timeout=0.5),)
+                except queue.Empty:
+                    continue
+
+            start = time.perf_counter()
+            try:
+                result = self.fn(*args)
+            except Exception as e:
+                self.errors += 1
+                anomaly_handler.log_error(f"Błąd w etapie '{self.name}': {str(e)}")
+                if self.in_queue is None:
+                    # Źródło (np. błąd odczytu kamery) nie czeka na kolejkę - bez pauzy kręciłoby się w kółko
+                    time.sleep(self.idle_sleep)
+                continue
+
+            if result is None and self.in_queue is None:
+                # Źródło bez nowego elementu - to nie jest przetworzony element
+                time.sleep(self.idle_sleep)
+                continue
+
+            # Czas i licznik dla każdego przetworzonego elementu, także odfiltrowanego (None)
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            if self.batch_size is not None:
+                self._record(elapsed_ms, len(args[0]))
+                results = [r for r in (result or []) if r is not None]
+                self.filtered += len(args[0]) - len(results)
+            else:
+                self._record(elapsed_ms)
+                results = [] if result is None else [result]
+                self.filtered += result is None
+            if self.out_queue is not None:
+                for r in results:
+                    self.out_queue.put(r)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.in_queue.qsize() if self.in_queue else 0,
+            "dropped": self.in_queue.dropped if self.in_queue else 0,
+            "processed": self.processed,
+            "filtered": self.filtered,
+            "batches": self.batches,
+            "errors": self.errors,
+            "latency_ms": round(self.latency_ms, 1),
+            "max_latency_ms": round(self.max_latency_ms, 1),
+        }
+
+
+class Pipeline:
+    """ Źródła -> etap 1 -> etap 2 -> ... ; wszystkie źródła zasilają pierwszy etap. """
+
+    def __init__(self, queue_size: int = 4, idle_sleep: float = 0.05):
+        self.queue_size = queue_size
+        self.idle_sleep = idle_sleep
+        self.sources = []
+        self.stages = []
+
+    def add_source(self, name: str, fn):
+        self.sources.append(Stage(name, fn, idle_sleep=self.idle_sleep))
+        return self
+
+    def add_stage(self, name: str, fn, queue_size: int = None, batch_size: int = None):
+        in_queue = DropOldestQueue(queue_size or self.queue_size)
+        self.stages.append(Stage(name, fn, in_queue=in_queue, batch_size=batch_size))
+        return self
+
+    def start(self):
+        if self.stages:
+            for source in self.sources:
+                source.out_queue = self.stages[0].in_queue
+        for current, following in zip(self.stages, self.stages[1:]):
+            current.out_queue = following.in_queue
+
+        for stage in self.stages + self.sources:
+            stage.start()
+        anomaly_handler.log_info(
+            f"Potok uruchomiony: {[s.name for s in self.sources]} -> {[s.name for s in self.stages]}"
+        )
+        return self
+
+    def put(self, stage_name: str, item):
+        """ Wkłada element bezpośrednio do kolejki wskazanego etapu (np. z callbacku). """
+        for stage in self.stages:
+            if stage.name == stage_name:
+                stage.in_queue.put(item)
+                return
+        raise KeyError(stage_name)
+
+    def stop(self):
+        for stage in self.sources + self.stages:
+            stage.stop()
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats() for stage in self.sources + self.stages}
+
+    def log_stats(self):
+        parts = [
+            f"{name}[q={s['queue_depth']} drop={s['dropped']} n={s['processed']} f={s['filtered']} b={s['batches']} "
+            f"err={s['errors']} lat={s['latency_ms']}ms max={s['max_latency_ms']}ms]"
+            for name, s in self.stats().items()
+        ]
+        anomaly_handler.log_info("Potok: " + " ".join(parts))
@@ -0,0 +1,180 @@
+# quantize_model.py
+"""
+Kwantyzacja post-training INT8 modelu FaceNet (TFLite).
+
+Kalibracja odbywa się na wycinkach twarzy z katalogu z JPEG-ami (domyślnie
+stored_data/, który wypełnia local_verification.store_local_data). Twarze są
+wycinane przez MTCNN tak samo jak w FaceInference.process_image.
+Wynikowy model ładuje się przez FaceInference z model_info={"framework": "tflite", ...}.
+
+Użycie:
+    python quantize_model.py --weights model.h5 --data stored_data --output model_int8.tflite
+"""
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import anomaly_handler
+from convert_model import build_keras_model, to_tflite
+from embedding_backends import TfliteBackend
+
+
+def load_face_crops(data_dir: str, limit: int = 500, detect: bool = True) -> np.ndarray:
+    """ Wczytuje JPEG-i, wycina twarze i zwraca tablicę (N,160,160,3) float32. """
+    from utils import normalize_input
+
+    detector = None
+    if detect:
+        from mtcnn_client import MtCnnClient
+        from face_inference import FaceInference
+
+        detector = MtCnnClient()
+
+    crops = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.jpg"))):
+        img_bgr = cv2.imread(path)
+        if img_bgr is None:
+            continue
+        img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+
+        faces = [img_rgb]
+        if detector is not None:
+            faces = [FaceInference.extract_face(img_rgb, det["bbox"]) for det in detector.detect_faces(img_rgb)]
+
+        for face in faces:
+            if face is None or face.size == 0:
+                continue
+            crops.append(normalize_input(cv2.resize(face, (160, 160)), "base").astype(np.float32))
+            if len(crops) >= limit:
+                return np.stack(crops)
+
+    if not crops:
+        raise ValueError(f"Brak wycinków twarzy do kalibracji w {data_dir}")
+    return np.stack(crops)
+
+
+def quantize_int8(model, calibration: np.ndarray, output: str, int8_io: bool = False):
+    """ Pełna kwantyzacja INT8 (wagi + aktywacje) z reprezentatywnym zbiorem. """
+    import tensorflow as tf
+
+    def representative_dataset():
+        for crop in calibration:
+            yield [crop[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    if int8_io:
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    with open(output, "wb") as f:
+        f.write(converter.convert())
+
+
+def _median_latency_ms(backend, crops: np.ndarray, iters: int = 30) -> float:
+    sample = crops[:1]
+    backend.predict_batch(sample)
+    times = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        backend.predict_batch(sample)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(times))
+
+
+def _embed(backend, crops: np.ndarray, batch_size: int = 16) -> np.ndarray:
+    return np.concatenate([
+        backend.predict_batch(crops[i:i + batch_size]) for i in range(0, len(crops), batch_size)
+    ])
+
+
+def _cosine_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return 1.0 - np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def _nearest_neighbours(emb: np.ndarray) -> np.ndarray:
+    emb = emb / np.linalg.norm(emb, axis=1, keepdims=True)
+    sim = emb @ emb.T
+    np.fill_diagonal(sim, -np.inf)
+    return np.argmax(sim, axis=1)
+
+
+def accuracy_report(model, fp32_path: str, int8_path: str, evaluation: np.ndarray) -> dict:
+    """ Porównanie embeddingów fp32 (Keras) i int8 (TFLite) oraz opóźnień i rozmiarów. """
+    fp32_backend = TfliteBackend(fp32_path)
+    int8_backend = TfliteBackend(int8_path)
+
+    reference = np.asarray(model(evaluation, training=False))
+    quantized = _embed(int8_backend, evaluation)
+    distance = _cosine_distance(reference, quantized)
+
+    report = {
+        "samples": int(len(evaluation)),
+        "cosine_distance": {
+            "mean": float(np.mean(distance)),
+            "p50": float(np.percentile(distance, 50)),
+            "p95": float(np.percentile(distance, 95)),
+            "max": float(np.max(distance)),
+        },
+        "latency_ms": {
+            "fp32_tflite": _median_latency_ms(fp32_backend, evaluation),
+            "int8_tflite": _median_latency_ms(int8_backend, evaluation),
+        },
+        "size_mb": {
+            "fp32_tflite": os.path.getsize(fp32_path) / 2**20,
+            "int8_tflite": os.path.getsize(int8_path) / 2**20,
+        },
+    }
+    if len(evaluation) > 2:
+        # Czy najbliższy sąsiad każdej twarzy pozostał ten sam po kwantyzacji
+        agreement = _nearest_neighbours(reference) == _nearest_neighbours(quantized)
+        report["nearest_neighbour_agreement"] = float(np.mean(agreement))
+    report["speedup"] = report["latency_ms"]["fp32_tflite"] / report["latency_ms"]["int8_tflite"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kwantyzacja INT8 FaceNet z raportem dokładności")
+    parser.add_argument("--weights", default="model.h5")
+    parser.add_argument("--data", default="stored_data")
+    parser.add_argument("--output", default="model_int8.tflite")
+    parser.add_argument("--report", default="quantization_report.json")
+    parser.add_argument("--limit", type=int, default=500, help="maksymalna liczba wycinków")
+    parser.add_argument("--eval-fraction", type=float, default=0.2,
+                        help="część wycinków odłożona do oceny (nie bierze udziału w kalibracji)")
+    parser.add_argument("--no-detect", action="store_true", help="pliki są już wycinkami twarzy")
+    parser.add_argument("--int8-io", action="store_true", help="wejście i wyjście modelu w int8")
+    args = parser.parse_args()
+
+    crops = load_face_crops(args.data, limit=args.limit, detect=not args.no_detect)
+    rng = np.random.default_rng(0)
+    crops = crops[rng.permutation(len(crops))]
+    n_eval = max(1, int(len(crops) * args.eval_fraction))
+    evaluation, calibration = crops[:n_eval], crops[n_eval:]
+    if len(calibration) == 0:
+        calibration = evaluation
+    anomaly_handler.log_info(f"Kalibracja: {len(calibration)} wycinków, ocena: {len(evaluation)}")
+
+    model = build_keras_model(args.weights)
+    quantize_int8(model, calibration, args.output, int8_io=args.int8_io)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_path = os.path.join(tmp, "model_fp32.tflite")
+        to_tflite(model, fp32_path)
+        report = accuracy_report(model, fp32_path, args.output, evaluation)
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    anomaly_handler.log_info(f"Zapisano {args.output}; raport {args.report}: {json.dumps(report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# sensor_client.py
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+import anomaly_handler
+
+
+class SensorClient:
+    """
+    Klient czujnika zbliżeniowego (endpoint w stylu Loxone /jdev/sps/io/Motion/state).
+
+    Jedna sesja HTTP z keep-alive na cały czas życia aplikacji, więc kolejne
+    odpytania nie płacą za nowe połączenie TCP. Circuit breaker: po
+    `failure_threshold` błędach z rzędu czujnik nie jest odpytywany przez
+    `reset_timeout` sekund, a w logu ląduje jeden wpis zamiast tracebacku
+    przy każdym ticku.
+    """
+
+    def __init__(self, sensor_url, username=None, password=None,
+                 connect_timeout=1.0, read_timeout=2.0,
+                 failure_threshold=3, reset_timeout=30.0):
+        self.sensor_url = sensor_url
+        if not sensor_url:
+            # Raz przy starcie - is_motion() bez URL po prostu zwraca False
+            anomaly_handler.log_warning("Brak sensor_url - czujnik HTTP zawsze zgłasza brak ruchu.")
+        self.timeout = (connect_timeout, read_timeout)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(username, password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.failures = 0
+        self.open_until = 0.0
+        self.skipped_polls = 0
+
+    @property
+    def is_open(self) -> bool:
+        """ True, gdy breaker jest otwarty i czujnik nie jest odpytywany. """
+        return time.time() < self.open_until
+
+    def _on_success(self):
+        if self.failures >= self.failure_threshold:
+            anomaly_handler.log_info(
+                f"Czujnik znów odpowiada: {self.sensor_url} (pominięto {self.skipped_polls} odpytań)"
+            )
+        self.failures = 0
+        self.open_until = 0.0
+        self.skipped_polls = 0
+
+    def _on_failure(self):
+        self.failures += 1
+        if self.failures == 1:
+            # Pełny traceback tylko przy pierwszym błędzie z serii
+            anomaly_handler.sensor_connection_error(self.sensor_url)
+        elif self.failures < self.failure_threshold:
+            anomaly_handler.log_warning(f"Czujnik nie odpowiada ({self.failures}/{self.failure_threshold})")
+
+        if self.failures >= self.failure_threshold:
+            self.open_until = time.time() + self.reset_timeout
+            if self.failures == self.failure_threshold:
+                anomaly_handler.log_warning(
+                    f"Czujnik niedostępny - wstrzymuję odpytywanie na {self.reset_timeout:.0f}s: {self.sensor_url}"
+                )
+
+    def is_motion(self) -> bool:
+        """ Sprawdza stan czujnika. Zwraca True/False (False także przy błędzie). """
+        if not self.sensor_url:
+            return False
+        if self.is_open:
+            self.skipped_polls += 1
+            return False
+
+        try:
+            r = self.session.get(self.sensor_url, timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
+        except (requests.RequestException, ValueError):
+            self._on_failure()
+            return False
+
+        self._on_success()
+        # Zmiany stanu loguje MotionSensor (sensors.py) - tu bez wpisu na każde odpytanie
+        return data.get('LL', {}).get('value') == "1"
+
+    def close(self):
+        self.session.close()
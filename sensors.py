@@ -0,0 +1,214 @@
+# sensors.py
+"""
+Czujniki ruchu zgłaszające zbocza (zmiany stanu) zamiast odpytywania co tick.
+
+Każdy backend dziedziczy po MotionSensor i ustawia stan przez _set_state();
+pętla przechwytywania czeka w wait_for_change() i reaguje od razu na zbocze
+narastające. Backendy:
+  * "http"   - HttpPollingSensor: odpytuje SensorClient we własnym wątku,
+  * "udp"    - UdpPushSensor: sterownik sam wysyła stan datagramem UDP,
+  * "camera" - CameraMotionSensor: różnica kolejnych klatek, gdy brak czujnika,
+  * FakeSensor - stan ustawiany ręcznie (testy, benchmarki).
+"""
+import json
+import socket
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import anomaly_handler
+from sensor_client import SensorClient
+
+
+class MotionSensor:
+    """ Wspólna część: aktualny stan, czas ostatniej zmiany i oczekiwanie na zbocze. """
+
+    # True, gdy czujnik potrzebuje klatek z kamery (feed())
+    needs_frames = False
+
+    def __init__(self):
+        self.motion = False
+        self.last_change = 0.0
+        self.events = 0
+        self._cond = threading.Condition()
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def _set_state(self, motion: bool):
+        with self._cond:
+            if motion == self.motion:
+                return
+            self.motion = motion
+            self.last_change = time.time()
+            self.events += 1
+            self._cond.notify_all()
+        anomaly_handler.sensor_state_change("ruch" if motion else "brak ruchu", int(motion))
+
+    def wait_for_change(self, since: float, timeout: float = None) -> bool:
+        """ Czeka, aż pojawi się zmiana stanu nowsza niż `since`; zwraca aktualny stan. """
+        with self._cond:
+            self._cond.wait_for(lambda: self.last_change > since, timeout)
+            return self.motion
+
+
+class HttpPollingSensor(MotionSensor):
+    """ Dotychczasowy czujnik HTTP, odpytywany w tle co `poll_interval` sekund. """
+
+    def __init__(self, client: SensorClient, poll_interval: float = 0.2):
+        super().__init__()
+        self.client = client
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sensor-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(2.0)
+        self.client.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._set_state(self.client.is_motion())
+            self._stop.wait(self.poll_interval)
+
+
+class UdpPushSensor(MotionSensor):
+    """
+    Czujnik wysyłający stan sam (np. wirtualne wyjście UDP w Loxone).
+    Akceptuje "1"/"0", "on"/"off" oraz JSON {"value": "1"} lub {"LL": {"value": "1"}}.
+    Jeśli hold_time > 0, brak kolejnego "1" przez hold_time sekund oznacza koniec ruchu.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 7777, hold_time: float = 0.0):
+        super().__init__()
+        self.hold_time = hold_time
+        self._last_motion_msg = 0.0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.5)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sensor-udp", daemon=True)
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(2.0)
+        self.sock.close()
+
+    @staticmethod
+    def parse(message: bytes):
+        """ Zwraca True/False dla rozpoznanej wiadomości albo None. """
+        text = message.decode("utf-8", errors="ignore").strip()
+        if text.startswith("{"):
+            try:
+                data = json.loads(text)
+            except ValueError:
+                return None
+            if not isinstance(data, dict):
+                return None
+            data = data.get("LL", data)
+            text = str(data.get("value", "")) if isinstance(data, dict) else ""
+        text = text.lower()
+        if text in ("1", "1.0", "on", "true"):
+            return True
+        if text in ("0", "0.0", "off", "false"):
+            return False
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                message, _ = self.sock.recvfrom(1024)
+            except socket.timeout:
+                message = None
+            except OSError:
+                break
+
+            if message is not None:
+                state = self.parse(message)
+                if state is None:
+                    anomaly_handler.log_warning(f"Nieznana wiadomość z czujnika UDP: {message[:64]!r}")
+                    continue
+                if state:
+                    self._last_motion_msg = time.time()
+                self._set_state(state)
+            elif self.hold_time and self.motion and time.time() - self._last_motion_msg > self.hold_time:
+                self._set_state(False)
+
+
+class CameraMotionSensor(MotionSensor):
+    """
+    Zastępczy czujnik, gdy nie ma czujnika zbliżeniowego: średnia różnica
+    kolejnych, zmniejszonych klatek w skali szarości.
+    """
+
+    needs_frames = True
+
+    def __init__(self, threshold: float = 6.0, size=(64, 48), hold_time: float = 2.0):
+        super().__init__()
+        self.threshold = threshold
+        self.size = size
+        self.hold_time = hold_time
+        self._previous = None
+        self._last_motion = 0.0
+
+    def feed(self, frame_rgb: np.ndarray):
+        small = cv2.resize(cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2GRAY), self.size,
+                           interpolation=cv2.INTER_AREA)
+        previous, self._previous = self._previous, small
+        if previous is None:
+            return
+
+        now = time.time()
+        if float(cv2.absdiff(small, previous).mean()) > self.threshold:
+            self._last_motion = now
+            self._set_state(True)
+        elif now - self._last_motion > self.hold_time:
+            self._set_state(False)
+
+
+class FakeSensor(MotionSensor):
+    """ Czujnik sterowany z kodu - do testów i benchmarków. """
+
+    def set_motion(self, motion: bool):
+        self._set_state(motion)
+
+
+def create_sensor(config) -> MotionSensor:
+    """ Tworzy czujnik na podstawie config["sensor_backend"]. """
+    backend = config.get("sensor_backend", "http")
+
+    if backend == "http":
+        client = SensorClient(
+            config["sensor_url"], config["camera_user"], config["camera_pass"],
+            connect_timeout=config["sensor_connect_timeout"],
+            read_timeout=config["sensor_read_timeout"],
+            failure_threshold=config["sensor_failure_threshold"],
+            reset_timeout=config["sensor_reset_timeout"],
+        )
+        return HttpPollingSensor(client, poll_interval=config["sensor_poll_interval"])
+    if backend == "udp":
+        return UdpPushSensor(port=config["sensor_udp_port"], hold_time=config["sensor_udp_hold_time"])
+    if backend == "camera":
+        return CameraMotionSensor(threshold=config["sensor_motion_threshold"],
+                                  hold_time=config["sensor_hold_time"])
+
+    raise ValueError(f"Nieznany backend czujnika: {backend}")
@@ -0,0 +1,287 @@
+# shared_frames.py
+"""
+Pierścień klatek w pamięci współdzielonej (multiprocessing.shared_memory).
+
+Proces przechwytujący zapisuje zdekodowane klatki do kolejnych slotów, a proces
+główny czyta je jako widoki bez kopii (bez pikowania klatek przez kolejkę).
+Poza GIL działa tylko dekodowanie strumienia; detekcja i embedding to wątki
+potoku w procesie głównym, które dostają widok na slot i przez FrameRef
+sprawdzają, czy nie został nadpisany. Każdy slot ma numer sekwencyjny; jeśli
+writer zdążył go nadpisać, is_valid() zwraca False i wynik liczony na tej
+klatce należy odrzucić.
+"""
+import collections
+import multiprocessing as mp
+import queue
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+import anomaly_handler
+
+
+FrameRef = collections.namedtuple("FrameRef", ["slot", "seq", "capture_time"])
+
+_attach_lock = threading.Lock()
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    """
+    Dołącza istniejący segment bez zgłaszania go do resource_tracker. Python < 3.13
+    rejestruje także dołączany segment, więc przy wyjściu tracker usuwałby cudzy
+    segment i ostrzegał o wycieku. Wyrejestrowanie zaraz po dołączeniu nie
+    wystarcza: proces potomny ze spawn dzieli tracker z rodzicem, więc
+    unregister skasowałby wpis twórcy, a jego unlink() kończyłby się KeyError.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=False, track=False)
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name, create=False)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedFrameRing:
+    """
+    Układ pamięci: seq int64[slots] | timestamps float64[slots] | write_count int64 | klatki uint8.
+    seq[slot] == -1 oznacza zapis w toku.
+    """
+
+    def __init__(self, shape, slots: int = 16, name: str = None, create: bool = True, first_seq: int = 0):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        header_bytes = slots * 8 * 2 + 8
+
+        # Segment usuwa (unlink) tylko proces, który go utworzył
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * frame_bytes)
+        else:
+            self.shm = _attach_segment(name)
+
+        buf = self.shm.buf
+        self.seq = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=0)
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=slots * 8)
+        self.write_count = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=slots * 16)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buf, offset=header_bytes)
+        if create:
+            # Pierścień zastępujący poprzedni kontynuuje numerację - stare FrameRef nie pasują
+            self.seq[:] = 0
+            self.write_count[0] = first_seq
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def attach(cls, name: str, shape, slots: int):
+        return cls(shape, slots=slots, name=name, create=False)
+
+    def write(self, frame: np.ndarray, capture_time: float) -> FrameRef:
+        seq = int(self.write_count[0]) + 1
+        slot = (seq - 1) % self.slots
+        self.seq[slot] = -1
+        np.copyto(self.frames[slot], frame)
+        self.timestamps[slot] = capture_time
+        self.seq[slot] = seq
+        self.write_count[0] = seq
+        return FrameRef(slot, seq, capture_time)
+
+    def latest(self):
+        """ FrameRef najnowszej klatki albo None, jeśli nic jeszcze nie zapisano. """
+        seq = int(self.write_count[0])
+        if seq == 0:
+            return None
+        slot = (seq - 1) % self.slots
+        return FrameRef(slot, seq, float(self.timestamps[slot]))
+
+    def is_valid(self, ref: FrameRef) -> bool:
+        return int(self.seq[ref.slot]) == ref.seq
+
+    def view(self, ref: FrameRef):
+        """ Widok (bez kopii) na klatkę; None, jeśli slot został już nadpisany. """
+        return self.frames[ref.slot] if self.is_valid(ref) else None
+
+    def close(self):
+        # Widoki numpy trzymają bufor - trzeba je puścić przed zamknięciem
+        self.seq = self.timestamps = self.write_count = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            anomaly_handler.log_warning("Pierścień klatek zamykany z aktywnymi widokami - zwolni go GC.")
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def capture_process(camera_url, username, password, slots, ring_queue, stop_event):
+    """
+    Proces potomny: czyta kamerę przez VideoReader i zapisuje klatki do pierścienia.
+    Pierścień powstaje po pierwszej klatce (dopiero wtedy znamy rozdzielczość);
+    jego nazwa i kształt idą do rodzica przez ring_queue. Po zmianie
+    rozdzielczości powstaje nowy pierścień (ogłaszany tak samo), a stary jest usuwany.
+    """
+    from video_reader import VideoReader
+
+    try:
+        reader = VideoReader(camera_url, username, password)
+    except ValueError:
+        anomaly_handler.camera_connection_error(camera_url)
+        ring_queue.put(None)
+        return
+
+    ring = None
+    try:
+        while not stop_event.is_set():
+            frame_rgb, capture_time = reader.read_frame()
+            if frame_rgb is None:
+                time.sleep(0.05)
+                continue
+            if ring is None or frame_rgb.shape != ring.shape:
+                old_ring = ring
+                first_seq = 0
+                if old_ring is not None:
+                    anomaly_handler.log_warning(
+                        f"Zmieniła się rozdzielczość kamery: {old_ring.shape} -> {frame_rgb.shape} - nowy pierścień."
+                    )
+                    first_seq = int(old_ring.write_count[0])
+                ring = SharedFrameRing(frame_rgb.shape, slots=slots, first_seq=first_seq)
+                ring_queue.put((ring.name, frame_rgb.shape, slots))
+                if old_ring is not None:
+                    # Rodzic trzyma własne mapowanie - unlink usuwa tylko nazwę
+                    old_ring.close()
+                    old_ring.unlink()
+            if not isinstance(capture_time, (int, float)):
+                capture_time = time.time()
+            ring.write(frame_rgb, capture_time)
+    finally:
+        if ring is not None:
+            ring.close()
+            ring.unlink()
+
+
+class SharedMemoryVideoReader:
+    """
+    Strona konsumenta: uruchamia capture_process w osobnym procesie (dekodowanie
+    poza GIL) i zwraca najnowszą klatkę z pierścienia jako widok bez kopii.
+    Interfejs read_frame() jak w VideoReader; last_ref to FrameRef ostatnio
+    zwróconej klatki, do sprawdzenia is_valid() po dłuższym przetwarzaniu.
+    """
+
+    def __init__(self, camera_url, username=None, password=None, slots: int = 16, start_timeout: float = 30.0):
+        self.camera_url = camera_url
+        self.username = username
+        self.password = password
+        self.slots = slots
+        self.start_timeout = start_timeout
+
+        self.ring = None
+        self.last_ref = None
+        self.overwritten = 0
+        self._ctx = mp.get_context("spawn")
+        self._stop_event = self._ctx.Event()
+        self._process = None
+        self._ring_queue = None
+        self._retired_ring = None
+
+    def start(self):
+        self._ring_queue = ring_queue = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=capture_process,
+            args=(self.camera_url, self.username, self.password, self.slots, ring_queue, self._stop_event),
+            name="capture-process",
+            daemon=True,
+        )
+        self._process.start()
+        try:
+            info = ring_queue.get(timeout=self.start_timeout)
+        except queue.Empty:
+            info = None
+        if info is None:
+            self.stop()
+            raise ValueError(f"Proces kamery nie dostarczył klatki: {self.camera_url}")
+
+        name, shape, slots = info
+        self.ring = SharedFrameRing.attach(name, shape, slots)
+        return self
+
+    def _switch_ring(self):
+        """ Przechodzi na nowy pierścień, jeśli proces kamery ogłosił go po zmianie rozdzielczości. """
+        info = None
+        while True:
+            try:
+                info = self._ring_queue.get_nowait()
+            except queue.Empty:
+                break
+        if info is None:
+            return
+        name, shape, slots = info
+        try:
+            ring = SharedFrameRing.attach(name, shape, slots)
+        except FileNotFoundError:
+            # Zdążył go już zastąpić kolejny - ogłoszenie przyjdzie osobno
+            return
+        # Poprzedni pierścień zostaje otwarty do następnej zmiany: etapy potoku
+        # mogą jeszcze sprawdzać na nim is_valid() albo trzymać widok klatki
+        if self._retired_ring is not None:
+            self._retired_ring.close()
+        self._retired_ring, self.ring = self.ring, ring
+        self.last_ref = None
+        anomaly_handler.log_info(f"Kamera {self.camera_url}: nowy pierścień klatek {shape}")
+
+    def read_frame(self, only_new: bool = False):
+        # Martwy proces kamery - ostatni slot nie jest już aktualną klatką
+        if self._process is None or not self._process.is_alive():
+            return None, None
+        self._switch_ring()
+        ref = self.ring.latest()
+        if ref is None or (only_new and self.last_ref is not None and ref.seq == self.last_ref.seq):
+            return None, None
+        frame = self.ring.view(ref)
+        if frame is None:
+            return None, None
+        self.last_ref = ref
+        return frame, ref.capture_time
+
+    def is_valid(self, ref: FrameRef) -> bool:
+        valid = self.ring.is_valid(ref)
+        if not valid:
+            self.overwritten += 1
+        return valid
+
+    def stop(self):
+        self._stop_event.set()
+        killed = False
+        if self._process is not None:
+            self._process.join(5.0)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join(5.0)
+            # Zabity proces nie doszedł do unlink() - segment usuwa rodzic
+            killed = self._process.exitcode is not None and self._process.exitcode < 0
+        if self.ring is not None:
+            if killed:
+                self._switch_ring()
+                try:
+                    self.ring.unlink()
+                except FileNotFoundError:
+                    pass
+            self.ring.close()
+            self.ring = None
+        if self._retired_ring is not None:
+            self._retired_ring.close()
+            self._retired_ring = None
+
+    def stats(self) -> dict:
+        latest = self.ring.latest() if self.ring else None
+        return {
+            "written": latest.seq if latest else 0,
+            "overwritten": self.overwritten,
+            "process_alive": self._process.is_alive() if self._process else False,
+        }
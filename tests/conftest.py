@@ -0,0 +1,46 @@
+# conftest.py
+import logging
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anomaly_handler  # noqa: E402
+
+try:
+    import video_reader  # noqa: F401
+except ImportError:
+    # video_reader.py (kamera przez OpenCV) nie jest w repozytorium; main importuje z niego
+    # tylko VideoReader, a testy podają własny czytnik klatek
+    class VideoReader:
+        def __init__(self, *args, **kwargs):
+            raise ValueError("video_reader niedostępny w testach")
+
+    sys.modules["video_reader"] = types.ModuleType("video_reader")
+    sys.modules["video_reader"].VideoReader = VideoReader
+
+try:
+    import utils  # noqa: F401
+except ImportError:
+    # utils.py też jest poza repozytorium; face_preprocessing bierze z niego
+    # normalize_input - tryby jak w oryginale (deepface)
+    import numpy as np
+
+    def normalize_input(img, normalization="base"):
+        if normalization == "base":
+            return img
+        img = img.astype(np.float32)
+        if normalization == "Facenet":
+            return (img - img.mean()) / img.std()
+        if normalization == "Facenet2018":
+            return img / 127.5 - 1
+        raise ValueError(f"Nieznana normalizacja: {normalization}")
+
+    sys.modules["utils"] = types.ModuleType("utils")
+    sys.modules["utils"].normalize_input = normalize_input
+
+# Testy nie dopisują do app.log w repozytorium - zostaje tylko log na konsolę
+anomaly_handler.logger.removeHandler(anomaly_handler.handler)
+anomaly_handler.handler.close()
+anomaly_handler.logger.setLevel(logging.ERROR)
@@ -0,0 +1,129 @@
+# test_api_notifier.py
+"""
+AsyncEmbeddingSender na lokalnym zastępniku API (http.server): ponowienia,
+zrzut na dysk w trakcie awarii i dosłanie wszystkiego po jej końcu.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api_notifier import AsyncEmbeddingSender, build_payload
+
+
+class StandInApi(BaseHTTPRequestHandler):
+    """ 503 dla pierwszych `fail_first` żądań i przez całą awarię (`down`), potem 200. """
+    fail_first = 0
+    down = False
+    requests = 0
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls = type(self)
+        cls.requests += 1
+        if cls.down or cls.requests <= cls.fail_first:
+            self.send_response(503)
+            self.end_headers()
+            return
+        cls.received.append(json.loads(body)["kiosk_id"])
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api():
+    handler = type("Handler", (StandInApi,), {"received": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def make_sender(url, tmp_path, results, **kwargs):
+    return AsyncEmbeddingSender(
+        url, on_result=lambda payload, status, resp: results.append(payload["kiosk_id"]),
+        spool_dir=str(tmp_path / "spool"), timeout=(1.0, 2.0), backoff_base=0.01, backoff_max=0.05, **kwargs
+    ).start()
+
+
+def event(event_id):
+    return build_payload(event_id, "cam", [0.0] * 128, time.time(), "photo")
+
+
+def test_retry_after_server_errors(api, tmp_path):
+    handler, url = api
+    handler.fail_first = 2
+    results = []
+    sender = make_sender(url, tmp_path, results, max_retries=3)
+    try:
+        sender.submit(event("e0"))
+        assert wait_for(lambda: results == ["e0"])
+        stats = sender.stats()
+    finally:
+        sender.stop()
+
+    assert handler.requests == 3
+    assert stats["retried"] == 2
+    assert stats["spilled"] == 0
+    assert stats["sent"] == 1
+
+
+def test_outage_spills_to_disk_and_replays_everything(api, tmp_path):
+    handler, url = api
+    handler.down = True
+    results = []
+    sender = make_sender(url, tmp_path, results, max_retries=1)
+    submitted = [f"e{i}" for i in range(30)]
+    try:
+        for event_id in submitted:
+            sender.submit(event(event_id))
+        assert wait_for(lambda: sender.stats()["spooled"] == len(submitted))
+        assert results == []
+        assert sender.stats()["spilled"] == len(submitted)
+
+        handler.down = False
+        assert wait_for(lambda: len(results) == len(submitted))
+        stats = sender.stats()
+    finally:
+        sender.stop()
+
+    assert sorted(results) == sorted(submitted)
+    assert sorted(handler.received) == sorted(submitted)
+    assert stats["spooled"] == 0
+    assert stats["replayed"] == len(submitted)
+
+
+def test_spool_drains_in_one_pass_when_idle(api, tmp_path):
+    handler, url = api
+    results = []
+    sender = make_sender(url, tmp_path, results)
+    try:
+        # Zaległości z poprzedniej awarii, API już działa, nowych zdarzeń brak
+        for i in range(200):
+            sender.spool.push(event(f"s{i}"))
+        start = time.time()
+        assert wait_for(lambda: len(results) == 200, timeout=20.0)
+        elapsed = time.time() - start
+    finally:
+        sender.stop()
+
+    # Po jednym zdarzeniu na obrót (0.5 s) trwałoby to ~100 s
+    assert elapsed < 10.0
@@ -0,0 +1,148 @@
+# test_bounding_box.py
+"""
+BoundingBoxArray (macierze IoU, NMS) zgodne z parami BoundingBox.iou,
+także dla pustych i zdegenerowanych bboxów; CompactBoundingBox: niezmienność,
+cache pól pochodnych, __eq__/__hash__ i zgodność z metodami BoundingBox.
+"""
+import numpy as np
+import pytest
+
+from bounding_box import BoundingBox, BoundingBoxArray, CompactBoundingBox
+
+BOXES = [
+    [0, 0, 10, 10],
+    [5, 5, 15, 15],
+    [10, 10, 20, 20],    # styka się rogiem z pierwszym
+    [3, 3, 3, 8],        # zerowa szerokość
+    [4, 4, 4, 4],        # punkt
+    [0, 0, 10, 10],      # duplikat
+    [30, 30, 40, 35],    # rozłączny
+    [12, 0, 8, 10],      # odwrócony (x2 < x1)
+]
+
+
+def pairwise_iou(boxes_a, boxes_b):
+    return np.array([[BoundingBox(a).iou(BoundingBox(b)) for b in boxes_b] for a in boxes_a])
+
+
+def reference_nms(boxes, scores, iou_threshold):
+    order = sorted(range(len(boxes)), key=lambda i: -scores[i])
+    keep = []
+    for i in order:
+        if all(BoundingBox(boxes[i]).iou(BoundingBox(boxes[k])) <= iou_threshold for k in keep):
+            keep.append(i)
+    return keep
+
+
+def test_iou_matrix_matches_pairwise():
+    array = BoundingBoxArray(BOXES)
+    np.testing.assert_allclose(array.iou(), pairwise_iou(BOXES, BOXES), atol=1e-12)
+
+    others = BOXES[:3]
+    np.testing.assert_allclose(array.iou(BoundingBoxArray(others)), pairwise_iou(BOXES, others), atol=1e-12)
+
+
+def test_iou_matrix_empty():
+    empty = BoundingBoxArray()
+    assert empty.iou().shape == (0, 0)
+    assert empty.iou(BoundingBoxArray(BOXES)).shape == (0, len(BOXES))
+    assert BoundingBoxArray(BOXES).iou(empty).shape == (len(BOXES), 0)
+
+
+def test_degenerate_boxes_have_zero_iou():
+    ious = BoundingBoxArray(BOXES).iou()
+    assert np.all(np.isfinite(ious))
+    assert ious[3, 3] == 0.0 and ious[4, 4] == 0.0
+
+
+@pytest.mark.parametrize("iou_threshold", [0.0, 0.1, 0.3, 0.5, 0.9])
+def test_nms_matches_pairwise_reference(iou_threshold):
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 200, size=(40, 2))
+    sizes = rng.uniform(0, 60, size=(40, 2))
+    boxes = np.concatenate([corners, corners + sizes], axis=1).tolist() + BOXES
+    scores = rng.uniform(size=len(boxes)).tolist()
+
+    kept = BoundingBoxArray(boxes).nms(iou_threshold, scores)
+    assert kept.tolist() == reference_nms(boxes, scores, iou_threshold)
+
+
+def test_nms_without_scores_prefers_larger_boxes():
+    kept = BoundingBoxArray([[0, 0, 10, 10], [0, 0, 20, 20], [100, 100, 110, 110]]).nms(0.2)
+    assert kept.tolist() == [1, 2]
+    assert BoundingBoxArray().nms().tolist() == []
+
+
+@pytest.mark.parametrize("xyxy", [[10, 20, 50, 80], [0, 0, 7, 3], [5, 5, 5, 9]])
+def test_compact_box_matches_legacy_box(xyxy):
+    legacy, compact = BoundingBox(list(xyxy)), CompactBoundingBox(xyxy)
+    other = BoundingBox([30, 40, 90, 100])
+    other_xywh = [30, 40, 60, 60]
+
+    assert (compact.width, compact.height, compact.area) == (legacy.width, legacy.height, legacy.area)
+    assert compact.to_xyxy() == legacy.to_xyxy()
+    assert compact.to_xywh() == legacy.to_xywh()
+    assert compact.to_xcyc() == legacy.to_xcyc()
+    assert compact.to_dict() == legacy.to_dict()
+    assert compact.to_fiftyone(640, 480) == legacy.to_fiftyone(640, 480)
+    assert compact.to_yolov5(640, 480) == legacy.to_yolov5(640, 480)
+    assert compact.aspect_ratio == legacy.aspect_ratio
+    assert compact.perimeter == legacy.perimeter
+    assert compact.calc_dist(other) == pytest.approx(legacy.calc_dist(other))
+    assert compact.intersection_area(other) == legacy.intersection_area(other)
+    assert compact.intersection_area(other_xywh) == legacy.intersection_area(other_xywh)
+    assert compact.iou(other) == pytest.approx(legacy.iou(other))
+    assert compact.iou(other_xywh) == pytest.approx(legacy.iou(other_xywh))
+    assert compact.overlap(other) == legacy.overlap(other)
+    assert compact.contains((30, 50)) == legacy.contains((30, 50))
+
+    # Stare API zmienia bbox w miejscu, nowe zwraca nowy
+    moved = compact.translate(3, -2)
+    legacy.translate(3, -2)
+    assert moved.to_xyxy() == legacy.to_xyxy() and moved.area == legacy.area
+    resized = moved.resize(1.5)
+    legacy.resize(1.5)
+    assert resized.to_xyxy() == legacy.to_xyxy() and resized.area == legacy.area
+    assert compact.to_xyxy() == list(xyxy)
+
+
+def test_compact_box_is_immutable_by_default():
+    box = CompactBoundingBox([0, 0, 10, 10])
+    with pytest.raises(AttributeError):
+        box.x1 = 5
+    with pytest.raises(AttributeError):
+        box.extra = 1
+    assert not hasattr(box, "__dict__")
+    assert box.translate(1, 1) is not box and box.to_xyxy() == [0, 0, 10, 10]
+
+
+def test_compact_box_caches_derived_fields():
+    box = CompactBoundingBox([0, 0, 10, 20])
+    assert box._derived is None
+    assert box.area == 200
+    cached = box._derived
+    assert cached == (10, 20, 200, (5, 10))
+    box.width, box.to_xcyc()
+    assert box._derived is cached
+
+
+def test_mutable_compact_box_drops_cache_on_assignment():
+    box = CompactBoundingBox([0, 0, 10, 10], frozen=False)
+    assert box.area == 100
+    box.x2 = 20
+    assert box.width == 20 and box.area == 200
+    with pytest.raises(AttributeError):
+        box.area = 5
+    with pytest.raises(TypeError):
+        hash(box)
+
+
+def test_compact_box_equality_and_hash():
+    a, b = CompactBoundingBox([1, 2, 3, 4]), CompactBoundingBox([1, 2, 3, 4])
+    assert a == b and hash(a) == hash(b)
+    assert len({a, b, CompactBoundingBox([1, 2, 3, 5])}) == 2
+    assert a == BoundingBox([1, 2, 3, 4])
+    assert a != CompactBoundingBox([0, 2, 3, 4])
+    assert a != "1,2,3,4"
+    assert CompactBoundingBox.from_box(BoundingBox([1, 2, 3, 4])) == a
+    assert a.to_bounding_box().to_xyxy() == [1, 2, 3, 4]
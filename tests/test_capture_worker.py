@@ -0,0 +1,81 @@
+# test_capture_worker.py
+"""
+Obsługa zboczy czujnika w CaptureWorker, sterowana przez FakeSensor:
+klatka od razu na zbocze narastające, potem co mode_interval, nic bez ruchu.
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import main
+from sensors import FakeSensor
+
+
+class FakeReader:
+    """ Za każdym odczytem nowa klatka z nowym czasem przechwycenia. """
+
+    def __init__(self):
+        self.reads = 0
+
+    def read_frame(self):
+        self.reads += 1
+        return np.zeros((48, 64, 3), dtype=np.uint8), 1000.0 + self.reads
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.delenv("CAMERAS", raising=False)
+    monkeypatch.setenv("COLD_MODE", "1.0")
+    monkeypatch.setenv("HOT_MODE", "0.8")
+    monkeypatch.setenv("BEST_FRAME_WINDOW", "0")
+    config = main.load_config()["cameras"][0]
+    return main.CaptureWorker(FakeReader(), FakeSensor(), config)
+
+
+def test_no_motion_reads_no_frames(worker):
+    assert worker() is None
+    assert worker.video_reader.reads == 0
+
+
+def test_rising_edge_gives_frame_immediately_then_waits_for_interval(worker):
+    worker.sensor.set_motion(True)
+    item = worker()
+    assert item is not None and item["camera"] is worker
+    assert worker.video_reader.reads == 1
+
+    # W trakcie ruchu, przed upływem mode_interval - bez nowej klatki
+    assert worker() is None
+    assert worker.video_reader.reads == 1
+
+    worker.last_check_time -= worker.mode_interval
+    assert worker() is not None
+    assert worker.video_reader.reads == 2
+
+
+def test_falling_edge_resets_and_next_rising_edge_is_immediate(worker):
+    worker.sensor.set_motion(True)
+    assert worker() is not None
+    worker.report_faces(True)
+
+    worker.sensor.set_motion(False)
+    assert worker() is None
+    assert worker.face_detected is False
+    assert worker.mode_interval == worker.cold_mode
+
+    # Nowe zbocze zaraz po poprzedniej klatce - interwał nie obowiązuje
+    worker.sensor.set_motion(True)
+    assert worker() is not None
+    assert worker.video_reader.reads == 2
+
+
+def test_waiting_worker_wakes_on_rising_edge(worker):
+    timer = threading.Timer(0.1, worker.sensor.set_motion, args=(True,))
+    timer.start()
+    start = time.time()
+    item = worker()
+    timer.join()
+
+    assert item is not None
+    assert time.time() - start < 0.45
@@ -0,0 +1,66 @@
+# test_embedding_cache.py
+"""
+EmbeddingCache: wygasanie po TTL, usuwanie najdawniej używanego (LRU)
+i trafienie dla sąsiedniego dHash w tej samej komórce bboxa.
+"""
+import numpy as np
+
+from bounding_box import BoundingBox
+from embedding_cache import EmbeddingCache
+
+
+def face(seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size=(120, 100, 3), dtype=np.uint8)
+
+
+def test_entry_expires_after_ttl():
+    cache = EmbeddingCache(ttl=5.0)
+    key = cache.key(face(), BoundingBox([10, 10, 110, 130]))
+    cache.put(key, "emb", now=100.0)
+
+    assert cache.get(key, now=105.0) == "emb"
+    assert cache.get(key, now=105.1) is None
+    assert cache.stats()["expired"] == 1 and cache.stats()["size"] == 0
+    assert cache.get(key, now=105.2) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = EmbeddingCache(max_size=2, ttl=60.0, max_distance=0)
+    keys = [(hash_value, (i, 0, i, 0)) for i, hash_value in enumerate((0x1, 0x2, 0x3))]
+    cache.put(keys[0], "a", now=0.0)
+    cache.put(keys[1], "b", now=0.0)
+    assert cache.get(keys[0], now=1.0) == "a"     # "a" świeżo użyte, najstarsze jest "b"
+
+    cache.put(keys[2], "c", now=2.0)
+    assert cache.get(keys[1], now=3.0) is None
+    assert cache.get(keys[0], now=3.0) == "a"
+    assert cache.get(keys[2], now=3.0) == "c"
+    assert cache.stats()["evicted"] == 1
+
+
+def test_neighbouring_hash_in_same_bbox_cell_hits():
+    cache = EmbeddingCache(ttl=60.0, bbox_grid=8, max_distance=4)
+    bbox = BoundingBox([40, 40, 140, 160])
+    face_hash, cell = cache.key(face(), bbox)
+    cache.put((face_hash, cell), "emb", now=0.0)
+
+    # Szum: 3 bity różnicy, bbox przesunięty o 2 px (ta sama komórka siatki)
+    noisy_hash = face_hash ^ 0b1011
+    shifted_cell = cache.key(face(), BoundingBox([42, 41, 142, 161]))[1]
+    assert shifted_cell == cell
+    assert cache.get((noisy_hash, shifted_cell), now=1.0) == "emb"
+
+    # Za dużo bitów albo inna komórka bboxa - brak trafienia
+    assert cache.get((face_hash ^ 0b11111, cell), now=1.0) is None
+    far_cell = cache.key(face(), BoundingBox([200, 40, 300, 160]))[1]
+    assert cache.get((face_hash, far_cell), now=1.0) is None
+
+
+def test_dhash_stable_under_mild_noise():
+    img = np.zeros((120, 100, 3), dtype=np.uint8)
+    img[:, :, :] = np.linspace(0, 255, 100, dtype=np.uint8)[None, :, None]
+    img[30:90, 20:40] = 40
+    noisy = np.clip(img.astype(np.int16) + np.random.default_rng(1).integers(-3, 4, img.shape), 0, 255)
+    distance = (EmbeddingCache.dhash(img) ^ EmbeddingCache.dhash(noisy.astype(np.uint8))).bit_count()
+    assert distance <= 4
+    assert EmbeddingCache.dhash(img) != EmbeddingCache.dhash(face(3))
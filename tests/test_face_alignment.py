@@ -0,0 +1,80 @@
+# test_face_alignment.py
+"""
+FaceAligner: punkty będące znanym przekształceniem podobieństwa wzorca
+wracają na wzorzec, a twarze bez wymaganych punktów dostają None.
+"""
+import math
+
+import numpy as np
+
+from face_alignment import KEYPOINT_NAMES, FaceAligner
+
+
+def similarity(scale, angle, tx, ty):
+    cos, sin = scale * math.cos(angle), scale * math.sin(angle)
+    return np.array([[cos, -sin, tx], [sin, cos, ty]])
+
+
+def apply(matrix, points):
+    return points @ matrix[:, :2].T + matrix[:, 2]
+
+
+def keypoints_of(points, skip=()):
+    return {name: tuple(p) for name, p in zip(KEYPOINT_NAMES, points) if name not in skip}
+
+
+def test_transform_recovers_known_similarity():
+    aligner = FaceAligner()
+    forward = similarity(1.7, math.radians(20), 250.0, 120.0)   # wzorzec -> klatka
+    points = apply(forward, aligner.template)
+
+    [matrix], [ok] = aligner.transforms([keypoints_of(points)])
+    assert ok
+    np.testing.assert_allclose(apply(matrix, points), aligner.template, atol=1e-9)
+
+    inverse = np.linalg.inv(np.vstack([forward, [0, 0, 1]]))[:2]
+    np.testing.assert_allclose(matrix, inverse, atol=1e-9)
+
+
+def test_transform_without_nose_still_exact():
+    aligner = FaceAligner(size=112, padding=0.0)
+    points = apply(similarity(0.8, math.radians(-35), 40.0, 90.0), aligner.template)
+    [matrix], [ok] = aligner.transforms([keypoints_of(points, skip=("nose",))])
+    assert ok
+    np.testing.assert_allclose(apply(matrix, points), aligner.template, atol=1e-9)
+
+
+def test_aligned_crop_samples_frame_at_template():
+    aligner = FaceAligner()
+    forward = similarity(1.5, math.radians(-15), 260.0, 150.0)
+    points = apply(forward, aligner.template)
+
+    # Kanały = współrzędne x, y piksela: interpolacja liniowa odtwarza je dokładnie
+    ys, xs = np.mgrid[0:480, 0:640].astype(np.float32)
+    frame = np.dstack([xs, ys, np.zeros_like(xs)])
+    [face] = aligner.align(frame, [keypoints_of(points)])
+
+    assert face.shape == (160, 160, 3)
+    vs, us = np.mgrid[0:160, 0:160]
+    expected = apply(forward, np.stack([us.ravel(), vs.ravel()], axis=1)).reshape(160, 160, 2)
+    np.testing.assert_allclose(face[..., :2], expected, atol=1e-2)
+
+
+def test_missing_keypoints_fall_back_to_none():
+    aligner = FaceAligner()
+    points = apply(similarity(1.0, 0.0, 100.0, 100.0), aligner.template)
+    keypoints_list = [
+        keypoints_of(points, skip=("mouth_left",)),
+        None,
+        keypoints_of(points),
+        keypoints_of(np.full((5, 2), 50.0)),   # wszystkie punkty w jednym miejscu
+    ]
+
+    _, valid = aligner.transforms(keypoints_list)
+    assert valid.tolist() == [False, False, True, False]
+
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    faces = aligner.align(frame, keypoints_list)
+    assert [face is None for face in faces] == [True, True, False, True]
+    assert faces[2].shape == (160, 160, 3)
+    assert aligner.align(frame, []) == []
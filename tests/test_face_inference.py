@@ -0,0 +1,92 @@
+# test_face_inference.py
+"""
+FaceInference.detect_faces: bboxy i punkty z fragmentu ROI i ze
+zmniejszonego obrazu wracają do współrzędnych pełnej klatki.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from bounding_box import BoundingBox
+from face_inference import FaceInference
+
+KEYPOINTS = {"left_eye": (30, 45), "right_eye": (50, 45), "nose": (40, 55),
+             "mouth_left": (32, 68), "mouth_right": (48, 68)}
+
+
+class FakeDetector:
+    """ Zwraca stałe detekcje we współrzędnych obrazu, który dostał. """
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.images = []
+
+    def detect_faces(self, img_rgb):
+        self.images.append(img_rgb)
+        return [{"bbox": BoundingBox(list(box)), "confidence": 0.9, "keypoints": dict(KEYPOINTS)}
+                for box in self.boxes]
+
+
+def make_inference(detector, detect_min_face=0):
+    # Bez backendu embeddingów - detect_faces potrzebuje tylko detektora
+    inference = FaceInference.__new__(FaceInference)
+    inference.detector = detector
+    inference.detect_min_face = detect_min_face
+    inference.aligner = None
+    return inference
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+
+
+def test_full_frame_detections_unchanged(frame):
+    detector = FakeDetector([[20, 30, 60, 80]])
+    [face] = make_inference(detector).detect_faces(frame)
+
+    assert detector.images[0] is frame
+    assert face["bbox"].to_xyxy() == [20, 30, 60, 80]
+    assert face["keypoints"] == KEYPOINTS
+    np.testing.assert_array_equal(face["face"], frame[30:80, 20:60])
+
+
+def test_roi_detections_mapped_to_frame(frame):
+    detector = FakeDetector([[20, 30, 60, 80]])
+    [face] = make_inference(detector).detect_faces(frame, roi=BoundingBox([200, 100, 520, 420]))
+
+    np.testing.assert_array_equal(detector.images[0], frame[100:420, 200:520])
+    assert face["bbox"].to_xyxy() == [220, 130, 260, 180]
+    assert face["keypoints"]["left_eye"] == (230, 145)
+    assert face["keypoints"]["mouth_right"] == (248, 168)
+    np.testing.assert_array_equal(face["face"], frame[130:180, 220:260])
+
+
+def test_downscaled_roi_detections_mapped_to_frame(frame):
+    detector = FakeDetector([[20, 30, 60, 80], [150, 150, 160, 160]])
+    inference = make_inference(detector, detect_min_face=40)
+    faces = inference.detect_faces(frame, roi=BoundingBox([200, 100, 520, 420]), min_face_size=80)
+
+    # Najmniejsza twarz 80 px -> 40 px: fragment 320x320 zmniejszony o połowę
+    expected_input = cv2.resize(frame[100:420, 200:520], (160, 160), interpolation=cv2.INTER_AREA)
+    np.testing.assert_array_equal(detector.images[0], expected_input)
+
+    assert [f["bbox"].to_xyxy() for f in faces] == [[240, 160, 320, 260], [500, 400, 520, 420]]
+    assert faces[0]["keypoints"] == {name: (x * 2 + 200, y * 2 + 100) for name, (x, y) in KEYPOINTS.items()}
+    np.testing.assert_array_equal(faces[0]["face"], frame[160:260, 240:320])
+
+
+def test_roi_clipped_at_frame_edge(frame):
+    detector = FakeDetector([[0, 0, 30, 30]])
+    [face] = make_inference(detector).detect_faces(frame, roi=BoundingBox([-50, -20, 100, 90]))
+
+    assert detector.images[0].shape == (90, 100, 3)
+    assert face["bbox"].to_xyxy() == [0, 0, 30, 30]
+    assert make_inference(detector).detect_faces(frame, roi=BoundingBox([700, 500, 800, 600])) == []
+
+
+def test_no_downscale_below_detect_min_face(frame):
+    detector = FakeDetector([[10, 10, 50, 50]])
+    make_inference(detector, detect_min_face=40).detect_faces(frame, min_face_size=30)
+    assert detector.images[0] is frame
@@ -0,0 +1,50 @@
+# test_face_preprocessing.py
+"""
+FacePreprocessor: bufor z normalizacją w miejscu daje to samo, co stara
+ścieżka cv2.resize -> utils.normalize_input -> np.stack, dla każdego trybu.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from face_preprocessing import FacePreprocessor
+from utils import normalize_input
+
+
+def faces(count=5, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = [(97, 83), (160, 160), (240, 200), (61, 75), (160, 120)]
+    return [rng.integers(0, 256, size=(*sizes[i % len(sizes)], 3), dtype=np.uint8) for i in range(count)]
+
+
+@pytest.mark.parametrize("normalization", ["base", "Facenet", "Facenet2018"])
+def test_fused_fill_matches_normalize_input(normalization):
+    preprocessor = FacePreprocessor(max_batch_size=5, normalization=normalization)
+    assert preprocessor.fused
+
+    batch = faces()
+    expected = np.stack([
+        np.asarray(normalize_input(cv2.resize(face_img, (160, 160)), normalization), dtype=np.float32)
+        for face_img in batch
+    ])
+    actual = preprocessor.fill(batch)
+    assert actual.shape == (5, 160, 160, 3) and actual.dtype == np.float32
+    np.testing.assert_allclose(actual, expected, atol=1e-4)
+
+    # Mniejszy batch po większym - wiersze nadpisane, bez śladów poprzedniego wywołania
+    [single] = preprocessor.fill(batch[3:4])
+    np.testing.assert_allclose(single, expected[3], atol=1e-4)
+
+
+def test_fill_reuses_buffer_and_limits_batch():
+    preprocessor = FacePreprocessor(max_batch_size=2)
+    first = preprocessor.fill(faces(2))
+    second = preprocessor.fill(faces(1, seed=1))
+    assert np.shares_memory(first, second)
+    with pytest.raises(ValueError):
+        preprocessor.fill(faces(3))
+
+
+def test_unknown_normalization_not_fused():
+    preprocessor = FacePreprocessor(max_batch_size=2, normalization="nieznana")
+    assert not preprocessor.fused
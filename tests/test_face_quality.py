@@ -0,0 +1,49 @@
+# test_face_quality.py
+"""
+BestFrameSelector: najlepszy kandydat po zamknięciu okna i kandydat
+spóźniony względem pop_ready() (okno zamknięte w trakcie make_candidate).
+"""
+from types import SimpleNamespace
+
+from face_quality import BestFrameSelector
+
+
+def make_track(track_id=1):
+    return SimpleNamespace(track_id=track_id, last_sent=None)
+
+
+def test_best_candidate_emitted_after_window():
+    selector = BestFrameSelector(top_k=2, window=1.0)
+    track = make_track()
+    for score in (0.2, 0.9, 0.5):
+        selector.offer(track, score, lambda score=score: {"score": score}, now=0.0)
+
+    assert selector.pop_ready(now=0.5) == []
+    [(ready_track, score, candidate, offered)] = selector.pop_ready(now=1.0)
+    assert ready_track is track
+    assert score == 0.9 and candidate == {"score": 0.9}
+    assert offered == 3
+    assert not selector.pending()
+
+
+def test_candidate_dropped_when_window_closed_meanwhile():
+    selector = BestFrameSelector(top_k=2, window=1.0)
+    track = make_track()
+    selector.offer(track, 0.5, lambda: {"score": 0.5}, now=0.0)
+
+    emitted = []
+
+    def slow_candidate():
+        # W trakcie kopiowania klatki inny wątek zamyka okno
+        emitted.extend(selector.pop_ready(now=1.0))
+        return {"score": 0.9}
+
+    assert selector.offer(track, 0.9, slow_candidate, now=0.1) is False
+    assert [candidate for _, _, candidate, _ in emitted] == [{"score": 0.5}]
+    assert not selector.pending()
+    assert selector.stats()["accepted"] == 1
+
+    # Nowe ujęcie otwiera świeże okno, bez śladu spóźnionego kandydata
+    selector.offer(track, 0.3, lambda: {"score": 0.3}, now=2.0)
+    [(_, score, _, offered)] = selector.pop_ready(now=3.0)
+    assert score == 0.3 and offered == 1
@@ -0,0 +1,39 @@
+# test_face_tracker.py
+"""
+FaceTracker: jeden track dla tej samej twarzy i odświeżanie embeddingu,
+gdy twarz urosła względem ujęcia, z którego go policzono.
+"""
+from bounding_box import BoundingBox
+from face_tracker import FaceTracker
+
+
+def test_same_face_keeps_track():
+    tracker = FaceTracker()
+    [first] = tracker.update([BoundingBox([100, 100, 200, 200])], now=0.0)
+    [second] = tracker.update([BoundingBox([105, 102, 205, 202])], now=0.1)
+    assert second is first
+    assert first.hits == 2
+
+
+def test_growth_measured_against_embedded_bbox():
+    tracker = FaceTracker(refresh_interval=60.0, refresh_area_ratio=1.5)
+    embedded_bbox = BoundingBox([100, 100, 200, 200])
+    [track] = tracker.update([embedded_bbox], now=0.0)
+    assert tracker.needs_embedding(track, now=0.0)
+
+    # Twarz zdążyła urosnąć, zanim asynchroniczny embed oznaczył starsze ujęcie
+    tracker.update([BoundingBox([90, 90, 215, 215])], now=0.5)
+    tracker.mark_embedded(track, embedded_bbox, now=0.6)
+    assert track.sent_area == embedded_bbox.area
+
+    tracker.update([BoundingBox([80, 80, 210, 210])], now=1.0)
+    assert tracker.needs_embedding(track, now=1.0)
+
+
+def test_no_refresh_without_growth():
+    tracker = FaceTracker(refresh_interval=60.0, refresh_area_ratio=1.5)
+    [track] = tracker.update([BoundingBox([100, 100, 200, 200])], now=0.0)
+    tracker.mark_embedded(track, now=0.1)
+    tracker.update([BoundingBox([102, 100, 202, 200])], now=1.0)
+    assert not tracker.needs_embedding(track, now=1.0)
+    assert tracker.needs_embedding(track, now=61.0)
@@ -0,0 +1,121 @@
+# test_gallery.py
+"""
+EmbeddingGallery: add/remove/search, przebudowa w replace_all(), zapis na
+dysk i ponowne wczytanie (także indeksu IVF przez mmap) oraz wyniki IVF
+względem wyszukiwania dokładnego na małym syntetycznym zbiorze.
+"""
+import numpy as np
+import pytest
+
+from gallery import EmbeddingGallery
+
+DIMENSION = 16
+
+
+def synthetic_people(people=30, per_person=5, noise=0.05, seed=0):
+    """ Osoby jako punkty na sferze, każda z kilkoma zaszumionymi embeddingami. """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(people, DIMENSION))
+    records = [
+        (f"p{person}", centers[person] + noise * rng.normal(size=DIMENSION))
+        for person in range(people) for _ in range(per_person)
+    ]
+    return centers, records
+
+
+def test_add_remove_search(tmp_path):
+    gallery = EmbeddingGallery(str(tmp_path), dimension=DIMENSION, initial_capacity=2)
+    centers, _ = synthetic_people(people=3)
+    gallery.add("alice", centers[0])
+    gallery.add("bob", np.stack([centers[1], centers[1] * 2.0]))   # normalizacja L2
+    gallery.add("carol", centers[2])
+    assert len(gallery) == 4 and gallery.person_ids() == {"alice", "bob", "carol"}
+
+    [(person_id, similarity), *others] = gallery.search(centers[1], k=3)
+    assert person_id == "bob" and similarity == pytest.approx(1.0, abs=1e-5)
+    assert {p for p, _ in others} == {"alice", "carol"}   # każda osoba raz
+
+    assert gallery.remove("bob") == 2
+    assert len(gallery) == 2 and "bob" not in gallery.person_ids()
+    assert all(p != "bob" for p, _ in gallery.search(centers[1], k=3))
+
+    gallery.remove("alice")
+    gallery.remove("carol")
+    assert gallery.search(centers[0]) == []
+
+
+def test_replace_all_rebuilds_and_compact(tmp_path):
+    gallery = EmbeddingGallery(str(tmp_path), dimension=DIMENSION)
+    centers, records = synthetic_people(people=4, per_person=2)
+    gallery.add("old", centers[0])
+
+    gallery.replace_all(records)
+    assert len(gallery) == len(records)
+    assert "old" not in gallery.person_ids()
+    assert gallery.search(centers[3], k=1)[0][0] == "p3"
+
+    gallery.remove("p3")
+    gallery.compact()
+    assert len(gallery) == len(records) - 2 and gallery.capacity == len(records) - 2
+
+
+def test_flat_gallery_roundtrip(tmp_path):
+    centers, records = synthetic_people(people=5, per_person=2)
+    gallery = EmbeddingGallery(str(tmp_path), dimension=DIMENSION)
+    gallery.replace_all(records[:6])
+    gallery.add("late", centers[4] * -1.0)
+    gallery.remove("p0")
+    gallery.flush()
+
+    reopened = EmbeddingGallery(str(tmp_path), dimension=DIMENSION)
+    assert reopened.person_ids() == gallery.person_ids()
+    assert len(reopened) == len(gallery)
+    queries = [embedding for _, embedding in records] + [centers[4] * -1.0]
+    assert reopened.search_batch(queries, k=3) == gallery.search_batch(queries, k=3)
+
+
+def test_ivf_roundtrip_matches_exact_search(tmp_path):
+    centers, records = synthetic_people(people=40, per_person=5)
+    gallery = EmbeddingGallery(str(tmp_path), dimension=DIMENSION, index="ivf", nlist=8, nprobe=3,
+                               index_min_size=100)
+    gallery.replace_all(records)
+    assert gallery.index.trained
+
+    # Dopisane po treningu trafiają do list bez ponownego treningu i przetrwają zapis
+    extra_center = np.random.default_rng(1).normal(size=DIMENSION)
+    gallery.add("extra", extra_center)
+    gallery.flush()
+
+    reopened = EmbeddingGallery(str(tmp_path), dimension=DIMENSION, index="ivf", nlist=8, nprobe=3,
+                                index_min_size=100)
+    assert reopened.index.trained
+    assert isinstance(reopened.index.centroids, np.memmap)
+    assert isinstance(reopened._matrix, np.memmap)
+
+    rng = np.random.default_rng(2)
+    queries = np.concatenate([centers, [extra_center]]) + 0.05 * rng.normal(size=(len(centers) + 1, DIMENSION))
+    approx = reopened.search_batch(queries, k=1)
+    exact = reopened.search_batch(queries, k=1, exact=True)
+    assert [a[0][0] for a in approx] == [e[0][0] for e in exact]
+    assert exact[-1][0][0] == "extra"
+    assert reopened.recall_at_k(queries, k=5) >= 0.8
+
+    # Sondowanie wszystkich list = wyszukiwanie dokładne
+    reopened.index.nprobe = len(reopened.index.centroids)
+    full = reopened.search_batch(queries, k=5)
+    expected = reopened.search_batch(queries, k=5, exact=True)
+    for got, want in zip(full, expected):
+        assert [p for p, _ in got] == [p for p, _ in want]
+        np.testing.assert_allclose([s for _, s in got], [s for _, s in want], rtol=1e-5)
+
+
+def test_small_gallery_drops_ivf_index(tmp_path):
+    _, records = synthetic_people(people=40, per_person=5)
+    gallery = EmbeddingGallery(str(tmp_path), dimension=DIMENSION, index="ivf", nlist=8, index_min_size=100)
+    gallery.replace_all(records)
+    assert gallery.index.trained
+
+    gallery.replace_all(records[:50])
+    assert not gallery.index.trained
+    assert not list(tmp_path.glob("ivf_*.npy"))
+    assert gallery.search(records[0][1], k=1)[0][0] == "p0"
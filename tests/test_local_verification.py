@@ -0,0 +1,22 @@
+# test_local_verification.py
+"""
+store_local_data: kilka twarzy z jednej klatki zapisanych w tej samej sekundzie
+nie nadpisuje sobie plików.
+"""
+import base64
+import json
+
+from local_verification import store_local_data
+
+
+def test_same_second_saves_do_not_overwrite(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    image_base = base64.b64encode(b"\xff\xd8jpeg\xff\xd9").decode("utf-8")
+    for person_id in range(3):
+        store_local_data(image_base, 200, json.dumps({"person_id": person_id}))
+
+    stored = tmp_path / "stored_data"
+    assert len(list(stored.glob("*.jpg"))) == 3
+    responses = sorted(json.loads(p.read_text(encoding="utf-8"))["response"]["person_id"]
+                       for p in stored.glob("*.json"))
+    assert responses == [0, 1, 2]
@@ -0,0 +1,67 @@
+# test_motion_gate.py
+"""
+MotionGate na syntetycznych klatkach: pomijanie statycznej sceny, ROI wokół
+ruchomego obiektu i wymuszona detekcja po force_interval.
+"""
+import numpy as np
+
+from motion_gate import MotionGate
+
+
+def scene(block_at=None, size=60):
+    """ Szare tło 640x480 z delikatnym gradientem i opcjonalnym jasnym blokiem. """
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame[:] = np.linspace(60, 120, 640, dtype=np.uint8)[None, :, None]
+    if block_at is not None:
+        x, y = block_at
+        frame[y:y + size, x:x + size] = 230
+    return frame
+
+
+def test_static_scene_is_skipped_until_forced():
+    gate = MotionGate(force_interval=2.0)
+    assert gate.check(scene(), now=0.0) == (True, None, False)
+    for t in (0.5, 1.0, 1.9):
+        assert gate.check(scene(), now=t) == (False, None, False)
+
+    assert gate.check(scene(), now=2.0) == (True, None, True)
+    assert gate.check(scene(), now=2.5) == (False, None, False)
+    assert gate.stats() == {"checked": 6, "skipped": 4, "forced": 1, "roi_used": 0}
+
+
+def test_motion_returns_roi_around_moving_block():
+    gate = MotionGate(force_interval=10.0)
+    gate.check(scene(), now=0.0)
+    run, roi, forced = gate.check(scene(block_at=(400, 200)), now=0.1)
+
+    assert run and not forced and roi is not None
+    assert roi.x1 <= 400 and roi.y1 <= 200 and roi.x2 >= 460 and roi.y2 >= 260
+    assert roi.area < 0.1 * 640 * 480
+    assert gate.stats()["roi_used"] == 1
+
+
+def test_motion_resets_force_timer():
+    gate = MotionGate(force_interval=2.0)
+    gate.check(scene(), now=0.0)
+    assert gate.check(scene(block_at=(100, 100)), now=1.5)[0]
+    # Przy alpha=1 tło od razu wchłania blok; ruch o 1.6 s przesuwa licznik wymuszenia
+    still = scene(block_at=(100, 100))
+    gate.alpha = 1.0
+    assert gate.check(still, now=1.6)[0]
+    assert gate.check(still, now=3.0) == (False, None, False)
+    assert gate.check(still, now=3.6) == (True, None, True)
+
+
+def test_large_change_runs_on_full_frame():
+    gate = MotionGate(max_roi_area=0.6)
+    gate.check(scene(), now=0.0)
+    flash = np.full((480, 640, 3), 250, dtype=np.uint8)
+    assert gate.check(flash, now=0.1) == (True, None, False)
+    assert gate.stats()["roi_used"] == 0
+
+
+def test_resolution_change_resets_background():
+    gate = MotionGate()
+    gate.check(scene(), now=0.0)
+    assert gate.check(np.zeros((240, 320, 3), dtype=np.uint8), now=0.1) == (True, None, False)
+    assert gate.check(np.zeros((240, 320, 3), dtype=np.uint8), now=0.2) == (False, None, False)
@@ -0,0 +1,41 @@
+# test_pipeline.py
+"""
+Stage/Pipeline: liczniki przetworzonych i odfiltrowanych elementów oraz
+pauza źródła po błędzie (bez kręcenia się w kółko).
+"""
+import time
+
+from pipeline import Pipeline, Stage
+
+
+def test_failing_source_sleeps_between_errors():
+    def broken_camera():
+        raise IOError("kamera nie odpowiada")
+
+    source = Stage("capture", broken_camera, idle_sleep=0.05)
+    source.start()
+    time.sleep(0.5)
+    source.stop()
+
+    # ~10 prób w 0.5 s zamiast tysięcy
+    assert 1 <= source.errors <= 15
+
+
+def test_stage_counts_filtered_items():
+    items = iter(range(6))
+    pipeline = Pipeline(queue_size=16, idle_sleep=0.01)
+    pipeline.add_source("capture", lambda: next(items, None))
+    pipeline.add_stage("even", lambda x: x if x % 2 == 0 else None)
+    pipeline.add_stage("sink", lambda x: None)
+    pipeline.start()
+
+    deadline = time.time() + 5.0
+    while time.time() < deadline and pipeline.stats()["sink"]["processed"] < 3:
+        time.sleep(0.02)
+    pipeline.stop()
+
+    stats = pipeline.stats()
+    assert stats["capture"]["processed"] == 6
+    assert stats["even"]["processed"] == 6
+    assert stats["even"]["filtered"] == 3
+    assert stats["sink"]["processed"] == 3